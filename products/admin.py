@@ -1,24 +1,50 @@
+import hashlib
 import json
 
 from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.admin.widgets import AutocompleteSelect
 from django import forms
-from django.core.exceptions import PermissionDenied
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, PermissionDenied
 from django.db import models as dj_models
-from django.http import HttpRequest, JsonResponse
+from django.http import HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import redirect, render
-from django.urls import path
+from django.urls import path, reverse
+from django.utils import timezone
+from django.utils.html import format_html
+from django.utils.text import slugify
 
-from .models import ProductUploadRow, Vendor
+from .models import DataVersion, ExportWatermark, HeaderAlias, ImportBatch, ProductUploadRow, Vendor
 from .ai import generate_product_copy, generate_product_copy_with_error
+from .backends import backend_available, missing_message
 from .csv_export import queryset_to_shopify_csv_response
-from .excel_import import import_csv_to_model, import_xlsx_to_model, import_xls_to_model
+from .export_cache import (
+    EXPORT_FORMATS,
+    cache_enabled,
+    cached_response,
+    export_cache_key,
+    export_filename,
+    store_response,
+)
+from .excel_import import (
+    _db_column_to_field_name,
+    import_csv_to_model,
+    import_xlsx_to_model,
+    import_xls_to_model,
+    open_import_rows,
+)
+from .header_mapping import FUZZY, normalize_header_key, resolve_headers
+from .import_validation import validate_import_file
+from .instrumentation import instrument, recent_jobs
+from .multi_import import import_files_to_model
+from .purge import delete_in_chunks
+from .sharded_export import export_workers, queryset_to_sharded_csv_response
+from .split_export import part_bytes_limit, queryset_to_split_csv_zip_response
 from .xlsx_export import queryset_to_shopify_xlsx_response
 
-try:
-    import openpyxl
-except Exception:  # pragma: no cover
-    openpyxl = None
-
 # Customize admin branding
 admin.site.site_header = "GOODDEGG Administration"
 admin.site.site_title = "GOODDEGG Admin"
@@ -63,30 +89,174 @@ class ProductUploadRowAdminForm(forms.ModelForm):
                 form_field.widget.attrs.setdefault("style", "resize: vertical;")
 
 
+class MultipleFileInput(forms.ClearableFileInput):
+    allow_multiple_selected = True
+
+
+class MultipleFileField(forms.FileField):
+    def __init__(self, *args, **kwargs):
+        kwargs.setdefault("widget", MultipleFileInput())
+        super().__init__(*args, **kwargs)
+
+    def clean(self, data, initial=None):
+        single_file_clean = super().clean
+        if isinstance(data, (list, tuple)):
+            return [single_file_clean(d, initial) for d in data]
+        return [single_file_clean(data, initial)]
+
+
 class ProductUploadRowExcelImportForm(forms.Form):
-    file = forms.FileField(help_text="Upload a .csv, .xlsx, or .xls file with headers matching the Shopify CSV columns.")
+    file = MultipleFileField(
+        help_text="Upload one or more .csv, .xlsx, or .xls files (or a .zip of them) with headers matching the Shopify CSV columns."
+    )
     sheet_name = forms.CharField(
         required=False,
         help_text="Optional: Excel sheet name. Leave blank to use the first sheet.",
     )
+    all_sheets = forms.BooleanField(
+        required=False,
+        help_text="Import every sheet of each workbook. Sheets and files are parsed in parallel.",
+    )
+    vendor = forms.ModelChoiceField(
+        queryset=Vendor.objects.all(),
+        required=False,
+        # Searched as you type; only the selected vendor is rendered into the page.
+        widget=AutocompleteSelect(ProductUploadRow._meta.get_field("vendor"), admin.site),
+        help_text="Optional: supplier whose remembered header mappings should be applied.",
+    )
+    dry_run = forms.BooleanField(
+        required=False,
+        help_text="Only validate the file (lengths, TRUE/FALSE values, duplicate SKUs, headers). Nothing is imported; problems are downloaded as a CSV report.",
+    )
 
     def clean_file(self):
-        f = self.cleaned_data["file"]
-        name = (getattr(f, "name", "") or "").lower()
-        if name.endswith(".xlsx"):
-            if openpyxl is None:
-                raise forms.ValidationError("Excel import is not available (openpyxl is not installed).")
-            return f
-        if name.endswith(".xls"):
-            try:
-                import xlrd  # noqa: F401
-            except Exception:
-                raise forms.ValidationError("XLS import is not available (xlrd is not installed).")
-            return f
-        if name.endswith(".csv"):
-            return f
-        raise forms.ValidationError("Please upload a .csv, .xlsx, or .xls file.")
-        return f
+        files = self.cleaned_data["file"]
+        for f in files:
+            name = (getattr(f, "name", "") or "").lower()
+            if name.endswith(".xlsx"):
+                if not backend_available("openpyxl"):
+                    raise forms.ValidationError(missing_message("openpyxl"))
+            elif name.endswith(".xls"):
+                if not backend_available("xlrd"):
+                    raise forms.ValidationError(missing_message("xlrd"))
+            elif not name.endswith((".csv", ".zip")):
+                raise forms.ValidationError("Please upload .csv, .xlsx, .xls, or .zip files.")
+        return files
+
+    def clean(self):
+        cleaned_data = super().clean()
+        files = cleaned_data.get("file") or []
+        if cleaned_data.get("dry_run") and (
+            len(files) != 1 or cleaned_data.get("all_sheets") or files[0].name.lower().endswith(".zip")
+        ):
+            raise forms.ValidationError("Dry run checks a single file and sheet at a time.")
+        return cleaned_data
+
+
+class ProductUploadRowBulkEditForm(forms.Form):
+    TAGS_REPLACE = "replace"
+    TAGS_ADD = "add"
+    TAGS_REMOVE = "remove"
+
+    status = forms.ChoiceField(
+        required=False,
+        choices=(("", "(no change)"), ("active", "active"), ("draft", "draft"), ("archived", "archived")),
+    )
+    published_on_online_store = forms.ChoiceField(
+        required=False,
+        choices=(("", "(no change)"), ("true", "Published"), ("false", "Unpublished")),
+    )
+    vendor = forms.CharField(
+        required=False,
+        help_text="Vendor name. Created if it does not exist. Leave blank for no change.",
+    )
+    tags_mode = forms.ChoiceField(
+        choices=((TAGS_ADD, "Add tags"), (TAGS_REMOVE, "Remove tags"), (TAGS_REPLACE, "Replace tags")),
+        initial=TAGS_ADD,
+    )
+    tags = forms.CharField(
+        required=False,
+        help_text="Comma-separated tags. Leave blank for no change (unless replacing).",
+    )
+
+
+def _split_tags(value: str | None) -> list[str]:
+    tags: list[str] = []
+    for item in (value or "").split(","):
+        tag = item.strip()
+        if tag and tag not in tags:
+            tags.append(tag)
+    return tags
+
+
+VENDOR_FILTER_LIMIT = 200
+VENDOR_FILTER_CACHE_SECONDS = 300
+
+
+class VendorListFilter(admin.SimpleListFilter):
+    """Vendor filter whose choices are fetched lazily from ``vendor_filter_view``.
+
+    Only the selected vendor is rendered with the page; the full list (vendors that have
+    rows under the other active filters) is loaded on demand and cached per filter state.
+    """
+
+    title = "vendor"
+    parameter_name = "vendor__id__exact"
+    template = "admin/products/productuploadrow/vendor_filter.html"
+
+    def lookups(self, request, model_admin):
+        selected = self.value()
+        if selected and str(selected).isdigit():
+            return [(str(vendor.pk), vendor.name) for vendor in Vendor.objects.filter(pk=selected)]
+        return []
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            return queryset.filter(vendor_id=value)
+        return queryset
+
+
+class ImportBatchListFilter(admin.SimpleListFilter):
+    """Rows of one import batch, as linked from the batch changelist.
+
+    Batches pile up over time, so no list is offered: the filter shows only while a batch
+    is selected, to make the narrowed view visible and clearable.
+    """
+
+    title = "import batch"
+    parameter_name = "import_batch"
+
+    def lookups(self, request, model_admin):
+        selected = self.value()
+        if selected and str(selected).isdigit():
+            return [(str(batch.pk), str(batch)) for batch in ImportBatch.objects.filter(pk=selected)]
+        return []
+
+    def queryset(self, request, queryset):
+        value = self.value()
+        if value:
+            return queryset.filter(import_batch_id=value)
+        return queryset
+
+
+class ProductUploadRowChangeList(ChangeList):
+    """Loads only the displayed columns for the page of results.
+
+    ``get_queryset()`` is left whole: exports and "select all" actions reuse it and need
+    every column.
+    """
+
+    def get_results(self, request):
+        full_queryset = self.queryset
+        self.queryset = full_queryset.only(*self.model_admin.changelist_columns())
+        try:
+            super().get_results(request)
+        finally:
+            self.queryset = full_queryset
 
 
 @admin.register(ProductUploadRow)
@@ -95,7 +265,7 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
     formfield_overrides = {
         dj_models.TextField: {"widget": forms.Textarea(attrs={"rows": 1, "cols": 40, "style": "resize: vertical;"})},
     }
-    readonly_fields = ("uploaded_at",)
+    readonly_fields = ("uploaded_at", "updated_at", "import_batch")
     prepopulated_fields = {"url_handle": ("title",)}
     list_display = (
         "id",
@@ -107,20 +277,23 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
         "price",
         "inventory_quantity",
     )
+    list_select_related = ("vendor",)
+    autocomplete_fields = ("vendor",)
     search_fields = ("title", "sku", "barcode", "vendor__name", "tags", "url_handle")
     list_filter = (
         ("uploaded_at", admin.DateFieldListFilter),
         "status",
-        "vendor",
+        VendorListFilter,
         "published_on_online_store",
         "requires_shipping",
+        ImportBatchListFilter,
     )
     date_hierarchy = "uploaded_at"
     ordering = ("-id",)
-    actions = ("export_selected_to_shopify_csv",)
+    actions = ("export_selected_to_shopify_csv", "bulk_edit_rows")
     fieldsets = (
         ("Identifiers", {"fields": ("sku", "barcode")}),
-        ("Upload metadata", {"fields": ("uploaded_at",)}),
+        ("Upload metadata", {"fields": ("uploaded_at", "updated_at", "import_batch")}),
         (
             "Core product info",
             {
@@ -215,11 +388,26 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
                 self.admin_site.admin_view(self.import_excel_view),
                 name="products_productuploadrow_import_excel",
             ),
+            path(
+                "import-mapping/",
+                self.admin_site.admin_view(self.header_mapping_view),
+                name="products_productuploadrow_import_mapping",
+            ),
             path(
                 "export/",
                 self.admin_site.admin_view(self.export_view),
                 name="products_productuploadrow_export",
             ),
+            path(
+                "vendor-filter/",
+                self.admin_site.admin_view(self.vendor_filter_view),
+                name="products_productuploadrow_vendor_filter",
+            ),
+            path(
+                "performance/",
+                self.admin_site.admin_view(self.performance_view),
+                name="products_productuploadrow_performance",
+            ),
             path(
                 "delete-all/",
                 self.admin_site.admin_view(self.delete_all_view),
@@ -228,57 +416,96 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
         ]
         return custom_urls + urls
 
-    def _delete_all_in_chunks(self, *, chunk_size: int) -> tuple[int, int]:
-        chunk_size = max(1, int(chunk_size))
-        deleted_rows = 0
-        batches = 0
-        cursor = 0
-        model = self.model
+    def get_changelist(self, request, **kwargs):
+        return ProductUploadRowChangeList
 
-        while True:
-            last_pk = (
-                model.objects.filter(pk__gt=cursor)
-                .order_by("pk")
-                .values_list("pk", flat=True)[chunk_size - 1 : chunk_size]
-                .first()
-            )
-            if last_pk is None:
-                remaining = model.objects.filter(pk__gt=cursor).count()
-                if remaining:
-                    model.objects.filter(pk__gt=cursor).delete()
-                    deleted_rows += remaining
-                    batches += 1
-                break
+    def changelist_columns(self) -> list[str]:
+        """Concrete ``list_display`` fields; ``list_select_related`` models are still loaded whole."""
+        columns = {"pk"}
+        for name in self.list_display:
+            try:
+                field = self.model._meta.get_field(name)
+            except FieldDoesNotExist:
+                continue
+            if field.concrete:
+                columns.add(field.name)
+        return sorted(columns)
 
-            batch_qs = model.objects.filter(pk__gt=cursor, pk__lte=last_pk)
-            batch_count = batch_qs.count()
-            batch_qs.delete()
-            deleted_rows += batch_count
-            batches += 1
-            cursor = last_pk
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        DataVersion.bump()
 
+    def _delete_all_in_chunks(self, *, chunk_size: int) -> tuple[int, int]:
+        chunk_size = max(1, int(chunk_size))
+        with instrument("purge", chunk_size=chunk_size) as job:
+            with job.stage("delete"):
+                deleted_rows, batches = delete_in_chunks(self.model.objects.all(), chunk_size=chunk_size)
+            job.rows = deleted_rows
+            job.fields["batches"] = batches
         return deleted_rows, batches
 
     def import_excel_view(self, request: HttpRequest):
         if request.method == "POST":
             form = ProductUploadRowExcelImportForm(request.POST, request.FILES)
             if form.is_valid():
-                uploaded_file = form.cleaned_data["file"]
+                files = form.cleaned_data["file"]
+                uploaded_file = files[0]
                 name = (getattr(uploaded_file, "name", "") or "").lower()
+                vendor = form.cleaned_data.get("vendor")
+                if "_preview" in request.POST:
+                    return self._render_header_preview(request, form, uploaded_file, vendor)
+                if form.cleaned_data.get("dry_run"):
+                    report = validate_import_file(
+                        model=ProductUploadRow,
+                        file=uploaded_file,
+                        sheet_name=form.cleaned_data.get("sheet_name") or None,
+                        vendor=vendor,
+                    )
+                    if report.ok and not report.unmapped_columns:
+                        self.message_user(
+                            request,
+                            f"Dry run: {report.row_count} rows checked, no problems found. Nothing was imported.",
+                            level=messages.SUCCESS,
+                        )
+                        return redirect(request.path)
+                    timestamp = timezone.now().strftime("%Y%m%d_%H%M%S")
+                    response = HttpResponse(report.as_csv(), content_type="text/csv; charset=utf-8")
+                    response["Content-Disposition"] = f'attachment; filename="import_report_{timestamp}.csv"'
+                    return response
+                if len(files) > 1 or form.cleaned_data.get("all_sheets") or name.endswith(".zip"):
+                    try:
+                        summary = import_files_to_model(
+                            model=ProductUploadRow,
+                            files=files,
+                            sheet_name=form.cleaned_data.get("sheet_name") or None,
+                            all_sheets=bool(form.cleaned_data.get("all_sheets")),
+                            vendor=vendor,
+                        )
+                    except (RuntimeError, ValueError) as exc:
+                        self.message_user(request, f"Import failed, nothing was imported: {exc}", level=messages.ERROR)
+                        return redirect(request.path)
+                    breakdown = "; ".join(f"{label}: {rows}" for label, rows in summary.items())
+                    self.message_user(
+                        request,
+                        f"Imported {sum(summary.values())} rows from {len(summary)} sources ({breakdown}).",
+                        level=messages.SUCCESS,
+                    )
+                    return redirect("..")
                 if name.endswith(".csv"):
-                    count = import_csv_to_model(model=ProductUploadRow, file=uploaded_file)
+                    count = import_csv_to_model(model=ProductUploadRow, file=uploaded_file, vendor=vendor)
                 elif name.endswith(".xlsx"):
-                    workbook = openpyxl.load_workbook(uploaded_file, read_only=True, data_only=True)
                     count = import_xlsx_to_model(
                         model=ProductUploadRow,
-                        workbook=workbook,
+                        file=uploaded_file,
                         sheet_name=form.cleaned_data.get("sheet_name") or None,
+                        vendor=vendor,
                     )
                 else:
                     count = import_xls_to_model(
                         model=ProductUploadRow,
                         file=uploaded_file,
                         sheet_name=form.cleaned_data.get("sheet_name") or None,
+                        vendor=vendor,
                     )
                 self.message_user(request, f"Imported {count} rows.", level=messages.SUCCESS)
                 return redirect("..")
@@ -293,13 +520,101 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
         )
         return render(request, "admin/products/productuploadrow/import_excel.html", context)
 
+    def _render_header_preview(self, request: HttpRequest, form, uploaded_file, vendor):
+        if (uploaded_file.name or "").lower().endswith(".zip"):
+            self.message_user(request, "Preview works on a single .csv, .xlsx, or .xls file.", level=messages.ERROR)
+            return redirect(request.path)
+        with open_import_rows(uploaded_file, sheet_name=form.cleaned_data.get("sheet_name") or None) as (headers, rows):
+            sample = next(iter(rows), None) if headers is not None else None
+        headers = headers or []
+        sample = list(sample or [])
+        matches = resolve_headers(ProductUploadRow, headers, source_name=uploaded_file.name, vendor=vendor)
+        mapping = [
+            {
+                "header": match.header,
+                "column": match.column or "",
+                "method": match.method,
+                "sample": "" if idx >= len(sample) or sample[idx] is None else str(sample[idx])[:80],
+            }
+            for idx, match in enumerate(matches)
+            if match.header
+        ]
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Header mapping preview",
+            filename=uploaded_file.name,
+            vendor=vendor,
+            mapping=mapping,
+            columns=list(_db_column_to_field_name(ProductUploadRow)),
+            fuzzy=FUZZY,
+        )
+        return render(request, "admin/products/productuploadrow/import_preview.html", context)
+
+    def header_mapping_view(self, request: HttpRequest):
+        if request.method != "POST" or not self.has_change_permission(request):
+            raise PermissionDenied
+        vendor = Vendor.objects.filter(pk=request.POST.get("vendor") or None).first()
+        pattern = (request.POST.get("filename_pattern") or "").strip()
+        headers = request.POST.getlist("header")
+        targets = request.POST.getlist("target")
+        suggested = request.POST.getlist("suggested")
+        methods = request.POST.getlist("method")
+        columns = set(_db_column_to_field_name(ProductUploadRow))
+        saved = 0
+        for header, target, auto_column, method in zip(headers, targets, suggested, methods):
+            # Only corrections and confirmed fuzzy guesses are worth remembering.
+            if target and target not in columns:
+                continue
+            if target == auto_column and method != FUZZY:
+                continue
+            HeaderAlias.objects.update_or_create(
+                vendor=vendor,
+                filename_pattern=pattern,
+                source_header=normalize_header_key(header),
+                defaults={"target_column": target},
+            )
+            saved += 1
+        self.message_user(
+            request,
+            f"Saved {saved} header mappings. Upload the file again to import with them.",
+            level=messages.SUCCESS,
+        )
+        return redirect(reverse("admin:products_productuploadrow_import_excel"))
+
+    def _export_response(self, fmt: str, queryset, *, filename_prefix: str, on_complete):
+        if fmt == "csv-split":
+            return queryset_to_split_csv_zip_response(
+                queryset=queryset, filename_prefix=filename_prefix, on_complete=on_complete
+            )
+        if fmt.startswith("csv"):
+            # csv.gz / csv.zip are compressed on the fly, chunk by chunk.
+            compression = fmt.partition(".")[2] or None
+            if export_workers() > 1:
+                return queryset_to_sharded_csv_response(
+                    queryset=queryset,
+                    workers=export_workers(),
+                    filename_prefix=filename_prefix,
+                    on_complete=on_complete,
+                    compression=compression,
+                )
+            return queryset_to_shopify_csv_response(
+                queryset=queryset, filename_prefix=filename_prefix, on_complete=on_complete, compression=compression
+            )
+        return queryset_to_shopify_xlsx_response(
+            queryset=queryset, filename_prefix=filename_prefix, on_complete=on_complete
+        )
+
     def export_view(self, request: HttpRequest):
         if not self.has_view_permission(request):
             raise PermissionDenied
 
         fmt = (request.GET.get("format") or "").strip().lower()
+        mode = (request.GET.get("mode") or "").strip().lower()
+        profile = (request.GET.get("profile") or "").strip() or "default"
         preserved = request.GET.copy()
-        preserved.pop("format", None)
+        for param in ("format", "mode", "profile"):
+            preserved.pop(param, None)
 
         original_get = request.GET
         request.GET = preserved
@@ -309,15 +624,34 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
         finally:
             request.GET = original_get
 
-        if fmt in {"csv", "xlsx"}:
+        on_complete = None
+        if mode == "incremental" and fmt in EXPORT_FORMATS:
+            watermark, _created = ExportWatermark.objects.get_or_create(profile=profile)
+            until = ExportWatermark.cutoff()
+            queryset = watermark.pending(queryset, until=until)
+
+            def on_complete(row_count: int) -> None:
+                watermark.advance(until=until, row_count=row_count)
+
+        if fmt in EXPORT_FORMATS:
             filename_prefix = "product_upload_rows"
-            if fmt == "csv":
-                return queryset_to_shopify_csv_response(queryset=queryset, filename_prefix=filename_prefix)
+            if on_complete is not None:
+                filename_prefix = f"{filename_prefix}_{slugify(profile)}_changes"
+            # Incremental exports move a watermark, so they always run.
+            cache_key = None
+            if on_complete is None and cache_enabled():
+                cache_key = export_cache_key(self.model, fmt=fmt, params=preserved)
+                cached = cached_response(cache_key, fmt=fmt, filename=export_filename(filename_prefix, fmt))
+                if cached is not None:
+                    return cached
             try:
-                return queryset_to_shopify_xlsx_response(queryset=queryset, filename_prefix=filename_prefix)
+                response = self._export_response(
+                    fmt, queryset, filename_prefix=filename_prefix, on_complete=on_complete
+                )
             except RuntimeError as exc:
                 self.message_user(request, str(exc), level=messages.ERROR)
                 return redirect(request.path + (f"?{preserved.urlencode()}" if preserved else ""))
+            return response if cache_key is None else store_response(response, key=cache_key)
 
         context = dict(
             self.admin_site.each_context(request),
@@ -325,6 +659,9 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
             title="Export ProductUploadRow",
             total=queryset.count(),
             preserved_filters=preserved.urlencode(),
+            watermarks=ExportWatermark.objects.order_by("profile"),
+            watermark_lag_minutes=round(getattr(settings, "PRODUCTS_EXPORT_WATERMARK_LAG", 900) / 60),
+            part_megabytes=round(part_bytes_limit() / 1_000_000, 1),
         )
         return render(request, "admin/products/productuploadrow/export.html", context)
 
@@ -358,6 +695,63 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
         )
         return render(request, "admin/products/productuploadrow/delete_all.html", context)
 
+    def vendor_filter_view(self, request: HttpRequest):
+        """JSON choices for ``VendorListFilter``: vendors with rows under the other active filters.
+
+        Cached per filter state and data version, so repeat page loads cost one cache read.
+        """
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+
+        params = request.GET.copy()
+        for param in (VendorListFilter.parameter_name, "p", "o"):
+            params.pop(param, None)
+        state = json.dumps([sorted(params.lists()), DataVersion.current()])
+        cache_key = f"products:vendor-filter:{hashlib.sha256(state.encode('utf-8')).hexdigest()}"
+        payload = cache.get(cache_key)
+        if payload is None:
+            original_get = request.GET
+            request.GET = params
+            try:
+                changelist = self.get_changelist_instance(request)
+                queryset = changelist.get_queryset(request)
+            finally:
+                request.GET = original_get
+            vendors = list(
+                queryset.order_by()
+                .filter(vendor__isnull=False)
+                .values("vendor_id", "vendor__name")
+                .annotate(rows=dj_models.Count("pk"))
+                .order_by("vendor__name")[: VENDOR_FILTER_LIMIT + 1]
+            )
+            payload = {
+                "choices": [
+                    {
+                        "id": vendor["vendor_id"],
+                        "name": vendor["vendor__name"],
+                        "rows": vendor["rows"],
+                        "query_string": changelist.get_query_string(
+                            {VendorListFilter.parameter_name: vendor["vendor_id"]}, ["p"]
+                        ),
+                    }
+                    for vendor in vendors[:VENDOR_FILTER_LIMIT]
+                ],
+                "truncated": len(vendors) > VENDOR_FILTER_LIMIT,
+            }
+            cache.set(cache_key, payload, VENDOR_FILTER_CACHE_SECONDS)
+        return JsonResponse(payload)
+
+    def performance_view(self, request: HttpRequest):
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Import/export performance",
+            jobs=recent_jobs(),
+        )
+        return render(request, "admin/products/productuploadrow/performance.html", context)
+
     def ai_generate_view(self, request: HttpRequest):
         if not self.has_change_permission(request):
             raise PermissionDenied
@@ -391,13 +785,161 @@ class ProductUploadRowAdmin(admin.ModelAdmin):
 
     @admin.action(description="Export selected rows to Shopify CSV")
     def export_selected_to_shopify_csv(self, request: HttpRequest, queryset):
+        if request.POST.get("select_across") == "1":
+            # "Select all matching": hand the changelist filter/search state to export_view,
+            # which re-resolves the queryset server-side instead of trusting posted ids.
+            params = request.GET.copy()
+            params["format"] = "csv"
+            return redirect(f"{reverse('admin:products_productuploadrow_export')}?{params.urlencode()}")
         return queryset_to_shopify_csv_response(queryset=queryset)
 
+    def _apply_bulk_edit(self, queryset, cleaned_data) -> int:
+        """Apply bulk edit form values with set-based UPDATEs; never calls save() (no AI generation)."""
+        updates = {}
+        if cleaned_data.get("status"):
+            updates["status"] = cleaned_data["status"]
+        if cleaned_data.get("published_on_online_store"):
+            updates["published_on_online_store"] = cleaned_data["published_on_online_store"] == "true"
+        vendor_name = (cleaned_data.get("vendor") or "").strip()
+        if vendor_name:
+            updates["vendor"], _created = Vendor.objects.get_or_create(name=vendor_name)
+
+        tags = _split_tags(cleaned_data.get("tags"))
+        tags_mode = cleaned_data.get("tags_mode")
+        if tags_mode == ProductUploadRowBulkEditForm.TAGS_REPLACE:
+            updates["tags"] = ", ".join(tags) or None
+        elif not tags:
+            tags_mode = None
+
+        if tags_mode not in {ProductUploadRowBulkEditForm.TAGS_ADD, ProductUploadRowBulkEditForm.TAGS_REMOVE}:
+            if not updates:
+                return 0
+            changed = queryset.update(updated_at=timezone.now(), **updates)
+            DataVersion.bump()
+            return changed
+
+        # Adding/removing tags needs each row's current value: walk the selection by pk
+        # (keyset pages stay correct even when the update moves rows out of the filter)
+        # and write each page back with one bulk_update.
+        update_fields = ["tags", "updated_at", *(name for name in updates if name != "tags")]
+        changed = 0
+        last_pk = 0
+        now = timezone.now()
+        while True:
+            # select_related(None): the changelist queryset joins vendor (list_select_related).
+            page = queryset.select_related(None).filter(pk__gt=last_pk).order_by("pk")
+            rows = list(page.only("pk", "tags")[:1000])
+            if not rows:
+                break
+            last_pk = rows[-1].pk
+            for row in rows:
+                current = _split_tags(row.tags)
+                if tags_mode == ProductUploadRowBulkEditForm.TAGS_ADD:
+                    merged = current + [t for t in tags if t not in current]
+                else:
+                    merged = [t for t in current if t not in tags]
+                row.tags = ", ".join(merged) or None
+                row.updated_at = now
+                for name, value in updates.items():
+                    setattr(row, name, value)
+            self.model.objects.bulk_update(rows, update_fields)
+            changed += len(rows)
+        DataVersion.bump()
+        return changed
+
+    @admin.action(description="Bulk edit status / published / vendor / tags", permissions=["change"])
+    def bulk_edit_rows(self, request: HttpRequest, queryset):
+        select_across = request.POST.get("select_across") == "1"
+        if request.POST.get("apply"):
+            form = ProductUploadRowBulkEditForm(request.POST)
+            if form.is_valid():
+                changed = self._apply_bulk_edit(queryset, form.cleaned_data)
+                self.message_user(request, f"Updated {changed} rows.", level=messages.SUCCESS)
+                return None
+        else:
+            form = ProductUploadRowBulkEditForm()
+
+        selected = request.POST.getlist(helpers.ACTION_CHECKBOX_NAME)
+        if select_across:
+            # With "select all matching" the filter state travels in the changelist query
+            # string; one pk is kept only because the changelist refuses empty selections.
+            selected = selected[:1]
+
+        context = dict(
+            self.admin_site.each_context(request),
+            opts=self.model._meta,
+            title="Bulk edit ProductUploadRow rows",
+            form=form,
+            total=queryset.count(),
+            select_across=select_across,
+            selected=selected,
+            action_checkbox_name=helpers.ACTION_CHECKBOX_NAME,
+        )
+        return render(request, "admin/products/productuploadrow/bulk_edit.html", context)
+
     class Media:
-        js = ("products/admin_ai_generate.js",)
+        js = ("products/admin_ai_generate.js", "products/vendor_filter.js")
 
 
 @admin.register(Vendor)
 class VendorAdmin(admin.ModelAdmin):
     search_fields = ("name",)
     ordering = ("name",)
+
+    def delete_queryset(self, request, queryset):
+        # Rows lose their vendor through SET_NULL, which QuerySet.delete() does not signal.
+        super().delete_queryset(request, queryset)
+        DataVersion.bump()
+
+    def get_search_results(self, request, queryset, search_term):
+        # The vendor autocomplete on the row change form matches a name prefix over the
+        # LOWER(name) index instead of an icontains table scan; the changelist keeps
+        # substring search.
+        match = getattr(request, "resolver_match", None)
+        if match is not None and match.url_name == "autocomplete":
+            return Vendor.prefix_search(queryset, search_term), False
+        return super().get_search_results(request, queryset, search_term)
+
+
+@admin.register(HeaderAlias)
+class HeaderAliasAdmin(admin.ModelAdmin):
+    list_display = ("source_header", "target_column", "vendor", "filename_pattern", "created_at")
+    list_filter = ("vendor",)
+    search_fields = ("source_header", "target_column", "filename_pattern")
+    autocomplete_fields = ("vendor",)
+
+
+@admin.register(ImportBatch)
+class ImportBatchAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "source_name", "format", "row_count", "short_checksum", "rolled_back_at", "rows_link")
+    list_filter = ("format", ("rolled_back_at", admin.EmptyFieldListFilter))
+    search_fields = ("source_name", "checksum")
+    readonly_fields = ("source_name", "format", "row_count", "checksum", "created_at", "rolled_back_at")
+    actions = ("roll_back_batches",)
+
+    def has_add_permission(self, request):
+        return False
+
+    @admin.display(description="Checksum")
+    def short_checksum(self, obj):
+        return obj.checksum[:12]
+
+    @admin.display(description="Rows")
+    def rows_link(self, obj):
+        url = reverse("admin:products_productuploadrow_changelist")
+        return format_html('<a href="{}?import_batch={}">View rows</a>', url, obj.pk)
+
+    @admin.action(description="Roll back selected batches (delete their rows)", permissions=["delete"])
+    def roll_back_batches(self, request, queryset):
+        deleted = 0
+        batches = 0
+        for batch in queryset.filter(rolled_back_at__isnull=True):
+            with instrument("rollback", batch=batch.pk, source=batch.source_name) as job:
+                job.rows = batch.rollback()
+            deleted += job.rows
+            batches += 1
+        self.message_user(
+            request,
+            f"Rolled back {batches} batches ({deleted} rows deleted).",
+            level=messages.SUCCESS,
+        )
@@ -1,18 +1,85 @@
+import hashlib
 import json
 import logging
+import threading
+from concurrent.futures import Future
 
 from django.conf import settings
 
-try:
-    from langchain_core.messages import HumanMessage, SystemMessage
-    from langchain_ollama import ChatOllama
-except Exception:  # pragma: no cover - optional dependency
-    ChatOllama = None
-    HumanMessage = None
-    SystemMessage = None
+from .backends import load_backend, missing_message
+from .instrumentation import instrument, stage
+from .metrics import OLLAMA_COALESCED
 
 logger = logging.getLogger(__name__)
 
+SYSTEM_PROMPT = (
+    "You are a copywriter for ecommerce furniture listings. "
+    "Return only JSON with keys: description, seo_title, seo_description."
+)
+
+
+def _user_prompt(title: str) -> str:
+    return (
+        f"Title: {title}\n"
+        "Requirements:\n"
+        "- description is plain text with line breaks.\n"
+        '- First line: "Description"\n'
+        '- Second line: "FREE SHIPPING"\n'
+        "- Third line: blank\n"
+        "- Then 6 to 12 short lines of features; no bullets or numbering.\n"
+        "- Include the title in one line.\n"
+        "- seo_title is 70 characters or fewer.\n"
+        "- seo_description is 320 characters or fewer.\n"
+        "- Return only JSON."
+    )
+
+
+# Changes to the prompts change this, so coalesced results never cross prompt versions.
+_PROMPT_FINGERPRINT = hashlib.sha256((SYSTEM_PROMPT + _user_prompt("")).encode("utf-8")).hexdigest()[:16]
+
+CopyKey = tuple[str, str, str]
+
+
+def _copy_key(title: str) -> CopyKey:
+    """(model, whitespace-normalized title, prompt fingerprint)."""
+    return (getattr(settings, "OLLAMA_MODEL", "llama3.1"), " ".join(str(title).split()), _PROMPT_FINGERPRINT)
+
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller (the leader) runs the function; callers arriving while it is in
+    flight wait on the leader's future and get the same result (or exception).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[object, Future] = {}
+
+    def do(self, key, fn):
+        """Return ``(result, shared)``; ``shared`` is True when another caller's result was reused."""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+        if not leader:
+            return future.result(), True
+        try:
+            result = fn()
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+        return result, False
+
+
+_in_flight = SingleFlight()
+
 
 def _strip_code_fence(text: str) -> str:
     if not text.startswith("```"):
@@ -43,44 +110,29 @@ def _extract_json_object(text: str) -> dict | None:
 def _generate_product_copy(title: str) -> tuple[dict[str, str] | None, str | None]:
     if not title:
         return None, "Title is required."
-    if ChatOllama is None:
-        return None, "langchain-ollama is not installed."
+    # LangChain is heavy to import, so it is loaded on the first generation, not at startup.
+    ollama = load_backend("ollama")
+    if ollama is None:
+        return None, missing_message("ollama")
 
     model = getattr(settings, "OLLAMA_MODEL", "llama3.1")
     base_url = getattr(settings, "OLLAMA_BASE_URL", "http://localhost:11434")
     timeout = float(getattr(settings, "OLLAMA_TIMEOUT", 60))
 
-    system_prompt = (
-        "You are a copywriter for ecommerce furniture listings. "
-        "Return only JSON with keys: description, seo_title, seo_description."
-    )
-    user_prompt = (
-        f"Title: {title}\n"
-        "Requirements:\n"
-        "- description is plain text with line breaks.\n"
-        '- First line: "Description"\n'
-        '- Second line: "FREE SHIPPING"\n'
-        "- Third line: blank\n"
-        "- Then 6 to 12 short lines of features; no bullets or numbering.\n"
-        "- Include the title in one line.\n"
-        "- seo_title is 70 characters or fewer.\n"
-        "- seo_description is 320 characters or fewer.\n"
-        "- Return only JSON."
-    )
-
-    llm = ChatOllama(
+    llm = ollama.ChatOllama(
         model=model,
         base_url=base_url,
         timeout=timeout,
         temperature=0.4,
     )
     try:
-        response = llm.invoke(
-            [
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-            ]
-        )
+        with stage("ollama"):
+            response = llm.invoke(
+                [
+                    ollama.SystemMessage(content=SYSTEM_PROMPT),
+                    ollama.HumanMessage(content=_user_prompt(title)),
+                ]
+            )
     except Exception as exc:  # pragma: no cover - network/ollama errors
         logger.warning("Ollama request failed: %s", exc)
         return None, f"Ollama request failed: {exc}"
@@ -102,10 +154,32 @@ def _generate_product_copy(title: str) -> tuple[dict[str, str] | None, str | Non
     return result, None
 
 
+def _instrumented_generate(title: str) -> tuple[dict[str, str] | None, str | None]:
+    with instrument("ai", model=getattr(settings, "OLLAMA_MODEL", "llama3.1")) as job:
+        result, error = _generate_product_copy(title)
+        job.rows = 1 if result else 0
+        if error:
+            job.fields["error"] = error
+        return result, error
+
+
+def _coalesced_generate(title: str) -> tuple[dict[str, str] | None, str | None]:
+    """Identical generations already in flight (same model, title and prompt) are joined, not repeated.
+
+    The leader prompts with the normalized title, so every caller sharing the key gets copy
+    for the same text whichever of their spellings arrived first.
+    """
+    key = _copy_key(title)
+    (result, error), shared = _in_flight.do(key, lambda: _instrumented_generate(key[1]))
+    if shared:
+        OLLAMA_COALESCED.inc()
+    return (dict(result) if result else result), error
+
+
 def generate_product_copy(title: str) -> dict[str, str] | None:
-    result, _error = _generate_product_copy(title)
+    result, _error = _coalesced_generate(title)
     return result
 
 
 def generate_product_copy_with_error(title: str) -> tuple[dict[str, str] | None, str | None]:
-    return _generate_product_copy(title)
+    return _coalesced_generate(title)
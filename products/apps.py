@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class ProductsConfig(AppConfig):
     name = 'products'
+
+    def ready(self):
+        from .instrumentation import add_listener
+        from .metrics import record_job
+
+        add_listener(record_job)
@@ -0,0 +1,96 @@
+"""Optional backends (openpyxl, xlrd, xlwt, LangChain/Ollama), imported on first use.
+
+Importing them at module load made every ``manage.py`` run and worker boot pay for their
+import graphs; here they are only located (``find_spec``) until something needs them.
+"""
+
+from __future__ import annotations
+
+import importlib
+import importlib.util
+import threading
+from types import SimpleNamespace
+from typing import Any, Callable
+
+_MISSING = object()
+_lock = threading.Lock()
+_loaded: dict[str, Any] = {}
+_registry: dict[str, tuple[tuple[str, ...], Callable[[], Any], str]] = {}
+
+
+def register_backend(name: str, *, modules: tuple[str, ...], loader: Callable[[], Any], missing: str) -> None:
+    """Register ``loader`` for ``name``; ``modules`` are checked for availability without importing them."""
+    _registry[name] = (modules, loader, missing)
+    _loaded.pop(name, None)
+
+
+def _load_ollama() -> SimpleNamespace:
+    from langchain_core.messages import HumanMessage, SystemMessage
+    from langchain_ollama import ChatOllama
+
+    return SimpleNamespace(ChatOllama=ChatOllama, HumanMessage=HumanMessage, SystemMessage=SystemMessage)
+
+
+register_backend(
+    "openpyxl",
+    modules=("openpyxl",),
+    loader=lambda: importlib.import_module("openpyxl"),
+    missing="Excel import/export is not available (openpyxl is not installed).",
+)
+register_backend(
+    "xlrd",
+    modules=("xlrd",),
+    loader=lambda: importlib.import_module("xlrd"),
+    missing="XLS import is not available (xlrd is not installed).",
+)
+register_backend(
+    "xlwt",
+    modules=("xlwt",),
+    loader=lambda: importlib.import_module("xlwt"),
+    missing="Writing .xls files requires xlwt.",
+)
+register_backend(
+    "ollama",
+    modules=("langchain_core", "langchain_ollama"),
+    loader=_load_ollama,
+    missing="langchain-ollama is not installed.",
+)
+
+
+def backend_available(name: str) -> bool:
+    """True if the backend is loaded or importable; does not import it."""
+    loaded = _loaded.get(name)
+    if loaded is not None:
+        return loaded is not _MISSING
+    modules, _loader, _missing = _registry[name]
+    try:
+        return all(importlib.util.find_spec(module) is not None for module in modules)
+    except (ImportError, ValueError):
+        return False
+
+
+def load_backend(name: str) -> Any | None:
+    """Import the backend once (thread-safe) and return it, or None if it cannot be imported."""
+    backend = _loaded.get(name)
+    if backend is None:
+        with _lock:
+            backend = _loaded.get(name)
+            if backend is None:
+                _modules, loader, _missing = _registry[name]
+                try:
+                    backend = loader()
+                except Exception:
+                    backend = _MISSING
+                _loaded[name] = backend
+    return None if backend is _MISSING else backend
+
+
+def require_backend(name: str) -> Any:
+    backend = load_backend(name)
+    if backend is None:
+        raise RuntimeError(_registry[name][2])
+    return backend
+
+
+def missing_message(name: str) -> str:
+    return _registry[name][2]
@@ -0,0 +1,282 @@
+from __future__ import annotations
+
+import copy
+import csv
+import os
+import random
+import time
+from contextlib import contextmanager
+from typing import Any
+
+from django.apps import apps
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+
+from .backends import require_backend
+from .instrumentation import peak_rss_mb
+
+# Columns of the synthetic catalog; every one of them maps exactly onto a db_column.
+SYNTHETIC_HEADERS = [
+    "Title",
+    "URL handle",
+    "Description",
+    "Vendor",
+    "Type",
+    "Tags",
+    "Published on online store",
+    "Status",
+    "SKU",
+    "Barcode",
+    "Option1 name",
+    "Option1 value",
+    "Price",
+    "Compare-at price",
+    "Inventory quantity",
+    "Requires shipping",
+    "Product image URL",
+    "Variant image URL",
+]
+
+XLS_MAX_ROWS = 65535
+
+
+def synthetic_catalog_rows(
+    *,
+    rows: int,
+    vendors: int = 50,
+    images: int = 3,
+    variants: int = 3,
+    seed: int = 0,
+):
+    """Yield ``rows`` Shopify-style variant rows; ``variants`` consecutive rows share a handle."""
+    rng = random.Random(seed)
+    colors = ("Black", "Gray", "Oak", "Walnut", "White")
+    for i in range(rows):
+        product = i // max(1, variants)
+        handle = f"product-{product}"
+        image_urls = [f"https://cdn.example.com/{handle}/{n}.jpg" for n in range(max(0, images))]
+        yield [
+            f"Product {product}, {colors[product % len(colors)]}",
+            handle,
+            "<p>" + " ".join(rng.choice(("solid", "wood", "chest", "lamp", "soft", "steel")) for _ in range(30)) + "</p>",
+            f"Vendor {product % max(1, vendors)}",
+            rng.choice(("Chest", "Lamp", "Desk", "Sofa")),
+            ", ".join(rng.sample(("sale", "new", "eco", "bestseller", "indoor", "outdoor"), 2)),
+            "TRUE",
+            "active",
+            f"SKU-{i:08d}",
+            f"{rng.randrange(10**12, 10**13)}",
+            "Color",
+            colors[i % len(colors)],
+            f"{rng.randrange(500, 50000) / 100:.2f}",
+            f"{rng.randrange(50000, 90000) / 100:.2f}",
+            str(rng.randrange(0, 500)),
+            "TRUE",
+            "\n".join(image_urls),
+            image_urls[0] if image_urls else "",
+        ]
+
+
+def write_synthetic_catalog(path: str, *, fmt: str, rows: int, **options: Any) -> str:
+    """Write a synthetic catalog as CSV, XLSX or XLS (the latter needs xlwt and caps at 65535 rows)."""
+    data = synthetic_catalog_rows(rows=rows, **options)
+    if fmt == "csv":
+        with open(path, "w", encoding="utf-8", newline="") as handle:
+            writer = csv.writer(handle)
+            writer.writerow(SYNTHETIC_HEADERS)
+            writer.writerows(data)
+    elif fmt == "xlsx":
+        workbook = require_backend("openpyxl").Workbook(write_only=True)
+        sheet = workbook.create_sheet("Products")
+        sheet.append(SYNTHETIC_HEADERS)
+        for row in data:
+            sheet.append(row)
+        workbook.save(path)
+    elif fmt == "xls":
+        xlwt = require_backend("xlwt")
+        if rows > XLS_MAX_ROWS:
+            raise ValueError(f"XLS files hold at most {XLS_MAX_ROWS} data rows.")
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Products")
+        for col, header in enumerate(SYNTHETIC_HEADERS):
+            sheet.write(0, col, header)
+        for row_idx, row in enumerate(data, start=1):
+            for col, value in enumerate(row):
+                # TRUE/FALSE become boolean cells, as spreadsheet apps save them.
+                sheet.write(row_idx, col, value == "TRUE" if value in ("TRUE", "FALSE") else value)
+        workbook.save(path)
+    else:
+        raise ValueError(f"Unknown benchmark format: {fmt}")
+    return path
+
+
+def xls_row_extraction(path: str) -> dict[str, float]:
+    """Seconds to read every row of an .xls file's first sheet, per reader.
+
+    ``cell_objects`` is the former per-cell ``sheet.cell()`` loop; ``row_vectors`` is the
+    ``row_values``/``row_types`` reader ``import_xls_to_model`` uses. The BIFF parse, which
+    both share, is excluded.
+    """
+    from .excel_import import _iter_xls_rows
+
+    xlrd = require_backend("xlrd")
+    workbook = xlrd.open_workbook(path, on_demand=True)
+    try:
+        sheet = workbook.sheet_by_index(0)
+
+        def _cell_objects():
+            for row_idx in range(sheet.nrows):
+                values = []
+                for col_idx in range(sheet.ncols):
+                    cell = sheet.cell(row_idx, col_idx)
+                    value = cell.value
+                    if cell.ctype == xlrd.XL_CELL_DATE:
+                        try:
+                            value = xlrd.xldate.xldate_as_datetime(cell.value, workbook.datemode)
+                        except Exception:
+                            pass
+                    elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
+                        value = bool(cell.value)
+                    values.append(value)
+                yield values
+
+        timings: dict[str, float] = {}
+        for name, rows in (("cell_objects", _cell_objects()), ("row_vectors", _iter_xls_rows(sheet, workbook.datemode))):
+            start = time.perf_counter()
+            for _row in rows:
+                pass
+            timings[f"{name}_seconds"] = round(time.perf_counter() - start, 4)
+        return timings
+    finally:
+        workbook.release_resources()
+
+
+@contextmanager
+def scratch_database(workdir: str, *, using: str = DEFAULT_DB_ALIAS):
+    """Serve ``using`` from a freshly migrated throwaway database for the duration of the block.
+
+    The connection is swapped for one with the same engine and options, so the configured
+    database is never read, written or locked. SQLite gets a file in ``workdir``; other
+    engines get their test database, created and dropped as ``manage.py test`` does.
+    """
+    from django.core.management import call_command
+
+    original = connections[using]
+    scratch = original.__class__(copy.deepcopy(original.settings_dict), alias=using)
+    connections[using] = scratch
+    try:
+        if scratch.vendor == "sqlite":
+            scratch.settings_dict["NAME"] = os.path.join(workdir, "benchmark.sqlite3")
+            call_command("migrate", database=using, interactive=False, verbosity=0)
+            yield
+        else:
+            old_name = scratch.creation.create_test_db(verbosity=0, serialize=False)
+            try:
+                yield
+            finally:
+                scratch.creation.destroy_test_db(old_name, verbosity=0)
+    finally:
+        scratch.close()
+        connections[using] = original
+        # migrate filled the content type cache with the scratch database's primary keys.
+        if apps.is_installed("django.contrib.contenttypes"):
+            from django.contrib.contenttypes.models import ContentType
+
+            ContentType.objects.clear_cache()
+
+
+@contextmanager
+def measure(result: dict[str, Any], *, rows: int):
+    """Record wall time, rows/second, query count and peak RSS growth into ``result``.
+
+    The process peak RSS is a high-water mark, so ``rss_growth_mb`` is how far the stage
+    raised it; a stage that stays below an earlier peak reports 0.
+    """
+    queries = 0
+
+    def _count(execute, sql, params, many, context):
+        nonlocal queries
+        queries += 1
+        return execute(sql, params, many, context)
+
+    start_rss = peak_rss_mb()
+    start = time.perf_counter()
+    with connection.execute_wrapper(_count):
+        yield result
+    seconds = time.perf_counter() - start
+    result.update(
+        rows=rows,
+        seconds=round(seconds, 4),
+        rows_per_second=round(rows / seconds, 1) if seconds else None,
+        queries=queries,
+        rss_growth_mb=round(peak_rss_mb() - start_rss, 1),
+    )
+
+
+def _consume(response) -> int:
+    if getattr(response, "streaming", False):
+        return sum(len(chunk) for chunk in response.streaming_content)
+    return len(response.content)
+
+
+def run_benchmark(
+    *,
+    rows: int,
+    formats: tuple[str, ...] = ("csv", "xlsx", "xls"),
+    vendors: int = 50,
+    images: int = 3,
+    variants: int = 3,
+    seed: int = 0,
+    workdir: str,
+) -> dict[str, Any]:
+    """Generate synthetic files and time each import and both exports in a scratch database.
+
+    Each import runs against an emptied table, and the exports read the rows of the last
+    import. The scratch database (see ``scratch_database``) is dropped afterwards.
+    """
+    from .csv_export import queryset_to_shopify_csv_response
+    from .excel_import import import_csv_to_model, import_xls_to_model, import_xlsx_to_model
+    from .models import ProductUploadRow
+    from .xlsx_export import queryset_to_shopify_xlsx_response
+
+    def _import_csv(path: str) -> None:
+        with open(path, "rb") as handle:
+            import_csv_to_model(model=ProductUploadRow, file=handle)
+
+    # Workbooks are read from their path, as large uploads are (TemporaryUploadedFile).
+    importers = {
+        "csv": _import_csv,
+        "xlsx": lambda path: import_xlsx_to_model(model=ProductUploadRow, file=path),
+        "xls": lambda path: import_xls_to_model(model=ProductUploadRow, file=path),
+    }
+    report: dict[str, Any] = {
+        "parameters": {"rows": rows, "vendors": vendors, "images": images, "variants": variants, "seed": seed},
+        "imports": {},
+        "exports": {},
+    }
+    options = dict(vendors=vendors, images=images, variants=variants, seed=seed)
+
+    with scratch_database(workdir):
+        for fmt in formats:
+            fmt_rows = min(rows, XLS_MAX_ROWS) if fmt == "xls" else rows
+            path = os.path.join(workdir, f"catalog.{fmt}")
+            write_synthetic_catalog(path, fmt=fmt, rows=fmt_rows, **options)
+            result = {"file_bytes": os.path.getsize(path)}
+            ProductUploadRow.objects.all().delete()
+            with measure(result, rows=fmt_rows):
+                importers[fmt](path)
+            if fmt == "xls":
+                result["row_extraction"] = xls_row_extraction(path)
+            report["imports"][fmt] = result
+
+        row_count = ProductUploadRow.objects.count()
+        for fmt, export in (
+            ("csv", queryset_to_shopify_csv_response),
+            ("xlsx", queryset_to_shopify_xlsx_response),
+        ):
+            result: dict[str, Any] = {}
+            with measure(result, rows=row_count):
+                result["bytes"] = _consume(export(queryset=ProductUploadRow.objects.all()))
+            report["exports"][fmt] = result
+
+    report["peak_rss_mb"] = peak_rss_mb()
+    return report
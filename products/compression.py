@@ -0,0 +1,65 @@
+"""Incremental gzip/zip encoders for streamed exports; output is produced as input arrives."""
+
+from __future__ import annotations
+
+import zipfile
+import zlib
+from typing import Iterable, Iterator
+
+COMPRESSIONS = {"gz": "application/gzip", "zip": "application/zip"}
+
+
+class ZipStream:
+    """Write-only sink for ``zipfile``; ``drain()`` hands back what has been written so far.
+
+    ``zipfile`` sees an unseekable file and writes each member with a data descriptor,
+    so member sizes need not be known up front.
+    """
+
+    def __init__(self):
+        self._chunks: list[bytes] = []
+        self.size = 0
+
+    def write(self, data: bytes) -> int:
+        self._chunks.append(bytes(data))
+        self.size += len(data)
+        return len(data)
+
+    def flush(self) -> None:
+        pass
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks = []
+        self.size = 0
+        return data
+
+
+def iter_gzip(chunks: Iterable[str], *, encoding: str = "utf-8", level: int = 6) -> Iterator[bytes]:
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode(encoding))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def iter_zip(chunks: Iterable[str], *, member_name: str, encoding: str = "utf-8") -> Iterator[bytes]:
+    """A single-member zip archive of the text ``chunks``."""
+    sink = ZipStream()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        # force_zip64: the member size is unknown and large catalogs can pass 2 GiB.
+        with archive.open(member_name, "w", force_zip64=True) as member:
+            for chunk in chunks:
+                member.write(chunk.encode(encoding))
+                if sink.size:
+                    yield sink.drain()
+    yield sink.drain()
+
+
+def compress_stream(chunks: Iterable[str], *, compression: str | None, member_name: str) -> Iterable:
+    if compression == "gz":
+        return iter_gzip(chunks)
+    if compression == "zip":
+        return iter_zip(chunks, member_name=member_name)
+    return chunks
@@ -1,9 +1,14 @@
 import csv
 from datetime import datetime
 from pathlib import Path
+from typing import Any
 
 from django.conf import settings
-from django.http import HttpResponse
+from django.db.models import Prefetch
+from django.http import StreamingHttpResponse
+
+from .compression import COMPRESSIONS, compress_stream
+from .instrumentation import instrument, report_progress
 
 
 def _find_template_csv_path() -> Path | None:
@@ -80,23 +85,61 @@ def _shopify_cell_value(header: str, value):
     return str(value)
 
 
-def _split_image_values(value: str | None) -> list[str]:
-    """Split stored image URLs separated by commas or newlines."""
-    if value is None:
-        return []
-    cleaned = str(value).replace("\r\n", "\n").replace("\r", "\n")
-    parts: list[str] = []
-    for chunk in cleaned.split("\n"):
-        for piece in chunk.split(","):
-            item = piece.strip()
-            if item:
-                parts.append(item)
-    return parts
-
-
-def queryset_to_shopify_csv_response(*, queryset, filename_prefix: str = "shopify_products") -> HttpResponse:
+def _prefetch_images(queryset) -> tuple[Any, bool]:
+    """Attach an ordered image prefetch; with iterator(chunk_size=...) it runs once per chunk."""
+    related = {rel.get_accessor_name() for rel in queryset.model._meta.related_objects}
+    if "images" not in related:
+        return queryset, False
+    from .models import ProductImage
+
+    prefetch = Prefetch("images", queryset=ProductImage.objects.order_by("kind", "position", "pk"))
+    return queryset.prefetch_related(prefetch), True
+
+
+# Columns Shopify reads from the first row of a URL handle group only.
+PRODUCT_LEVEL_HEADERS = frozenset(
+    {
+        "Title",
+        "Description",
+        "Vendor",
+        "Product category",
+        "Type",
+        "Tags",
+        "Published on online store",
+        "Status",
+        "Option1 name",
+        "Option2 name",
+        "Option3 name",
+        "Gift card",
+        "SEO title",
+        "SEO description",
+        "Google Shopping / Google product category",
+        "Google Shopping / Gender",
+        "Google Shopping / Age group",
+        "Google Shopping / MPN",
+        "Google Shopping / AdWords Grouping",
+        "Google Shopping / AdWords labels",
+        "Google Shopping / Condition",
+        "Google Shopping / Custom product",
+        "Google Shopping / Custom label 0",
+        "Google Shopping / Custom label 1",
+        "Google Shopping / Custom label 2",
+        "Google Shopping / Custom label 3",
+        "Google Shopping / Custom label 4",
+    }
+)
+IMAGE_HEADERS = ("Product image URL", "Image position", "Image alt text")
+
+
+def iter_shopify_rows(queryset, headers: list[str]):
+    """Yield ``(objects, rows)`` per product, grouping variant rows that share a URL handle.
+
+    Rows are read with a single query ordered by ``(url_handle, pk)``, so only the current
+    group is held in memory. Product-level columns are written on the group's first row,
+    images of all variants are merged into one position sequence, and images beyond the
+    variant count get image-only rows. Rows without a handle are their own group.
+    """
     model = queryset.model
-    headers = get_shopify_headers(model)
 
     field_by_column: dict[str, str] = {}
     for field in model._meta.fields:
@@ -105,42 +148,138 @@ def queryset_to_shopify_csv_response(*, queryset, filename_prefix: str = "shopif
         column = getattr(field, "db_column", None) or str(field.verbose_name)
         field_by_column[column] = field.name
 
-    def _rows_for_obj(obj):
+    handle_field = "url_handle" if "url_handle" in field_by_column.values() else None
+    handle_header = next((h for h, f in field_by_column.items() if f == "url_handle"), None)
+    foreign_keys = [
+        f.name for f in model._meta.fields if f.many_to_one and f.name in field_by_column.values()
+    ]
+    queryset = queryset.select_related(*foreign_keys).order_by(*([handle_field] if handle_field else []), "pk")
+    queryset, has_images = _prefetch_images(queryset)
+    product_level = [h for h in headers if h in PRODUCT_LEVEL_HEADERS]
+
+    def _base_row(obj) -> dict[str, str]:
         base_row: dict[str, str] = {}
         for header in headers:
             field_name = field_by_column.get(header)
             value = getattr(obj, field_name) if field_name else ""
             base_row[header] = _shopify_cell_value(header, value)
+        return base_row
+
+    def _rows_for_group(objs) -> list[list[str]]:
+        if not has_images:
+            return [[_base_row(obj).get(h, "") for h in headers] for obj in objs]
+
+        merged_images = []
+        seen_urls: set[str] = set()
+        for obj in objs:
+            for image in obj.images.all():
+                if image.url not in seen_urls:
+                    seen_urls.add(image.url)
+                    merged_images.append(image)
+
+        rows: list[list[str]] = []
+        handle = ""
+        for idx, obj in enumerate(objs):
+            row_data = _base_row(obj)
+            if idx == 0:
+                handle = row_data.get(handle_header, "") if handle_header else ""
+            else:
+                for header in product_level:
+                    row_data[header] = ""
+            variant_image = next((image for image in obj.images.all() if image.kind == "variant"), None)
+            row_data["Variant image URL"] = variant_image.url if variant_image else ""
+            for header in IMAGE_HEADERS:
+                row_data[header] = ""
+            if idx < len(merged_images):
+                _fill_image(row_data, merged_images[idx], idx + 1)
+            rows.append([row_data.get(h, "") for h in headers])
+
+        for idx in range(len(objs), len(merged_images)):
+            row_data = {handle_header: handle} if handle_header else {}
+            _fill_image(row_data, merged_images[idx], idx + 1)
+            rows.append([row_data.get(h, "") for h in headers])
+        return rows
 
-        product_images = _split_image_values(base_row.get("Product image URL"))
-        variant_images = _split_image_values(base_row.get("Variant image URL"))
-        image_count = max(len(product_images), len(variant_images))
-
-        if image_count == 0:
-            yield [base_row.get(h, "") for h in headers]
-            return
-
-        handle_header = next((h for h, f in field_by_column.items() if f == "url_handle"), None)
-        for idx in range(image_count):
-            row_data = base_row.copy() if idx == 0 else {h: "" for h in headers}
-            if idx > 0 and handle_header:
-                row_data[handle_header] = base_row.get(handle_header, "")
-            row_data["Product image URL"] = product_images[idx] if idx < len(product_images) else ""
-            row_data["Variant image URL"] = variant_images[idx] if idx < len(variant_images) else ""
-            if "Image position" in headers:
-                row_data["Image position"] = str(idx + 1)
-            yield [row_data.get(h, "") for h in headers]
+    group: list[Any] = []
+    group_handle = None
+    for obj in queryset.iterator(chunk_size=2000):
+        handle = (getattr(obj, handle_field) or None) if handle_field else None
+        if group and (handle is None or handle != group_handle):
+            yield group, _rows_for_group(group)
+            group = []
+        group.append(obj)
+        group_handle = handle
+    if group:
+        yield group, _rows_for_group(group)
 
+
+def _fill_image(row_data: dict[str, str], image, position: int) -> None:
+    row_data["Product image URL"] = image.url
+    row_data["Image position"] = str(position)
+    row_data["Image alt text"] = image.alt_text or ""
+
+
+class _Echo:
+    """File-like object whose write() hands the formatted CSV line back to the caller."""
+
+    def write(self, value: str) -> str:
+        return value
+
+
+_STREAM_CHUNK_SIZE = 64 * 1024
+
+
+def iter_shopify_csv(queryset, *, on_complete=None):
+    """Yield the Shopify CSV for ``queryset`` in ~64 KiB text chunks without buffering the whole file.
+
+    ``on_complete(row_count)`` runs once the last chunk has been produced.
+    """
+    headers = get_shopify_headers(queryset.model)
+    writer = csv.writer(_Echo())
+    chunk: list[str] = [writer.writerow(headers)]
+    size = 0
+    row_count = 0
+    # Not activated: the generator is resumed by the server, outside any view context.
+    with instrument("export", activate=False, format="csv") as job:
+        for objs, rows in job.timed_iter(iter_shopify_rows(queryset, headers), "serialize"):
+            row_count += len(objs)
+            report_progress(len(objs))
+            with job.stage("write"):
+                for row in rows:
+                    line = writer.writerow(row)
+                    chunk.append(line)
+                    size += len(line)
+                    if size >= _STREAM_CHUNK_SIZE:
+                        job.rows = row_count
+                        yield "".join(chunk)
+                        chunk = []
+                        size = 0
+        job.rows = row_count
+        if chunk:
+            yield "".join(chunk)
+    if on_complete is not None:
+        on_complete(row_count)
+
+
+def csv_download_response(chunks, *, filename_prefix: str, compression: str | None = None) -> StreamingHttpResponse:
+    """Stream CSV ``chunks`` as a download, optionally gzip- or zip-compressed on the fly."""
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     filename = f"{filename_prefix}_{timestamp}.csv"
-
-    response = HttpResponse(content_type="text/csv; charset=utf-8")
+    if compression is None:
+        response = StreamingHttpResponse(chunks, content_type="text/csv; charset=utf-8")
+    else:
+        response = StreamingHttpResponse(
+            compress_stream(chunks, compression=compression, member_name=filename),
+            content_type=COMPRESSIONS[compression],
+        )
+        filename = f"{filename}.{compression}"
     response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
 
-    writer = csv.writer(response)
-    writer.writerow(headers)
-    for obj in queryset.iterator():
-        for row in _rows_for_obj(obj):
-            writer.writerow(row)
 
-    return response
+def queryset_to_shopify_csv_response(
+    *, queryset, filename_prefix: str = "shopify_products", on_complete=None, compression: str | None = None
+) -> StreamingHttpResponse:
+    return csv_download_response(
+        iter_shopify_csv(queryset, on_complete=on_complete), filename_prefix=filename_prefix, compression=compression
+    )
@@ -1,13 +1,24 @@
 from __future__ import annotations
 
+import csv
+import hashlib
+import io
+import os
+import shutil
+import tempfile
 from collections.abc import Iterable
+from contextlib import contextmanager
 from datetime import date, datetime
 from typing import Any
 
-from django.db import transaction
+from django.core.exceptions import FieldDoesNotExist
+from django.db import connections, router, transaction
 from django.utils import timezone
 from django.utils.text import slugify
 
+from .backends import require_backend
+from .instrumentation import current_job, instrument, report_progress, stage, timed_iter
+
 
 def _normalize_header(value: Any) -> str:
     if value is None:
@@ -36,6 +47,27 @@ def _normalize_title(value: str | None) -> str | None:
     return cleaned or None
 
 
+_BOOLEAN_VALUES = {
+    "true": True,
+    "t": True,
+    "yes": True,
+    "y": True,
+    "1": True,
+    "false": False,
+    "f": False,
+    "no": False,
+    "n": False,
+    "0": False,
+}
+
+
+def _normalize_boolean(value: str) -> bool | str | None:
+    """Map TRUE/FALSE style cells to bool; blank is None and anything else is returned unchanged."""
+    if not value:
+        return None
+    return _BOOLEAN_VALUES.get(value.lower(), value)
+
+
 def _db_column_to_field_name(model) -> dict[str, str]:
     mapping: dict[str, str] = {}
     for field in model._meta.fields:
@@ -48,13 +80,18 @@ def _db_column_to_field_name(model) -> dict[str, str]:
     return mapping
 
 
-def build_objects_from_rows(
+def iter_objects_from_rows(
     *,
     model,
     headers: list[str],
     rows: Iterable[list[Any]],
     fk_resolvers: dict[str, Any] | None = None,
+    extra_fields: dict[str, Any] | None = None,
 ):
+    """Lazily build unsaved model instances from row values; see build_objects_from_rows.
+
+    ``extra_fields`` (e.g. ``import_batch_id``) are set on every instance.
+    """
     db_column_to_field = _db_column_to_field_name(model)
     header_to_field: dict[int, str] = {}
     for idx, header in enumerate(headers):
@@ -62,8 +99,24 @@ def build_objects_from_rows(
         if field_name:
             header_to_field[idx] = field_name
 
+    fk_fields = {
+        field_name
+        for field_name in header_to_field.values()
+        if model._meta.get_field(field_name).many_to_one
+    }
+    boolean_fields = {
+        field_name
+        for field_name in header_to_field.values()
+        if model._meta.get_field(field_name).get_internal_type() == "BooleanField"
+    }
+    has_uploaded_at = "uploaded_at" in {f.name for f in model._meta.fields}
+    fk_resolvers = fk_resolvers or {}
+    job = current_job()
+    if job is not None:
+        rows = job.timed_iter(rows, "parse")
+        fk_resolvers = {name: _staged(job, resolver, "vendor_resolve") for name, resolver in fk_resolvers.items()}
+
     now = timezone.now()
-    objects = []
     for row_values in rows:
         data: dict[str, Any] = {}
         for col_idx, field_name in header_to_field.items():
@@ -71,14 +124,15 @@ def build_objects_from_rows(
                 continue
             value = _normalize_cell(row_values[col_idx])
             if value is not None:
-                model_field = model._meta.get_field(field_name)
-                if model_field.many_to_one and getattr(model_field, "remote_field", None):
-                    resolver = (fk_resolvers or {}).get(field_name)
+                if field_name in fk_fields:
+                    resolver = fk_resolvers.get(field_name)
                     if resolver:
                         resolved = resolver(value)
                         if resolved is not None:
                             data[field_name] = resolved
                     continue
+                if field_name in boolean_fields:
+                    value = _normalize_boolean(value)
                 data[field_name] = value
 
         title = _normalize_title(data.get("title"))
@@ -90,145 +144,433 @@ def build_objects_from_rows(
         if not data.get("url_handle") and title:
             data["url_handle"] = slugify(title)[:255]
 
-        if "uploaded_at" in {f.name for f in model._meta.fields} and "uploaded_at" not in data:
+        if has_uploaded_at and "uploaded_at" not in data:
             data["uploaded_at"] = now
+        if extra_fields:
+            data.update(extra_fields)
 
-        objects.append(model(**data))
-    return objects
-
+        yield model(**data)
 
-@transaction.atomic
-def import_xlsx_to_model(*, model, workbook, sheet_name: str | None = None) -> int:
-    if sheet_name:
-        sheet = workbook[sheet_name]
-    else:
-        sheet = workbook.active
 
-    rows_iter = sheet.iter_rows(values_only=True)
-    try:
-        header_row = next(rows_iter)
-    except StopIteration:
-        return 0
+def _staged(job, func, stage_name: str):
+    def wrapper(*args, **kwargs):
+        with job.stage(stage_name):
+            return func(*args, **kwargs)
 
-    headers = [_normalize_header(h) for h in header_row]
-    cleaned_rows = [list(r) for r in rows_iter]
+    return wrapper
 
-    fk_resolvers: dict[str, Any] = {}
-    try:
-        from .models import Vendor
 
-        def _vendor_resolver(v: Any):
-            name = _normalize_cell(v)
-            if not name:
-                return None
-            vendor, _created = Vendor.objects.get_or_create(name=name)
-            return vendor
-
-        fk_resolvers["vendor"] = _vendor_resolver
-    except Exception:
-        fk_resolvers = {}
-
-    objects = build_objects_from_rows(model=model, headers=headers, rows=cleaned_rows, fk_resolvers=fk_resolvers)
-    if not objects:
-        return 0
+def build_objects_from_rows(
+    *,
+    model,
+    headers: list[str],
+    rows: Iterable[list[Any]],
+    fk_resolvers: dict[str, Any] | None = None,
+):
+    return list(iter_objects_from_rows(model=model, headers=headers, rows=rows, fk_resolvers=fk_resolvers))
 
-    model.objects.bulk_create(objects, batch_size=1000)
-    return len(objects)
 
+def _default_fk_resolvers() -> dict[str, Any]:
+    from .models import Vendor
 
-@transaction.atomic
-def import_csv_to_model(*, model, file) -> int:
-    import csv
+    vendors: dict[str, Any] = {}
 
-    # `file` is typically an UploadedFile; ensure we read text with BOM support.
-    text = file.read().decode("utf-8-sig")
-    reader = csv.reader(text.splitlines())
+    def _vendor_resolver(v: Any):
+        name = _normalize_cell(v)
+        if not name:
+            return None
+        vendor = vendors.get(name)
+        if vendor is None:
+            vendor, _created = Vendor.objects.get_or_create(name=name)
+            vendors[name] = vendor
+        return vendor
 
-    try:
-        headers = next(reader)
-    except StopIteration:
-        return 0
+    return {"vendor": _vendor_resolver}
 
-    headers = [_normalize_header(h) for h in headers]
 
-    fk_resolvers: dict[str, Any] = {}
-    try:
-        from .models import Vendor
+def _copy_literal(value: Any) -> str:
+    # COPY ... (FORMAT csv): an unquoted empty field is NULL, a quoted one is "".
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return '"t"' if value else '"f"'
+    return '"' + str(value).replace('"', '""') + '"'
+
+
+def _allocate_pks(connection, model, objects: list[Any]) -> None:
+    # COPY cannot return generated keys, so draw them from the sequence up front.
+    pk = model._meta.pk
+    missing = [obj for obj in objects if obj.pk is None]
+    if not missing:
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT nextval(pg_get_serial_sequence(%s, %s)) FROM generate_series(1, %s)",
+            [model._meta.db_table, pk.column, len(missing)],
+        )
+        for obj, (value,) in zip(missing, cursor.fetchall()):
+            obj.pk = value
+            obj._state.adding = False
+
+
+def _copy_insert(connection, model, objects: list[Any]) -> None:
+    _allocate_pks(connection, model, objects)
+    fields = list(model._meta.concrete_fields)
+    lines: list[str] = []
+    for obj in objects:
+        values = [f.get_db_prep_save(f.pre_save(obj, add=True), connection) for f in fields]
+        lines.append(",".join(_copy_literal(v) for v in values))
+    payload = "\n".join(lines) + "\n"
+
+    quote = connection.ops.quote_name
+    columns = ", ".join(quote(f.column) for f in fields)
+    sql = f"COPY {quote(model._meta.db_table)} ({columns}) FROM STDIN WITH (FORMAT csv)"
+    with connection.cursor() as cursor:
+        raw_cursor = cursor.cursor
+        if hasattr(raw_cursor, "copy"):  # psycopg 3
+            with raw_cursor.copy(sql) as copy:
+                copy.write(payload)
+        else:  # psycopg2
+            raw_cursor.copy_expert(sql, io.StringIO(payload))
+
+
+def upsert_spec(model, headers: list[str], *, key: str = "sku") -> tuple[str, list[str]]:
+    """``(key, update_fields)`` for an upsert on ``key``: only columns present in the file are updated.
+
+    ``import_batch`` is left alone, so rolling back the upserting batch removes only the
+    rows it inserted.
+    """
+    mapped = {field for header, field in _db_column_to_field_name(model).items() if header in headers}
+    if key not in mapped:
+        column = model._meta.get_field(key).db_column or key
+        raise ValueError(f'Upsert needs a "{column}" column to match existing rows.')
+    update_fields = sorted(mapped - {key})
+    if any(f.name == "updated_at" for f in model._meta.fields):
+        update_fields.append("updated_at")
+    return key, update_fields
+
+
+def _dedupe_on(objects: list[Any], key: str) -> list[Any]:
+    # One statement may not update the same row twice; the last occurrence in the file wins.
+    latest: dict[Any, Any] = {}
+    keyless: list[Any] = []
+    for obj in objects:
+        value = getattr(obj, key)
+        if value in (None, ""):
+            keyless.append(obj)
+        else:
+            latest[value] = obj
+    return [*latest.values(), *keyless]
+
+
+def _bulk_insert(
+    model,
+    objects: list[Any],
+    *,
+    batch_size: int = 1000,
+    upsert: tuple[str, list[str]] | None = None,
+) -> None:
+    """Insert objects in batches, using COPY FROM STDIN on PostgreSQL and bulk_create elsewhere.
+
+    Inserted objects get their primary keys set, and child images (``build_images``) are
+    inserted the same way. With ``upsert=(key, update_fields)`` rows whose ``key`` already
+    exists are updated instead (``INSERT ... ON CONFLICT``; COPY cannot upsert).
+    """
+    connection = connections[router.db_for_write(model)]
+    rebuild_images = hasattr(model, "build_images")
+    if upsert is not None:
+        key, update_fields = upsert
+        objects = _dedupe_on(objects, key)
+        model.objects.bulk_create(
+            objects,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=[key],
+            update_fields=update_fields,
+        )
+        if rebuild_images:
+            from .models import IMAGE_FIELDS, ProductImage
+
+            # Without image columns in the file, updated rows keep their images and new rows have none.
+            rebuild_images = bool(IMAGE_FIELDS.intersection(update_fields))
+            if rebuild_images:
+                ProductImage.objects.filter(row_id__in=[obj.pk for obj in objects]).delete()
+    elif connection.vendor != "postgresql":
+        model.objects.bulk_create(objects, batch_size=batch_size)
+    else:
+        for start in range(0, len(objects), batch_size):
+            _copy_insert(connection, model, objects[start : start + batch_size])
 
-        def _vendor_resolver(v: Any):
-            name = _normalize_cell(v)
-            if not name:
-                return None
-            vendor, _created = Vendor.objects.get_or_create(name=name)
-            return vendor
+    if rebuild_images:
+        from .models import ProductImage
 
-        fk_resolvers["vendor"] = _vendor_resolver
-    except Exception:
-        fk_resolvers = {}
+        images = [image for obj in objects for image in obj.build_images()]
+        if images:
+            _bulk_insert(ProductImage, images, batch_size=batch_size)
 
-    rows = list(reader)
 
-    objects = build_objects_from_rows(model=model, headers=headers, rows=rows, fk_resolvers=fk_resolvers)
-    if not objects:
-        return 0
+def _insert_in_batches(
+    model,
+    objects: Iterable[Any],
+    *,
+    batch_size: int = 1000,
+    upsert: tuple[str, list[str]] | None = None,
+) -> int:
+    count = 0
+    batch: list[Any] = []
+    for obj in timed_iter(objects, "normalize"):
+        batch.append(obj)
+        if len(batch) >= batch_size:
+            with stage("insert"):
+                _bulk_insert(model, batch, batch_size=batch_size, upsert=upsert)
+            count += len(batch)
+            report_progress(len(batch))
+            batch = []
+    if batch:
+        with stage("insert"):
+            _bulk_insert(model, batch, batch_size=batch_size, upsert=upsert)
+        count += len(batch)
+        report_progress(len(batch))
+    if count:
+        from .models import DataVersion
+
+        DataVersion.bump()
+    return count
+
+
+@contextmanager
+def _spooled_path(file):
+    """Yield a filesystem path holding the upload's bytes, copying it to a temp file only if needed."""
+    if isinstance(file, (str, os.PathLike)):
+        yield os.fspath(file)
+        return
+    temporary_file_path = getattr(file, "temporary_file_path", None)
+    if temporary_file_path is not None:
+        yield temporary_file_path()
+        return
+
+    suffix = os.path.splitext(getattr(file, "name", "") or "")[1]
+    with tempfile.NamedTemporaryFile(suffix=suffix) as spool:
+        if hasattr(file, "chunks"):
+            for chunk in file.chunks():
+                spool.write(chunk)
+        else:
+            shutil.copyfileobj(file, spool, 1024 * 1024)
+        spool.flush()
+        yield spool.name
+
+
+def import_format(filename: str | None) -> str | None:
+    """Return "csv", "xlsx" or "xls" for a supported upload name, else None."""
+    name = (filename or "").lower()
+    for fmt in ("csv", "xlsx", "xls"):
+        if name.endswith(f".{fmt}"):
+            return fmt
+    return None
+
+
+@contextmanager
+def _csv_rows(file):
+    # Decode incrementally (with BOM support) instead of reading the whole upload into memory.
+    raw = getattr(file, "file", file)
+    if hasattr(raw, "seek"):
+        raw.seek(0)
+    text = io.TextIOWrapper(raw, encoding="utf-8-sig", newline="")
+    try:
+        reader = csv.reader(text)
+        header_row = next(reader, None)
+        headers = [_normalize_header(h) for h in header_row] if header_row is not None else None
+        yield headers, reader
+    finally:
+        text.detach()
+
+
+@contextmanager
+def _xlsx_rows(*, file=None, workbook=None, sheet_name: str | None = None):
+    if workbook is None:
+        openpyxl = require_backend("openpyxl")
+        with _spooled_path(file) as path:
+            workbook = openpyxl.load_workbook(path, read_only=True, data_only=True)
+            try:
+                with _xlsx_rows(workbook=workbook, sheet_name=sheet_name) as result:
+                    yield result
+            finally:
+                workbook.close()
+        return
+
+    sheet = workbook[sheet_name] if sheet_name else workbook.active
+    rows_iter = sheet.iter_rows(values_only=True)
+    header_row = next(rows_iter, None)
+    headers = [_normalize_header(h) for h in header_row] if header_row is not None else None
+    yield headers, rows_iter
+
+
+def _iter_xls_rows(sheet, datemode: int):
+    """Yield each sheet row as a value list, converting only the columns whose type vector is date/bool.
+
+    Rows of a sheet nearly always share one type vector, so the list of columns to convert
+    is recomputed only when the vector changes.
+    """
+    xlrd = require_backend("xlrd")
+
+    special_types = {xlrd.XL_CELL_DATE, xlrd.XL_CELL_BOOLEAN}
+    last_types = None
+    special_columns: list[tuple[int, int]] = []
+    for row_idx in range(sheet.nrows):
+        values = sheet.row_values(row_idx)
+        types = sheet.row_types(row_idx)
+        if types != last_types:
+            special_columns = [(idx, ctype) for idx, ctype in enumerate(types) if ctype in special_types]
+            last_types = types
+        for col_idx, ctype in special_columns:
+            if ctype == xlrd.XL_CELL_BOOLEAN:
+                values[col_idx] = bool(values[col_idx])
+                continue
+            try:
+                values[col_idx] = xlrd.xldate.xldate_as_datetime(values[col_idx], datemode)
+            except Exception:
+                pass
+        yield values
+
+
+@contextmanager
+def _xls_rows(*, file, sheet_name: str | None = None):
+    xlrd = require_backend("xlrd")
+    with _spooled_path(file) as path:
+        # on_demand=True parses only the requested sheet; xlrd mmaps the file itself.
+        workbook = xlrd.open_workbook(path, on_demand=True)
+        try:
+            sheet = workbook.sheet_by_name(sheet_name) if sheet_name else workbook.sheet_by_index(0)
+            rows_iter = _iter_xls_rows(sheet, workbook.datemode)
+            header_row = next(rows_iter, None)
+            headers = [_normalize_header(v) for v in header_row] if header_row is not None else None
+            yield headers, rows_iter
+        finally:
+            workbook.release_resources()
+
+
+@contextmanager
+def open_import_rows(file, *, sheet_name: str | None = None):
+    """Open a CSV/XLSX/XLS upload or path and yield ``(headers, rows)``; ``headers`` is None for an empty sheet."""
+    is_path = isinstance(file, (str, os.PathLike))
+    fmt = import_format(os.fspath(file) if is_path else getattr(file, "name", None))
+    if fmt == "csv" and is_path:
+        with open(file, "rb") as handle, _csv_rows(handle) as result:
+            yield result
+        return
+    if fmt == "csv":
+        context = _csv_rows(file)
+    elif fmt == "xlsx":
+        context = _xlsx_rows(file=file, sheet_name=sheet_name)
+    elif fmt == "xls":
+        context = _xls_rows(file=file, sheet_name=sheet_name)
+    else:
+        raise ValueError("Please upload a .csv, .xlsx, or .xls file.")
+    with context as result:
+        yield result
+
+
+def _file_checksum(file) -> str:
+    """SHA-256 of an upload, file object or path; file objects are rewound afterwards."""
+    digest = hashlib.sha256()
+    if isinstance(file, (str, os.PathLike)):
+        with open(file, "rb") as handle:
+            while chunk := handle.read(1024 * 1024):
+                digest.update(chunk)
+    elif hasattr(file, "chunks"):
+        for chunk in file.chunks():
+            digest.update(chunk)
+        file.seek(0)
+    else:
+        file.seek(0)
+        while chunk := file.read(1024 * 1024):
+            digest.update(chunk)
+        file.seek(0)
+    return digest.hexdigest()
 
-    model.objects.bulk_create(objects, batch_size=1000)
-    return len(objects)
 
+def start_import_batch(model, *, source_name: str | None, fmt: str, file=None, checksum: str | None = None):
+    """Create the ImportBatch that rows of ``model`` will point at, or None if the model has no batch FK.
 
-@transaction.atomic
-def import_xls_to_model(*, model, file, sheet_name: str | None = None) -> int:
+    ``checksum`` defaults to the SHA-256 of ``file``.
+    """
     try:
-        import xlrd
-    except Exception as exc:  # pragma: no cover
-        raise RuntimeError("XLS import is not available (xlrd is not installed).") from exc
-
-    workbook = xlrd.open_workbook(file_contents=file.read())
+        field = model._meta.get_field("import_batch")
+    except FieldDoesNotExist:
+        return None
+    return field.remote_field.model.objects.create(
+        source_name=(source_name or "")[:255],
+        format=fmt,
+        checksum=checksum if checksum is not None else (_file_checksum(file) if file is not None else ""),
+    )
 
-    if sheet_name:
-        sheet = workbook.sheet_by_name(sheet_name)
-    else:
-        sheet = workbook.sheet_by_index(0)
 
-    if sheet.nrows <= 0:
+def _import_rows(
+    *,
+    model,
+    headers: list[str] | None,
+    rows: Iterable[list[Any]],
+    source_name: str | None = None,
+    vendor=None,
+    batch=None,
+) -> int:
+    if headers is None:
         return 0
+    from .header_mapping import map_headers
+
+    headers = map_headers(model, headers, source_name=source_name, vendor=vendor)
+    objects = iter_objects_from_rows(
+        model=model,
+        headers=headers,
+        rows=rows,
+        fk_resolvers=_default_fk_resolvers(),
+        extra_fields={"import_batch_id": batch.pk} if batch is not None else None,
+    )
+    count = _insert_in_batches(model, objects, batch_size=1000)
+    if batch is not None:
+        batch.row_count = count
+        batch.save(update_fields=["row_count"])
+    return count
 
-    def _row_values(row_idx: int) -> list[Any]:
-        values: list[Any] = []
-        for col_idx in range(sheet.ncols):
-            cell = sheet.cell(row_idx, col_idx)
-            value: Any = cell.value
-            if cell.ctype == xlrd.XL_CELL_DATE:
-                try:
-                    value = xlrd.xldate.xldate_as_datetime(cell.value, workbook.datemode)
-                except Exception:
-                    value = cell.value
-            elif cell.ctype == xlrd.XL_CELL_BOOLEAN:
-                value = bool(cell.value)
-            values.append(value)
-        return values
-
-    headers = [_normalize_header(v) for v in _row_values(0)]
-    rows = [_row_values(i) for i in range(1, sheet.nrows)]
-
-    fk_resolvers: dict[str, Any] = {}
-    try:
-        from .models import Vendor
 
-        def _vendor_resolver(v: Any):
-            name = _normalize_cell(v)
-            if not name:
-                return None
-            vendor, _created = Vendor.objects.get_or_create(name=name)
-            return vendor
+@transaction.atomic
+def import_xlsx_to_model(*, model, workbook=None, file=None, sheet_name: str | None = None, vendor=None) -> int:
+    """Import an XLSX sheet, streaming ``iter_rows`` straight into batched inserts.
+
+    Pass ``file`` (an upload or file object) to have it spooled to disk and read through a
+    file-backed read-only workbook; ``workbook`` accepts an already opened workbook.
+    ``vendor`` selects vendor-scoped learned header aliases.
+    """
+    source_name = getattr(file, "name", None)
+    with instrument("import", format="xlsx", source=source_name) as job:
+        # The checksum pass reads the upload before any parser has buffered from it.
+        batch = start_import_batch(model, source_name=source_name, fmt="xlsx", file=file)
+        with _xlsx_rows(file=file, workbook=workbook, sheet_name=sheet_name) as (headers, rows):
+            job.rows = _import_rows(
+                model=model, headers=headers, rows=rows, source_name=source_name, vendor=vendor, batch=batch
+            )
+        return job.rows
 
-        fk_resolvers["vendor"] = _vendor_resolver
-    except Exception:
-        fk_resolvers = {}
 
-    objects = build_objects_from_rows(model=model, headers=headers, rows=rows, fk_resolvers=fk_resolvers)
-    if not objects:
-        return 0
+@transaction.atomic
+def import_csv_to_model(*, model, file, vendor=None) -> int:
+    source_name = getattr(file, "name", None)
+    with instrument("import", format="csv", source=source_name) as job:
+        batch = start_import_batch(model, source_name=source_name, fmt="csv", file=file)
+        with _csv_rows(file) as (headers, rows):
+            job.rows = _import_rows(
+                model=model, headers=headers, rows=rows, source_name=source_name, vendor=vendor, batch=batch
+            )
+        return job.rows
+
 
-    model.objects.bulk_create(objects, batch_size=1000)
-    return len(objects)
+@transaction.atomic
+def import_xls_to_model(*, model, file, sheet_name: str | None = None, vendor=None) -> int:
+    source_name = getattr(file, "name", None)
+    with instrument("import", format="xls", source=source_name) as job:
+        batch = start_import_batch(model, source_name=source_name, fmt="xls", file=file)
+        with _xls_rows(file=file, sheet_name=sheet_name) as (headers, rows):
+            job.rows = _import_rows(
+                model=model, headers=headers, rows=rows, source_name=source_name, vendor=vendor, batch=batch
+            )
+        return job.rows
@@ -0,0 +1,144 @@
+"""On-disk cache of export downloads, keyed by format, filter state, header template and data version.
+
+Repeat downloads of the same filtered export are served from the stored file with
+``FileResponse``. A first download still streams: its bytes are copied into a temp file
+as they go out and the file is moved into place only if the response completed. The
+directory is kept under ``PRODUCTS_EXPORT_CACHE_BYTES`` by evicting the least recently
+used files (served files get their mtime refreshed).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import tempfile
+from datetime import datetime
+
+from django.conf import settings
+from django.http import FileResponse
+
+from .compression import COMPRESSIONS
+from .csv_export import get_shopify_headers
+
+CONTENT_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "csv.gz": COMPRESSIONS["gz"],
+    "csv.zip": COMPRESSIONS["zip"],
+    "csv-split": "application/zip",
+    "xlsx": "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+EXPORT_FORMATS = frozenset(CONTENT_TYPES)
+_SUFFIXES = {"csv-split": "_parts.zip"}
+_IGNORED_PARAMS = frozenset({"p", "o"})  # Pagination and changelist ordering do not change an export.
+
+
+def export_filename(prefix: str, fmt: str) -> str:
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    return f"{prefix}_{timestamp}{_SUFFIXES.get(fmt, '.' + fmt)}"
+
+
+def cache_dir() -> str | None:
+    return getattr(settings, "PRODUCTS_EXPORT_CACHE_DIR", "") or None
+
+
+def cache_limit() -> int:
+    return int(getattr(settings, "PRODUCTS_EXPORT_CACHE_BYTES", 0) or 0)
+
+
+def cache_enabled() -> bool:
+    return bool(cache_dir()) and cache_limit() > 0
+
+
+def export_cache_key(model, *, fmt: str, params) -> str:
+    """``params`` is the changelist query (a QueryDict) without export-only parameters."""
+    from .models import DataVersion
+
+    filters = sorted(
+        (name, sorted(value for value in params.getlist(name) if value))
+        for name in params
+        if name not in _IGNORED_PARAMS
+    )
+    payload = {
+        "format": fmt,
+        "filters": [item for item in filters if item[1]],
+        "headers": hashlib.sha256("\x1f".join(get_shopify_headers(model)).encode("utf-8")).hexdigest(),
+        "data_version": DataVersion.current(),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def _path(key: str) -> str:
+    return os.path.join(cache_dir(), f"{key}.export")
+
+
+def cached_response(key: str, *, fmt: str, filename: str) -> FileResponse | None:
+    path = _path(key)
+    try:
+        handle = open(path, "rb")
+    except FileNotFoundError:
+        return None
+    try:
+        os.utime(path)
+    except OSError:  # pragma: no cover - evicted after opening; the open handle still reads
+        pass
+    response = FileResponse(handle, as_attachment=True, filename=filename, content_type=CONTENT_TYPES[fmt])
+    response["X-Export-Cache"] = "hit"
+    return response
+
+
+def evict(*, keep_bytes: int | None = None) -> int:
+    """Remove least recently used files until the cache fits; returns the number removed."""
+    limit = cache_limit() if keep_bytes is None else keep_bytes
+    directory = cache_dir()
+    entries = []
+    with os.scandir(directory) as scan:
+        for entry in scan:
+            if entry.is_file() and entry.name.endswith(".export"):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    total = sum(size for _mtime, size, _path in entries)
+    removed = 0
+    for _mtime, size, path in sorted(entries):
+        if total <= limit:
+            break
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def _tee(chunks, key: str):
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir(), prefix=".partial_")
+    completed = False
+    try:
+        with os.fdopen(fd, "wb") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                yield chunk
+        completed = True
+    finally:
+        if completed:
+            os.replace(tmp_path, _path(key))
+            evict()
+        else:
+            # Aborted downloads are never cached.
+            os.unlink(tmp_path)
+
+
+def store_response(response, *, key: str):
+    """Copy ``response`` into the cache as it is sent; returns the response to send."""
+    os.makedirs(cache_dir(), exist_ok=True)
+    response["X-Export-Cache"] = "miss"
+    if getattr(response, "streaming", False):
+        response.streaming_content = _tee(response.streaming_content, key)
+        return response
+    fd, tmp_path = tempfile.mkstemp(dir=cache_dir(), prefix=".partial_")
+    with os.fdopen(fd, "wb") as handle:
+        handle.write(response.content)
+    os.replace(tmp_path, _path(key))
+    evict()
+    return response
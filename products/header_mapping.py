@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import difflib
+import fnmatch
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from django.core.cache import cache
+
+# Header spellings used by Shopify's own product CSV and common supplier sheets, keyed by
+# their normalized form (see normalize_header_key) and pointing at our db_column names.
+SHOPIFY_HEADER_ALIASES: dict[str, str] = {
+    "handle": "URL handle",
+    "url handle": "URL handle",
+    "product handle": "URL handle",
+    "body html": "Description",
+    "body": "Description",
+    "description html": "Description",
+    "product title": "Title",
+    "name": "Title",
+    "product name": "Title",
+    "vendor": "Vendor",
+    "brand": "Vendor",
+    "supplier": "Vendor",
+    "product category": "Product category",
+    "type": "Type",
+    "product type": "Type",
+    "published": "Published on online store",
+    "variant sku": "SKU",
+    "sku": "SKU",
+    "variant barcode": "Barcode",
+    "ean": "Barcode",
+    "upc": "Barcode",
+    "gtin": "Barcode",
+    "variant price": "Price",
+    "variant compare at price": "Compare-at price",
+    "compare at price": "Compare-at price",
+    "variant grams": "Weight value (grams)",
+    "weight grams": "Weight value (grams)",
+    "variant weight unit": "Weight unit for display",
+    "variant inventory tracker": "Inventory tracker",
+    "variant inventory qty": "Inventory quantity",
+    "inventory qty": "Inventory quantity",
+    "quantity": "Inventory quantity",
+    "variant fulfillment service": "Fulfillment service",
+    "variant requires shipping": "Requires shipping",
+    "variant taxable": "Charge tax",
+    "variant tax code": "Tax code",
+    "image src": "Product image URL",
+    "image url": "Product image URL",
+    "image": "Product image URL",
+    "variant image": "Variant image URL",
+    "option1 name": "Option1 name",
+    "option1 value": "Option1 value",
+    "option2 name": "Option2 name",
+    "option2 value": "Option2 value",
+    "option3 name": "Option3 name",
+    "option3 value": "Option3 value",
+}
+
+_FUZZY_CUTOFF = 0.85
+_LEARNED_CACHE_KEY = "products:header-aliases"
+_LEARNED_CACHE_TIMEOUT = 300
+
+EXACT = "exact"
+LEARNED = "learned"
+ALIAS = "alias"
+NORMALIZED = "normalized"
+FUZZY = "fuzzy"
+
+
+@dataclass
+class HeaderMatch:
+    header: str
+    column: str | None
+    method: str = ""
+
+
+def normalize_header_key(value: Any) -> str:
+    """Lowercase and collapse punctuation/whitespace: ``" Body (HTML) "`` -> ``"body html"``."""
+    return re.sub(r"[^a-z0-9]+", " ", str(value or "").lower()).strip()
+
+
+def clear_learned_alias_cache() -> None:
+    cache.delete(_LEARNED_CACHE_KEY)
+
+
+def _learned_aliases() -> list[tuple[int | None, str, str, str]]:
+    rules = cache.get(_LEARNED_CACHE_KEY)
+    if rules is None:
+        from .models import HeaderAlias
+
+        rules = list(
+            HeaderAlias.objects.values_list("vendor_id", "filename_pattern", "source_header", "target_column")
+        )
+        cache.set(_LEARNED_CACHE_KEY, rules, _LEARNED_CACHE_TIMEOUT)
+    return rules
+
+
+def _learned_for(source_name: str | None, vendor_id: int | None) -> dict[str, str]:
+    """Learned aliases that apply to this upload; vendor- and pattern-scoped rules win over global ones."""
+    name = (source_name or "").lower()
+    ranked: dict[str, tuple[int, str]] = {}
+    for rule_vendor_id, pattern, source_header, target_column in _learned_aliases():
+        if rule_vendor_id is not None and rule_vendor_id != vendor_id:
+            continue
+        if pattern and not fnmatch.fnmatch(name, pattern.lower()):
+            continue
+        rank = (rule_vendor_id is not None) * 2 + bool(pattern)
+        if source_header not in ranked or rank >= ranked[source_header][0]:
+            ranked[source_header] = (rank, target_column)
+    return {source_header: target for source_header, (_rank, target) in ranked.items()}
+
+
+def resolve_headers(
+    model,
+    headers: list[str],
+    *,
+    source_name: str | None = None,
+    vendor=None,
+) -> list[HeaderMatch]:
+    """Match each header to a db_column once per file.
+
+    Order: exact db_column, learned alias, built-in alias, normalized db_column, then a
+    fuzzy match for whatever is left. A column is only claimed once (except exact matches).
+    """
+    from .excel_import import _db_column_to_field_name
+
+    columns = list(_db_column_to_field_name(model))
+    column_set = set(columns)
+    by_key = {normalize_header_key(column): column for column in columns}
+    learned = _learned_for(source_name, getattr(vendor, "pk", vendor))
+
+    matches = [HeaderMatch(header=header, column=None) for header in headers]
+    claimed: set[str] = set()
+    for match in matches:
+        if match.header in column_set:
+            match.column, match.method = match.header, EXACT
+            claimed.add(match.header)
+
+    for match in matches:
+        if match.method or not match.header:
+            continue
+        key = normalize_header_key(match.header)
+        if key in learned:
+            candidate, method = learned[key] or None, LEARNED
+        elif SHOPIFY_HEADER_ALIASES.get(key) in column_set:
+            candidate, method = SHOPIFY_HEADER_ALIASES[key], ALIAS
+        elif key in by_key:
+            candidate, method = by_key[key], NORMALIZED
+        else:
+            continue
+        if candidate is None:
+            match.method = LEARNED
+        elif candidate not in claimed:
+            match.column, match.method = candidate, method
+            claimed.add(candidate)
+
+    fuzzy_pool = {**{k: v for k, v in SHOPIFY_HEADER_ALIASES.items() if v in column_set}, **by_key}
+    for match in matches:
+        if match.method or not match.header:
+            continue
+        close = difflib.get_close_matches(normalize_header_key(match.header), list(fuzzy_pool), n=1, cutoff=_FUZZY_CUTOFF)
+        if close and fuzzy_pool[close[0]] not in claimed:
+            match.column, match.method = fuzzy_pool[close[0]], FUZZY
+            claimed.add(match.column)
+    return matches
+
+
+def map_headers(
+    model,
+    headers: list[str] | None,
+    *,
+    source_name: str | None = None,
+    vendor=None,
+) -> list[str] | None:
+    """Rewrite headers to their db_column names; unmatched headers are kept, ignored ones blanked."""
+    if headers is None:
+        return None
+    return [
+        match.column if match.column else ("" if match.method == LEARNED else match.header)
+        for match in resolve_headers(model, headers, source_name=source_name, vendor=vendor)
+    ]
@@ -0,0 +1,150 @@
+from __future__ import annotations
+
+import csv
+import io
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from typing import Any
+
+from django.db import connections, router
+
+from .excel_import import _db_column_to_field_name, _normalize_boolean, _normalize_cell, open_import_rows
+from .header_mapping import map_headers
+
+
+@dataclass
+class ImportIssue:
+    row: int
+    column: str
+    value: str
+    message: str
+
+
+@dataclass
+class ImportReport:
+    row_count: int = 0
+    mapped_columns: list[str] = field(default_factory=list)
+    unmapped_columns: list[str] = field(default_factory=list)
+    issues: list[ImportIssue] = field(default_factory=list)
+    issue_count: int = 0
+    max_issues: int = 10000
+
+    @property
+    def ok(self) -> bool:
+        return self.issue_count == 0
+
+    def add(self, row: int, column: str, value: Any, message: str) -> None:
+        self.issue_count += 1
+        if len(self.issues) < self.max_issues:
+            self.issues.append(ImportIssue(row=row, column=column, value=str(value), message=message))
+
+    def as_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.writer(output)
+        writer.writerow(["Row", "Column", "Value", "Problem"])
+        for column in self.unmapped_columns:
+            writer.writerow([1, column, "", "Header does not match any Shopify column; values will be ignored."])
+        for issue in self.issues:
+            writer.writerow([issue.row, issue.column, issue.value, issue.message])
+        if self.issue_count > len(self.issues):
+            writer.writerow(["", "", "", f"{self.issue_count - len(self.issues)} more problems not listed."])
+        return output.getvalue()
+
+
+def validate_import_rows(
+    *,
+    model,
+    headers: list[str] | None,
+    rows: Iterable[list[Any]],
+    batch_size: int = 500,
+) -> ImportReport:
+    """Validate rows in one pass without writing anything.
+
+    Only constrained columns are inspected: max_length, boolean, unique (duplicates inside
+    the file and, in batched ``IN`` lookups, against the database) and FK name lengths.
+    """
+    report = ImportReport()
+    if headers is None:
+        return report
+
+    db_column_to_field = _db_column_to_field_name(model)
+    # (index, header, max_length, is_boolean, unique field name) for each constrained column.
+    columns: list[tuple[int, str, int | None, bool, str | None]] = []
+    for idx, header in enumerate(headers):
+        field_name = db_column_to_field.get(header)
+        if not field_name:
+            if header:
+                report.unmapped_columns.append(header)
+            continue
+        report.mapped_columns.append(header)
+        model_field = model._meta.get_field(field_name)
+        if model_field.many_to_one:
+            target = model_field.remote_field.model
+            name_field = next((f for f in target._meta.fields if f.name == "name"), None)
+            if name_field is not None and name_field.max_length:
+                columns.append((idx, header, name_field.max_length, False, None))
+            continue
+        max_length = getattr(model_field, "max_length", None)
+        is_boolean = model_field.get_internal_type() == "BooleanField"
+        unique_field = field_name if model_field.unique else None
+        if max_length or is_boolean or unique_field:
+            columns.append((idx, header, max_length, is_boolean, unique_field))
+
+    connection = connections[router.db_for_read(model)]
+    quote = connection.ops.quote_name
+    seen: dict[str, dict[str, int]] = {}
+    pending: dict[str, list[tuple[str, int, str]]] = {}
+
+    def _flush(field_name: str) -> None:
+        batch = pending.pop(field_name, [])
+        if not batch:
+            return
+        values = list({value for value, _row, _column in batch})
+        # Plain SQL: the ORM's per-value lookup preparation dominated on large files.
+        column_name = quote(model._meta.get_field(field_name).column)
+        placeholders = ", ".join(["%s"] * len(values))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {column_name} FROM {quote(model._meta.db_table)} WHERE {column_name} IN ({placeholders})",
+                values,
+            )
+            existing = {row[0] for row in cursor.fetchall()}
+        for value, row_number, column in batch:
+            if value in existing:
+                report.add(row_number, column, value, "Value already exists in the database.")
+
+    row_number = 1
+    for row_number, row_values in enumerate(rows, start=2):
+        width = len(row_values)
+        for idx, column, max_length, is_boolean, unique_field in columns:
+            if idx >= width:
+                continue
+            raw = row_values[idx]
+            value = raw.strip() if type(raw) is str else _normalize_cell(raw)
+            if not value:
+                continue
+            if max_length and len(value) > max_length:
+                report.add(row_number, column, value, f"Longer than {max_length} characters ({len(value)}).")
+            if is_boolean and not isinstance(_normalize_boolean(value), bool):
+                report.add(row_number, column, value, "Expected TRUE or FALSE.")
+            if unique_field:
+                first_row = seen.setdefault(unique_field, {}).setdefault(value, row_number)
+                if first_row != row_number:
+                    report.add(row_number, column, value, f"Duplicate of row {first_row} in this file.")
+                    continue
+                batch = pending.setdefault(unique_field, [])
+                batch.append((value, row_number, column))
+                if len(batch) >= batch_size:
+                    _flush(unique_field)
+    report.row_count = row_number - 1
+
+    for field_name in list(pending):
+        _flush(field_name)
+    return report
+
+
+def validate_import_file(*, model, file, sheet_name: str | None = None, vendor=None) -> ImportReport:
+    """Stream a CSV/XLSX/XLS upload once and return its validation report (dry run)."""
+    with open_import_rows(file, sheet_name=sheet_name) as (headers, rows):
+        headers = map_headers(model, headers, source_name=getattr(file, "name", None), vendor=vendor)
+        return validate_import_rows(model=model, headers=headers, rows=rows)
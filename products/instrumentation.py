@@ -0,0 +1,251 @@
+from __future__ import annotations
+
+import contextvars
+import json
+import logging
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable
+
+from django.conf import settings
+from django.db import connection
+from django.utils import timezone
+
+try:
+    import resource
+except ImportError:  # Windows: no getrusage().
+    resource = None
+
+logger = logging.getLogger(__name__)
+
+_current_job: contextvars.ContextVar["Job | None"] = contextvars.ContextVar("products_job", default=None)
+_progress_callback: contextvars.ContextVar[Callable[[int], None] | None] = contextvars.ContextVar(
+    "products_progress", default=None
+)
+_history_lock = threading.Lock()
+_history: deque["JobRecord"] = deque(maxlen=int(getattr(settings, "PRODUCTS_PERFORMANCE_HISTORY", 200)))
+_listeners: list[Callable[["JobRecord"], None]] = []
+
+
+def peak_rss_mb() -> float:
+    """Process peak resident set size in MiB (a high-water mark; it never goes down).
+
+    0.0 where the platform has no ``resource`` module, so RSS growth reads as zero there.
+    """
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux and bytes on macOS.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+@dataclass
+class JobRecord:
+    name: str
+    started_at: str
+    seconds: float
+    rows: int
+    rows_per_second: float | None
+    queries: int
+    query_seconds: float
+    peak_rss_mb: float
+    rss_growth_mb: float
+    stages: dict[str, float] = field(default_factory=dict)
+    fields: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+
+    def as_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+class Job:
+    """Accumulates timings for one import/export/purge/AI call.
+
+    Stage times are exclusive: entering a nested stage pauses the enclosing one, so the
+    stages of a streamed pipeline (parse -> normalize -> insert) add up instead of overlapping.
+    """
+
+    def __init__(self, name: str, **fields: Any):
+        self.name = name
+        self.fields = fields
+        self.rows = 0
+        self.queries = 0
+        self.query_seconds = 0.0
+        self.stages: dict[str, float] = {}
+        self._stack: list[tuple[str, float]] = []
+        self._started_at = timezone.now()
+        self._start = time.perf_counter()
+        self._start_rss = peak_rss_mb()
+        self._counting = False
+
+    def _push(self, stage: str) -> None:
+        now = time.perf_counter()
+        if self._stack:
+            parent, since = self._stack[-1]
+            self.stages[parent] = self.stages.get(parent, 0.0) + now - since
+        self._stack.append((stage, now))
+
+    def _pop(self) -> None:
+        now = time.perf_counter()
+        stage, since = self._stack.pop()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - since
+        if self._stack:
+            self._stack[-1] = (self._stack[-1][0], now)
+
+    @contextmanager
+    def stage(self, name: str):
+        self._push(name)
+        try:
+            yield
+        finally:
+            self._pop()
+
+    def timed_iter(self, iterable, name: str):
+        """Charge the time (and the queries) spent producing each item of ``iterable`` to stage ``name``."""
+        iterator = iter(iterable)
+        while True:
+            self._push(name)
+            try:
+                with self.count_queries():
+                    item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                self._pop()
+            yield item
+
+    @contextmanager
+    def count_queries(self):
+        """Count this thread's queries against the job for the duration of the block.
+
+        The wrapper must never stay installed across a ``yield`` of a streaming generator:
+        other work on the thread would be counted, and interleaved streams would unwind
+        the connection's wrappers out of order. Nested calls are no-ops.
+        """
+        if self._counting:
+            yield
+            return
+        self._counting = True
+        try:
+            with connection.execute_wrapper(self._execute_wrapper):
+                yield
+        finally:
+            self._counting = False
+
+    def _execute_wrapper(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.query_seconds += time.perf_counter() - start
+
+    def finish(self, *, error: BaseException | None = None) -> JobRecord:
+        seconds = time.perf_counter() - self._start
+        peak = peak_rss_mb()
+        record = JobRecord(
+            name=self.name,
+            started_at=self._started_at.isoformat(),
+            seconds=round(seconds, 4),
+            rows=self.rows,
+            rows_per_second=round(self.rows / seconds, 1) if seconds and self.rows else None,
+            queries=self.queries,
+            query_seconds=round(self.query_seconds, 4),
+            peak_rss_mb=peak,
+            rss_growth_mb=round(peak - self._start_rss, 1),
+            stages={name: round(value, 4) for name, value in self.stages.items()},
+            fields=self.fields,
+            error=f"{type(error).__name__}: {error}" if error is not None else None,
+        )
+        with _history_lock:
+            _history.append(record)
+        logger.info("job %s %s", record.name, json.dumps(record.as_dict(), default=str), extra={"job": record.as_dict()})
+        for listener in list(_listeners):
+            try:
+                listener(record)
+            except Exception:  # pragma: no cover - listeners must never break the job
+                logger.exception("Job listener failed")
+        return record
+
+
+@contextmanager
+def instrument(name: str, *, activate: bool = True, **fields: Any):
+    """Time a job, count its DB queries and record the result.
+
+    With ``activate`` the job becomes current for this context, so library code can mark
+    stages with the module-level ``stage()``/``timed_iter()`` without having the job passed
+    in, and every query in the block is counted. Streaming generators should pass
+    ``activate=False`` and use the job directly: only queries run inside ``job.timed_iter()``
+    steps or ``job.count_queries()`` blocks are counted, so nothing stays installed on the
+    connection while the generator is suspended.
+    """
+    job = Job(name, **fields)
+    token = _current_job.set(job) if activate else None
+    error: BaseException | None = None
+    try:
+        if activate:
+            with job.count_queries():
+                yield job
+        else:
+            yield job
+    except BaseException as exc:
+        error = exc
+        raise
+    finally:
+        if token is not None:
+            try:
+                _current_job.reset(token)
+            except ValueError:  # pragma: no cover - closed from another context
+                _current_job.set(None)
+        job.finish(error=error)
+
+
+def current_job() -> Job | None:
+    return _current_job.get()
+
+
+@contextmanager
+def stage(name: str):
+    """Mark a stage of the current job; a no-op when nothing is being instrumented."""
+    job = _current_job.get()
+    if job is None:
+        yield
+        return
+    with job.stage(name):
+        yield
+
+
+def timed_iter(iterable, name: str):
+    job = _current_job.get()
+    return iterable if job is None else job.timed_iter(iterable, name)
+
+
+@contextmanager
+def progress_callback(callback: Callable[[int], None]):
+    """Call ``callback(rows)`` whenever the import/export engines finish a batch of rows."""
+    token = _progress_callback.set(callback)
+    try:
+        yield
+    finally:
+        _progress_callback.reset(token)
+
+
+def report_progress(rows: int) -> None:
+    callback = _progress_callback.get()
+    if callback is not None:
+        callback(rows)
+
+
+def recent_jobs() -> list[JobRecord]:
+    """Most recent job records first (this process only)."""
+    with _history_lock:
+        return list(reversed(_history))
+
+
+def add_listener(listener: Callable[[JobRecord], None]) -> None:
+    if listener not in _listeners:
+        _listeners.append(listener)
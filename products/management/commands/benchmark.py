@@ -0,0 +1,57 @@
+import json
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmark import run_benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark imports (CSV/XLSX/XLS) and exports (CSV/XLSX) against a synthetic catalog. "
+        "Prints rows/second, RSS growth and query counts as JSON. Runs in a throwaway database; "
+        "the configured one is never touched."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10000, help="Variant rows per generated file.")
+        parser.add_argument("--vendors", type=int, default=50, help="Number of distinct vendors.")
+        parser.add_argument("--images", type=int, default=3, help="Product image URLs per row.")
+        parser.add_argument("--variants", type=int, default=3, help="Rows sharing each URL handle.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--formats",
+            default="csv,xlsx,xls",
+            help="Comma-separated import formats to benchmark (XLS is capped at 65535 rows).",
+        )
+        parser.add_argument("--output", help="Write the JSON report to this path instead of stdout.")
+
+    def handle(self, *args, **options):
+        formats = tuple(fmt.strip().lower() for fmt in options["formats"].split(",") if fmt.strip())
+        unknown = set(formats) - {"csv", "xlsx", "xls"}
+        if unknown:
+            raise CommandError(f"Unknown formats: {', '.join(sorted(unknown))}")
+        if options["rows"] < 1:
+            raise CommandError("--rows must be at least 1.")
+
+        with tempfile.TemporaryDirectory() as workdir:
+            try:
+                report = run_benchmark(
+                    rows=options["rows"],
+                    formats=formats,
+                    vendors=options["vendors"],
+                    images=options["images"],
+                    variants=options["variants"],
+                    seed=options["seed"],
+                    workdir=workdir,
+                )
+            except RuntimeError as exc:
+                raise CommandError(str(exc)) from exc
+
+        payload = json.dumps(report, indent=2)
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as handle:
+                handle.write(payload + "\n")
+            self.stdout.write(self.style.SUCCESS(f"Benchmark report written to {options['output']}"))
+        else:
+            self.stdout.write(payload)
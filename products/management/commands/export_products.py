@@ -0,0 +1,133 @@
+import os
+import sys
+
+from django.core.exceptions import FieldDoesNotExist, FieldError, ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date, parse_datetime
+
+from products.csv_export import iter_shopify_csv
+from products.instrumentation import progress_callback
+from products.models import ProductUploadRow
+from products.sharded_export import iter_sharded_csv, write_sharded_zip
+from products.split_export import iter_split_csv_zip
+from products.xlsx_export import write_shopify_xlsx
+
+from .import_products import ProgressLine
+
+
+def _parse_when(value: str, *, end: bool):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise CommandError(f"Invalid date/time: {value}")
+        # A bare date covers the whole day.
+        return {"uploaded_at__date__lte" if end else "uploaded_at__date__gte": day}
+    return {"uploaded_at__lte" if end else "uploaded_at__gte": parsed}
+
+
+class Command(BaseCommand):
+    help = "Export product rows to a local Shopify CSV/XLSX file with the admin export engine."
+
+    def add_arguments(self, parser):
+        parser.add_argument("output", help="Destination path.")
+        parser.add_argument(
+            "--format",
+            choices=("csv", "xlsx", "zip"),
+            help="Default: taken from the output extension. zip holds one CSV per shard.",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=0,
+            help="Serialize the CSV in this many processes (sharded on URL handle ranges).",
+        )
+        parser.add_argument("--shards", type=int, help="Number of shards (default: twice the workers).")
+        parser.add_argument(
+            "--split-bytes",
+            type=int,
+            help="Write a zip of CSV parts of at most this many bytes (never splitting a URL handle).",
+        )
+        parser.add_argument("--vendor", action="append", default=[], help="Vendor name (repeatable).")
+        parser.add_argument("--status", action="append", default=[], help="Status, e.g. active (repeatable).")
+        parser.add_argument("--uploaded-from", help="Only rows uploaded at/after this date or ISO datetime.")
+        parser.add_argument("--uploaded-to", help="Only rows uploaded at/before this date or ISO datetime.")
+        parser.add_argument(
+            "--filter",
+            action="append",
+            default=[],
+            metavar="LOOKUP=VALUE",
+            help="Extra queryset filter, e.g. --filter tags__icontains=sale (repeatable).",
+        )
+        parser.add_argument("--no-progress", action="store_true", help="Do not draw the live progress line.")
+
+    def _queryset(self, options):
+        queryset = ProductUploadRow.objects.all()
+        if options["vendor"]:
+            queryset = queryset.filter(vendor__name__in=options["vendor"])
+        if options["status"]:
+            queryset = queryset.filter(status__in=options["status"])
+        if options["uploaded_from"]:
+            queryset = queryset.filter(**_parse_when(options["uploaded_from"], end=False))
+        if options["uploaded_to"]:
+            queryset = queryset.filter(**_parse_when(options["uploaded_to"], end=True))
+        for expression in options["filter"]:
+            lookup, sep, value = expression.partition("=")
+            if not sep or not lookup:
+                raise CommandError(f"Filters look like LOOKUP=VALUE, got: {expression}")
+            try:
+                ProductUploadRow._meta.get_field(lookup.split("__", 1)[0])
+                queryset = queryset.filter(**{lookup: value})
+            except (FieldDoesNotExist, FieldError, ValidationError, ValueError) as exc:
+                raise CommandError(f"Invalid filter {expression}: {exc}") from exc
+        return queryset
+
+    def handle(self, *args, **options):
+        output = options["output"]
+        extension = os.path.splitext(output)[1].lower().lstrip(".")
+        fmt = options["format"] or (extension if extension in ("xlsx", "zip") else "csv")
+        workers = options["workers"]
+        queryset = self._queryset(options)
+        progress = ProgressLine(
+            sys.stderr,
+            label="Exporting",
+            enabled=not options["no_progress"] and sys.stderr.isatty(),
+        )
+        rows = 0
+
+        def _count(row_count: int) -> None:
+            nonlocal rows
+            rows = row_count
+
+        try:
+            with progress_callback(progress):
+                if fmt == "xlsx":
+                    try:
+                        rows = write_shopify_xlsx(queryset, output)
+                    except RuntimeError as exc:
+                        raise CommandError(str(exc)) from exc
+                elif options["split_bytes"]:
+                    with open(output, "wb") as handle:
+                        for chunk in iter_split_csv_zip(queryset, max_bytes=options["split_bytes"], on_complete=_count):
+                            handle.write(chunk)
+                elif fmt == "zip":
+                    rows = write_sharded_zip(queryset, output, workers=workers, shards=options["shards"])
+                else:
+                    if workers > 1 or options["shards"]:
+                        chunks = iter_sharded_csv(
+                            queryset, workers=workers, shards=options["shards"], on_complete=_count
+                        )
+                    else:
+                        chunks = iter_shopify_csv(queryset, on_complete=_count)
+                    with open(output, "w", encoding="utf-8", newline="") as handle:
+                        for chunk in chunks:
+                            handle.write(chunk)
+        finally:
+            progress.close()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Exported {rows:,} rows to {output} in {progress.elapsed:.1f}s "
+                f"({rows / progress.elapsed if progress.elapsed else 0:,.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.instrumentation import progress_callback
+from products.models import ProductUploadRow, Vendor
+from products.multi_import import import_files_to_model
+
+
+class ProgressLine:
+    """Live ``rows | rows/s`` line on a terminal, redrawn at most a few times per second."""
+
+    def __init__(self, stream, *, label: str, enabled: bool):
+        self.stream = stream
+        self.label = label
+        self.enabled = enabled
+        self.rows = 0
+        self.started = time.perf_counter()
+        self._last_draw = 0.0
+
+    def __call__(self, rows: int) -> None:
+        self.rows += rows
+        now = time.perf_counter()
+        if self.enabled and now - self._last_draw >= 0.2:
+            self._last_draw = now
+            self.stream.write(f"\r{self.label}: {self.rows:,} rows  {self.rate:,.0f} rows/s")
+            self.stream.flush()
+
+    @property
+    def elapsed(self) -> float:
+        return time.perf_counter() - self.started
+
+    @property
+    def rate(self) -> float:
+        elapsed = self.elapsed
+        return self.rows / elapsed if elapsed else 0.0
+
+    def close(self) -> None:
+        if self.enabled:
+            self.stream.write("\r\033[K")
+            self.stream.flush()
+
+
+class Command(BaseCommand):
+    help = (
+        "Import CSV/XLSX/XLS files (or zips of them) from local paths with the admin import engine, "
+        "without going through an HTTP upload."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("paths", nargs="+", help="Files to import (.csv, .xlsx, .xls or .zip).")
+        parser.add_argument("--sheet", dest="sheet_name", help="Excel sheet name (default: first sheet).")
+        parser.add_argument("--all-sheets", action="store_true", help="Import every sheet of each workbook.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Rows per INSERT batch.")
+        parser.add_argument(
+            "--upsert",
+            action="store_true",
+            help="Update rows whose SKU already exists instead of failing on the unique constraint.",
+        )
+        parser.add_argument("--vendor", help="Vendor name whose remembered header mappings apply.")
+        parser.add_argument("--workers", type=int, help="Parser processes (default: PRODUCTS_IMPORT_WORKERS).")
+        parser.add_argument("--no-progress", action="store_true", help="Do not draw the live progress line.")
+
+    def handle(self, *args, **options):
+        paths = options["paths"]
+        for path in paths:
+            if not os.path.isfile(path):
+                raise CommandError(f"File not found: {path}")
+        if options["batch_size"] < 1:
+            raise CommandError("--batch-size must be at least 1.")
+        vendor = None
+        if options["vendor"]:
+            vendor = Vendor.objects.filter(name=options["vendor"]).first()
+            if vendor is None:
+                raise CommandError(f"Unknown vendor: {options['vendor']}")
+
+        progress = ProgressLine(
+            sys.stderr,
+            label="Importing",
+            enabled=not options["no_progress"] and sys.stderr.isatty(),
+        )
+        try:
+            with progress_callback(progress):
+                summary = import_files_to_model(
+                    model=ProductUploadRow,
+                    files=paths,
+                    sheet_name=options["sheet_name"],
+                    all_sheets=options["all_sheets"],
+                    workers=options["workers"],
+                    batch_size=options["batch_size"],
+                    vendor=vendor,
+                    upsert=options["upsert"],
+                )
+        except (RuntimeError, ValueError) as exc:
+            raise CommandError(f"Import failed, nothing was imported: {exc}") from exc
+        finally:
+            progress.close()
+
+        for label, rows in summary.items():
+            self.stdout.write(f"  {label}: {rows:,} rows")
+        total = sum(summary.values())
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {total:,} rows from {len(summary)} sources in {progress.elapsed:.1f}s "
+                f"({total / progress.elapsed if progress.elapsed else 0:,.0f} rows/s)."
+            )
+        )
@@ -0,0 +1,248 @@
+from __future__ import annotations
+
+import atexit
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+from typing import Any
+
+from django.conf import settings
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+_FLUSH_INTERVAL = 1.0
+
+_registry: dict[str, "_Metric"] = {}
+_flush_lock = threading.Lock()
+_last_flush = 0.0
+
+
+def _label_key(label_names: tuple[str, ...], labels: dict[str, Any]) -> tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in label_names)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, label_names: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.label_names = label_names
+        self._lock = threading.Lock()
+        _registry[name] = self
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        key = _label_key(self.label_names, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+        _maybe_flush()
+
+    def snapshot(self) -> dict[tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, *args, buckets: tuple[float, ...] = DEFAULT_BUCKETS, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [per-bucket counts (non-cumulative, last is +Inf), sum, count].
+        self._values: dict[tuple[str, ...], list[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        key = _label_key(self.label_names, labels)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][index] += 1
+            entry[1] += value
+            entry[2] += 1
+        _maybe_flush()
+
+    def snapshot(self) -> dict[tuple[str, ...], list[Any]]:
+        with self._lock:
+            return {key: [list(counts), total, count] for key, (counts, total, count) in self._values.items()}
+
+
+IMPORT_ROWS = Counter("products_import_rows_total", "Rows imported.", ("format",))
+IMPORT_SECONDS = Histogram("products_import_duration_seconds", "Import duration.", ("format",))
+EXPORT_ROWS = Counter("products_export_rows_total", "Rows exported.", ("format",))
+EXPORT_SECONDS = Histogram("products_export_duration_seconds", "Export duration.", ("format",))
+PURGE_ROWS = Counter("products_purge_rows_total", "Rows removed by delete-all.")
+PURGE_SECONDS = Histogram("products_purge_duration_seconds", "Delete-all duration.")
+ROLLBACK_ROWS = Counter("products_rollback_rows_total", "Rows removed by import batch rollbacks.")
+ROLLBACK_SECONDS = Histogram("products_rollback_duration_seconds", "Import batch rollback duration.")
+OLLAMA_REQUESTS = Counter("products_ollama_requests_total", "AI copy generations sent to Ollama.")
+OLLAMA_SECONDS = Histogram("products_ollama_request_duration_seconds", "Ollama call latency.")
+OLLAMA_ERRORS = Counter("products_ollama_errors_total", "AI copy generations that returned no usable result.")
+OLLAMA_COALESCED = Counter(
+    "products_ollama_coalesced_total", "AI copy requests that joined an identical generation already in flight."
+)
+JOB_FAILURES = Counter("products_job_failures_total", "Jobs that raised an exception.", ("job",))
+
+
+def record_job(record) -> None:
+    """Instrumentation listener: turn finished job records into metrics."""
+    fmt = record.fields.get("format", "")
+    if record.error:
+        JOB_FAILURES.inc(job=record.name)
+    if record.name == "import":
+        IMPORT_ROWS.inc(record.rows, format=fmt)
+        IMPORT_SECONDS.observe(record.seconds, format=fmt)
+    elif record.name == "export":
+        EXPORT_ROWS.inc(record.rows, format=fmt)
+        EXPORT_SECONDS.observe(record.seconds, format=fmt)
+    elif record.name == "purge":
+        PURGE_ROWS.inc(record.rows)
+        PURGE_SECONDS.observe(record.seconds)
+    elif record.name == "rollback":
+        ROLLBACK_ROWS.inc(record.rows)
+        ROLLBACK_SECONDS.observe(record.seconds)
+    elif record.name == "ai":
+        if "ollama" in record.stages:
+            OLLAMA_REQUESTS.inc()
+            OLLAMA_SECONDS.observe(record.stages["ollama"])
+        if record.error or record.fields.get("error"):
+            OLLAMA_ERRORS.inc()
+
+
+def _metrics_dir() -> str | None:
+    return getattr(settings, "PRODUCTS_METRICS_DIR", None) or None
+
+
+def _local_snapshot() -> dict[str, dict[str, Any]]:
+    return {
+        name: {json.dumps(list(key)): value for key, value in metric.snapshot().items()}
+        for name, metric in _registry.items()
+    }
+
+
+def _own_file(directory: str) -> str:
+    return os.path.join(directory, f"metrics_{os.getpid()}.json")
+
+
+def flush() -> None:
+    """Write this process's totals to ``PRODUCTS_METRICS_DIR`` (atomic replace) for multi-worker scrapes."""
+    global _last_flush
+    directory = _metrics_dir()
+    if not directory:
+        return
+    with _flush_lock:
+        _last_flush = time.monotonic()
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".metrics_", suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as handle:
+            json.dump(_local_snapshot(), handle)
+        os.replace(tmp_path, _own_file(directory))
+
+
+def _maybe_flush() -> None:
+    # Updates stay in memory; files are rewritten at most once per interval.
+    if _metrics_dir() and time.monotonic() - _last_flush >= _FLUSH_INTERVAL:
+        flush()
+
+
+def remove_own_file() -> None:
+    """Drop this process's file at exit, so the directory holds one file per live worker.
+
+    An exiting worker's totals leave the summed counters, which Prometheus reads as a
+    counter reset. Files left by killed processes are not removed; clearing the directory
+    while no workers are running (e.g. on deploy) prunes them.
+    """
+    directory = _metrics_dir()
+    if not directory:
+        return
+    with _flush_lock:
+        try:
+            os.unlink(_own_file(directory))
+        except FileNotFoundError:
+            pass
+
+
+atexit.register(remove_own_file)
+
+
+def _merged_snapshots() -> dict[str, dict[str, Any]]:
+    directory = _metrics_dir()
+    if not directory:
+        return _local_snapshot()
+    flush()
+    merged: dict[str, dict[str, Any]] = {}
+    for path in glob.glob(os.path.join(directory, "metrics_*.json")):
+        try:
+            with open(path, encoding="utf-8") as handle:
+                snapshot = json.load(handle)
+        except (OSError, ValueError):
+            continue
+        for name, values in snapshot.items():
+            metric = _registry.get(name)
+            if metric is None:
+                continue
+            target = merged.setdefault(name, {})
+            for key, value in values.items():
+                if metric.kind == "counter":
+                    target[key] = target.get(key, 0) + value
+                else:
+                    current = target.setdefault(key, [[0] * len(value[0]), 0.0, 0])
+                    current[0] = [a + b for a, b in zip(current[0], value[0])]
+                    current[1] += value[1]
+                    current[2] += value[2]
+    return merged
+
+
+def _format_labels(names: tuple[str, ...], values: list[str], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_number(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def render_metrics() -> str:
+    """Prometheus text exposition (version 0.0.4) of all products metrics."""
+    snapshot = _merged_snapshots()
+    lines: list[str] = []
+    for name, metric in _registry.items():
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(snapshot.get(name, {}).items()):
+            label_values = json.loads(key)
+            if metric.kind == "counter":
+                lines.append(f"{name}{_format_labels(metric.label_names, label_values)} {_format_number(value)}")
+                continue
+            counts, total, count = value
+            cumulative = 0
+            for bound, bucket_count in zip((*metric.buckets, float("inf")), counts):
+                cumulative += bucket_count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                labels = _format_labels(metric.label_names, label_values, f'le="{le}"')
+                lines.append(f"{name}_bucket{labels} {cumulative}")
+            labels = _format_labels(metric.label_names, label_values)
+            lines.append(f"{name}_sum{labels} {_format_number(total)}")
+            lines.append(f"{name}_count{labels} {count}")
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from django.db import migrations, models
+from django.db.models.functions import Coalesce, Now
+
+
+def _backfill_updated_at(apps, schema_editor):
+    # Every row here predates the column (AddField may already have stamped it with the
+    # migration time). Rows from before 0004 have no upload time; they get the migration
+    # time, so the next incremental export includes them instead of never matching
+    # ``updated_at > watermark``.
+    ProductUploadRow = apps.get_model("products", "ProductUploadRow")
+    ProductUploadRow.objects.update(updated_at=Coalesce(models.F("uploaded_at"), Now()))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_alter_productuploadrow_charge_tax_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExportWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.CharField(max_length=100, unique=True)),
+                ('last_exported_at', models.DateTimeField(blank=True, null=True)),
+                ('last_row_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='productuploadrow',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, null=True, verbose_name='Last change'),
+        ),
+        migrations.RunPython(_backfill_updated_at, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def _split(value):
+    if value is None:
+        return []
+    cleaned = str(value).replace("\r\n", "\n").replace("\r", "\n")
+    return [piece.strip() for chunk in cleaned.split("\n") for piece in chunk.split(",") if piece.strip()]
+
+
+def _backfill_images(apps, schema_editor):
+    ProductUploadRow = apps.get_model("products", "ProductUploadRow")
+    ProductImage = apps.get_model("products", "ProductImage")
+
+    rows = (
+        ProductUploadRow.objects.exclude(product_image_url__isnull=True, variant_image_url__isnull=True)
+        .values_list("pk", "product_image_url", "variant_image_url", "image_alt_text")
+        .order_by("pk")
+    )
+    pending = []
+    for pk, product_urls, variant_urls, alt_text in rows.iterator(chunk_size=2000):
+        for position, url in enumerate(_split(product_urls), start=1):
+            pending.append(
+                ProductImage(
+                    row_id=pk,
+                    kind="product",
+                    position=position,
+                    url=url,
+                    alt_text=(alt_text or None) if position == 1 else None,
+                )
+            )
+        for position, url in enumerate(_split(variant_urls), start=1):
+            pending.append(ProductImage(row_id=pk, kind="variant", position=position, url=url))
+        if len(pending) >= 2000:
+            ProductImage.objects.bulk_create(pending)
+            pending = []
+    if pending:
+        ProductImage.objects.bulk_create(pending)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_productuploadrow_updated_at_exportwatermark'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductImage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('product', 'Product image'), ('variant', 'Variant image')], default='product', max_length=10)),
+                ('position', models.PositiveIntegerField(default=1)),
+                ('url', models.CharField(db_index=True, max_length=2000)),
+                ('alt_text', models.TextField(blank=True, null=True)),
+                ('row', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='images', to='products.productuploadrow')),
+            ],
+            options={
+                'ordering': ('row', 'kind', 'position'),
+                'indexes': [models.Index(fields=['row', 'kind', 'position'], name='products_image_row_pos_idx')],
+            },
+        ),
+        migrations.RunPython(_backfill_images, migrations.RunPython.noop),
+    ]
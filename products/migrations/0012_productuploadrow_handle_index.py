@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_productimage'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productuploadrow',
+            index=models.Index(fields=['url_handle', 'id'], name='products_row_handle_id_idx'),
+        ),
+    ]
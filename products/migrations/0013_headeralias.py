@@ -0,0 +1,29 @@
+# Generated by Django 6.0 on 2026-10-18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0012_productuploadrow_handle_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeaderAlias',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('filename_pattern', models.CharField(blank=True, default='', help_text='Optional shell-style pattern matched against the upload name, e.g. acme_*.xlsx.', max_length=255)),
+                ('source_header', models.CharField(max_length=255)),
+                ('target_column', models.CharField(blank=True, default='', max_length=255)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('vendor', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='header_aliases', to='products.vendor')),
+            ],
+            options={
+                'verbose_name_plural': 'header aliases',
+                'ordering': ('source_header', 'pk'),
+            },
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0 on 2026-10-18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_headeralias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ImportBatch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source_name', models.CharField(blank=True, default='', max_length=255)),
+                ('format', models.CharField(blank=True, default='', max_length=10)),
+                ('row_count', models.PositiveIntegerField(default=0)),
+                ('checksum', models.CharField(blank=True, default='', help_text='SHA-256 of the uploaded file.', max_length=64)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('rolled_back_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'ordering': ('-created_at', '-pk'),
+            },
+        ),
+        migrations.AddField(
+            model_name='productuploadrow',
+            name='import_batch',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='rows', to='products.importbatch', verbose_name='Import batch'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0015_dataversion'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(django.db.models.functions.text.Lower('name'), name='products_vendor_lname_idx'),
+        ),
+    ]
@@ -1,19 +1,160 @@
-from django.db import models
+from functools import lru_cache
+
+from django.db import connections, models
+from django.db.models import Value
+from django.db.models.functions import Lower
 from django.utils.text import slugify
 
 from .ai import generate_product_copy
 
 
+IMAGE_FIELDS = frozenset({"product_image_url", "variant_image_url", "image_alt_text"})
+
+
+@lru_cache(maxsize=None)
+def _postgres_collation(alias: str, name: str) -> str:
+    with connections[alias].cursor() as cursor:
+        cursor.execute("SELECT datcollate FROM pg_database WHERE datname = current_database()")
+        return cursor.fetchone()[0]
+
+
+def _orders_by_code_point(alias: str) -> bool:
+    """Whether plain text comparisons on ``alias`` sort by code point, so a prefix is a key range."""
+    connection = connections[alias]
+    if connection.vendor == "sqlite":
+        return True  # BINARY collation unless a column says otherwise.
+    if connection.vendor == "postgresql":
+        return _postgres_collation(alias, connection.settings_dict["NAME"]) in ("C", "POSIX")
+    return False
+
+
+def split_image_values(value: str | None) -> list[str]:
+    """Split stored image URLs separated by commas or newlines."""
+    if value is None:
+        return []
+    cleaned = str(value).replace("\r\n", "\n").replace("\r", "\n")
+    parts: list[str] = []
+    for chunk in cleaned.split("\n"):
+        for piece in chunk.split(","):
+            item = piece.strip()
+            if item:
+                parts.append(item)
+    return parts
+
+
+class DataVersion(models.Model):
+    """A counter bumped whenever exportable product data changes; keys the export cache.
+
+    Writes that bypass ``save()`` (imports, bulk edits, chunked deletes) bump it explicitly.
+    """
+
+    PRODUCTS = "products"
+
+    key = models.CharField(max_length=50, unique=True)
+    version = models.PositiveBigIntegerField(default=0)
+    changed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.key} v{self.version}"
+
+    @classmethod
+    def bump(cls, key: str = PRODUCTS) -> None:
+        from django.utils import timezone
+
+        if not cls.objects.filter(key=key).update(version=models.F("version") + 1, changed_at=timezone.now()):
+            cls.objects.get_or_create(key=key, defaults={"version": 1})
+
+    @classmethod
+    def current(cls, key: str = PRODUCTS) -> str:
+        """``"<version>:<changed_at>"``; the timestamp keeps versions apart across database resets."""
+        row = cls.objects.filter(key=key).values_list("version", "changed_at").first()
+        if row is None:
+            return "0"
+        version, changed_at = row
+        return f"{version}:{changed_at.isoformat()}"
+
+
 class Vendor(models.Model):
     name = models.CharField(max_length=255, unique=True, db_index=True)
 
+    class Meta:
+        indexes = [
+            # Case-insensitive prefix search (admin autocomplete) as a range scan on LOWER(name).
+            models.Index(Lower("name"), name="products_vendor_lname_idx"),
+        ]
+
     def __str__(self) -> str:  # pragma: no cover
         return self.name
 
+    @classmethod
+    def prefix_search(cls, queryset, prefix: str):
+        """Vendors whose name starts with ``prefix``, case-insensitively, via the LOWER(name) index.
+
+        Both sides are folded by the database's LOWER(), so names match the way the database
+        folds them (SQLite only folds ASCII, and an uppercase "É" still finds "Élan").
+        """
+        prefix = prefix.strip()
+        if not prefix:
+            return queryset
+        queryset = queryset.annotate(name_lower=Lower("name")).filter(name_lower__startswith=Lower(Value(prefix)))
+        if not _orders_by_code_point(queryset.db):
+            return queryset
+        # Under code-point ordering the prefix is also a range, which drives the index.
+        return queryset.filter(
+            name_lower__gte=Lower(Value(prefix)), name_lower__lt=Lower(Value(prefix + "\U0010ffff"))
+        )
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        DataVersion.bump()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        DataVersion.bump()
+        return result
+
+
+class ImportBatch(models.Model):
+    """One imported file/sheet; every row it inserted points back here so it can be rolled back."""
+
+    source_name = models.CharField(max_length=255, blank=True, default="")
+    format = models.CharField(max_length=10, blank=True, default="")
+    row_count = models.PositiveIntegerField(default=0)
+    checksum = models.CharField(max_length=64, blank=True, default="", help_text="SHA-256 of the uploaded file.")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    rolled_back_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("-created_at", "-pk")
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.source_name or 'import'} ({self.created_at:%Y-%m-%d %H:%M})"
+
+    def rollback(self, *, chunk_size: int = 5000) -> int:
+        """Delete the rows this batch inserted (ranged fast delete) and mark it rolled back."""
+        from django.utils import timezone
+
+        from .purge import delete_in_chunks
+
+        deleted, _batches = delete_in_chunks(self.rows.all(), chunk_size=chunk_size)
+        self.rolled_back_at = timezone.now()
+        self.save(update_fields=["rolled_back_at"])
+        return deleted
+
 
 class ProductUploadRow(models.Model):
     # Upload metadata
     uploaded_at = models.DateTimeField("Upload time", auto_now_add=True, null=True, blank=True, db_index=True)
+    # Maintained by save() (auto_now) and bulk_create; bulk_update()/update() callers must set it.
+    updated_at = models.DateTimeField("Last change", auto_now=True, null=True, blank=True, db_index=True)
+    import_batch = models.ForeignKey(
+        ImportBatch,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="rows",
+        verbose_name="Import batch",
+    )
 
     # Core product info
     title = models.TextField(verbose_name='Title', db_column='Title', null=True, blank=True)
@@ -100,6 +241,12 @@ class ProductUploadRow(models.Model):
     google_shopping_custom_label_3 = models.TextField(verbose_name='Google Shopping / Custom label 3', db_column='Google Shopping / Custom label 3', null=True, blank=True)
     google_shopping_custom_label_4 = models.TextField(verbose_name='Google Shopping / Custom label 4', db_column='Google Shopping / Custom label 4', null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            # Grouped export streams rows ordered by (URL handle, id).
+            models.Index(fields=["url_handle", "id"], name="products_row_handle_id_idx"),
+        ]
+
     @staticmethod
     def normalize_title(title: str | None) -> str | None:
         if title is None:
@@ -148,3 +295,159 @@ class ProductUploadRow(models.Model):
         if self.is_blank(self.url_handle) and self.title:
             self.url_handle = slugify(self.title)[:255]
         super().save(*args, **kwargs)
+
+        if self._images_changed(kwargs.get("update_fields")):
+            self.images.all().delete()
+            ProductImage.objects.bulk_create(self.build_images())
+            self._saved_image_values = self._image_values()
+        DataVersion.bump()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        DataVersion.bump()
+        return result
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._saved_image_values = instance._image_values()
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        self._saved_image_values = self._image_values()
+
+    def _image_values(self) -> dict[str, str | None]:
+        # Deferred columns are left out, so reading them never costs a query.
+        return {name: self.__dict__[name] for name in IMAGE_FIELDS if name in self.__dict__}
+
+    def _images_changed(self, update_fields) -> bool:
+        """Whether the saved image columns differ from those ProductImage rows were built from."""
+        if update_fields is not None and not IMAGE_FIELDS.intersection(update_fields):
+            return False
+        saved = getattr(self, "_saved_image_values", None)
+        if saved is None:
+            # Not loaded from the database (a new row): nothing to compare against.
+            return True
+        return self._image_values() != saved
+
+    def build_images(self) -> list["ProductImage"]:
+        """Normalize the packed image URL columns into unsaved ProductImage rows (requires a pk)."""
+        images: list[ProductImage] = []
+        for position, url in enumerate(split_image_values(self.product_image_url), start=1):
+            images.append(
+                ProductImage(
+                    row_id=self.pk,
+                    kind=ProductImage.PRODUCT,
+                    position=position,
+                    url=url,
+                    alt_text=(self.image_alt_text or None) if position == 1 else None,
+                )
+            )
+        for position, url in enumerate(split_image_values(self.variant_image_url), start=1):
+            images.append(ProductImage(row_id=self.pk, kind=ProductImage.VARIANT, position=position, url=url))
+        return images
+
+
+class ProductImage(models.Model):
+    """One image URL of a ProductUploadRow, normalized out of the packed URL columns."""
+
+    PRODUCT = "product"
+    VARIANT = "variant"
+    KIND_CHOICES = ((PRODUCT, "Product image"), (VARIANT, "Variant image"))
+
+    row = models.ForeignKey(ProductUploadRow, on_delete=models.CASCADE, related_name="images")
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES, default=PRODUCT)
+    position = models.PositiveIntegerField(default=1)
+    url = models.CharField(max_length=2000, db_index=True)
+    alt_text = models.TextField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("row", "kind", "position")
+        indexes = [models.Index(fields=["row", "kind", "position"], name="products_image_row_pos_idx")]
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.url
+
+
+class ExportWatermark(models.Model):
+    """Per-profile high-water mark for incremental exports (rows changed since the last export)."""
+
+    profile = models.CharField(max_length=100, unique=True)
+    last_exported_at = models.DateTimeField(null=True, blank=True)
+    last_row_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self) -> str:  # pragma: no cover
+        return self.profile
+
+    @staticmethod
+    def cutoff():
+        """The newest ``updated_at`` an incremental export may include.
+
+        ``updated_at`` is stamped when a row is written, not when its transaction commits, so
+        a row stamped just before an export can become visible just after it. Holding the
+        cutoff ``PRODUCTS_EXPORT_WATERMARK_LAG`` seconds behind now leaves such rows to the
+        next export; the lag must exceed the longest import or bulk-edit transaction.
+        """
+        from datetime import timedelta
+
+        from django.conf import settings
+        from django.utils import timezone
+
+        lag = int(getattr(settings, "PRODUCTS_EXPORT_WATERMARK_LAG", 900) or 0)
+        return timezone.now() - timedelta(seconds=lag)
+
+    def pending(self, queryset, *, until):
+        """Rows changed after the watermark and up to ``until``.
+
+        The ``updated_at`` range is served by its index; the export still writes the rows in
+        its own ``(url_handle, pk)`` order.
+        """
+        queryset = queryset.filter(updated_at__lte=until)
+        if self.last_exported_at is not None:
+            queryset = queryset.filter(updated_at__gt=self.last_exported_at)
+        return queryset
+
+    def advance(self, *, until, row_count: int) -> None:
+        self.last_exported_at = until
+        self.last_row_count = row_count
+        self.save(update_fields=["last_exported_at", "last_row_count"])
+
+
+class HeaderAlias(models.Model):
+    """A learned import-header mapping, scoped to a vendor and/or a filename pattern.
+
+    ``source_header`` is stored normalized (see ``header_mapping.normalize_header_key``);
+    a blank ``target_column`` means the column is deliberately ignored.
+    """
+
+    vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, null=True, blank=True, related_name="header_aliases")
+    filename_pattern = models.CharField(
+        max_length=255,
+        blank=True,
+        default="",
+        help_text="Optional shell-style pattern matched against the upload name, e.g. acme_*.xlsx.",
+    )
+    source_header = models.CharField(max_length=255)
+    target_column = models.CharField(max_length=255, blank=True, default="")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("source_header", "pk")
+        verbose_name_plural = "header aliases"
+
+    def __str__(self) -> str:  # pragma: no cover
+        return f"{self.source_header} → {self.target_column or '(ignored)'}"
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        from .header_mapping import clear_learned_alias_cache
+
+        clear_learned_alias_cache()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        from .header_mapping import clear_learned_alias_cache
+
+        clear_learned_alias_cache()
+        return result
@@ -0,0 +1,241 @@
+from __future__ import annotations
+
+import os
+import queue as queue_module
+import tempfile
+import zipfile
+from contextlib import ExitStack
+from typing import Any
+
+from django.conf import settings
+from django.db import transaction
+
+from .excel_import import (
+    _file_checksum,
+    _default_fk_resolvers,
+    _insert_in_batches,
+    _normalize_cell,
+    _spooled_path,
+    import_format,
+    iter_objects_from_rows,
+    open_import_rows,
+    start_import_batch,
+    upsert_spec,
+)
+from .backends import require_backend
+from .header_mapping import map_headers
+from .instrumentation import instrument
+
+# (label, path, format, sheet name) of one sheet/file to parse.
+Source = tuple[str, str, str, str | None]
+
+_worker_queue = None
+
+
+def _sheet_names(path: str, fmt: str) -> list[str | None]:
+    if fmt == "xlsx":
+        workbook = require_backend("openpyxl").load_workbook(path, read_only=True)
+        try:
+            return list(workbook.sheetnames)
+        finally:
+            workbook.close()
+    if fmt == "xls":
+        workbook = require_backend("xlrd").open_workbook(path, on_demand=True)
+        try:
+            return list(workbook.sheet_names())
+        finally:
+            workbook.release_resources()
+    return [None]
+
+
+def _expand_sources(stack: ExitStack, files, *, sheet_name: str | None, all_sheets: bool) -> list[Source]:
+    """Spool uploads to disk, unpack zip archives and (optionally) list every workbook sheet."""
+    paths: list[tuple[str, str]] = []
+    for file in files:
+        name = os.path.basename(getattr(file, "name", None) or os.fspath(file))
+        path = stack.enter_context(_spooled_path(file))
+        if name.lower().endswith(".zip"):
+            extract_dir = stack.enter_context(tempfile.TemporaryDirectory())
+            with zipfile.ZipFile(path) as archive:
+                for member in archive.infolist():
+                    member_name = os.path.basename(member.filename)
+                    if member.is_dir() or member_name.startswith(".") or not import_format(member_name):
+                        continue
+                    target = os.path.join(extract_dir, f"{len(paths)}_{member_name}")
+                    with archive.open(member) as src, open(target, "wb") as dst:
+                        while chunk := src.read(1024 * 1024):
+                            dst.write(chunk)
+                    paths.append((f"{name}/{member.filename}", target))
+        else:
+            paths.append((name, path))
+
+    sources: list[Source] = []
+    seen_labels: set[str] = set()
+    for label, path in paths:
+        fmt = import_format(label)
+        if fmt is None:
+            raise ValueError(f"Unsupported file: {label}")
+        sheets = _sheet_names(path, fmt) if all_sheets else [sheet_name if fmt != "csv" else None]
+        for sheet in sheets:
+            source_label = f"{label} [{sheet}]" if sheet else label
+            # Labels key the per-source summary, so two uploads with the same name stay apart.
+            suffix = 2
+            unique_label = source_label
+            while unique_label in seen_labels:
+                unique_label = f"{source_label} ({suffix})"
+                suffix += 1
+            seen_labels.add(unique_label)
+            sources.append((unique_label, path, fmt, sheet))
+    return sources
+
+
+def _iter_source_batches(source: Source, batch_size: int):
+    label, path, _fmt, sheet = source
+    with open_import_rows(path, sheet_name=sheet) as (headers, rows):
+        if headers is None:
+            return
+        batch: list[list[Any]] = []
+        for row in rows:
+            batch.append([_normalize_cell(value) for value in row])
+            if len(batch) >= batch_size:
+                yield headers, batch
+                batch = []
+        if batch:
+            yield headers, batch
+
+
+def _init_worker(shared_queue) -> None:
+    global _worker_queue
+    # Spawned workers start from a bare interpreter with the parent's environment.
+    import django
+
+    django.setup()
+    _worker_queue = shared_queue
+
+
+def _parse_source(source: Source, batch_size: int) -> None:
+    """Worker: parse one sheet/file and push normalized row batches to the writer."""
+    label = source[0]
+    try:
+        for headers, batch in _iter_source_batches(source, batch_size):
+            _worker_queue.put(("rows", label, headers, batch))
+    except Exception as exc:
+        _worker_queue.put(("error", label, f"{type(exc).__name__}: {exc}", None))
+        return
+    _worker_queue.put(("done", label, None, None))
+
+
+def _iter_parallel_batches(sources: list[Source], *, workers: int, batch_size: int):
+    """Parse sources in a process pool and yield ``(label, headers, rows)`` batches as they arrive."""
+    # Imported here to keep the process-pool machinery off the admin's startup path.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: the writer holds an open transaction, and forked children would inherit its
+    # database connection (and any held locks) along with the rest of the process.
+    context = multiprocessing.get_context("spawn")
+    # Bounded so fast parsers cannot run far ahead of the single writer.
+    shared_queue = context.Queue(maxsize=workers * 4)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=context, initializer=_init_worker, initargs=(shared_queue,)
+    ) as pool:
+        futures = [pool.submit(_parse_source, source, batch_size) for source in sources]
+        remaining = {source[0] for source in sources}
+        try:
+            while remaining:
+                try:
+                    kind, label, payload, batch = shared_queue.get(timeout=1)
+                except queue_module.Empty:
+                    for future in futures:
+                        if future.done() and future.exception() is not None:
+                            raise RuntimeError(f"Import worker failed: {future.exception()}")
+                    continue
+                if kind == "rows":
+                    yield label, payload, batch
+                elif kind == "error":
+                    raise RuntimeError(f"Could not read {label}: {payload}")
+                else:
+                    remaining.discard(label)
+        finally:
+            # If the writer stopped early, unblock workers waiting on the full queue so the
+            # pool can shut down instead of hanging.
+            for future in futures:
+                future.cancel()
+            while not all(future.done() for future in futures):
+                try:
+                    shared_queue.get(timeout=0.1)
+                except queue_module.Empty:
+                    pass
+
+
+def _default_workers() -> int:
+    configured = getattr(settings, "PRODUCTS_IMPORT_WORKERS", None)
+    if configured:
+        return max(1, int(configured))
+    return max(1, min(4, os.cpu_count() or 1))
+
+
+@transaction.atomic
+def import_files_to_model(
+    *,
+    model,
+    files,
+    sheet_name: str | None = None,
+    all_sheets: bool = False,
+    workers: int | None = None,
+    batch_size: int = 1000,
+    vendor=None,
+    upsert: bool = False,
+) -> dict[str, int]:
+    """Import several files, zip archives and/or every sheet of a workbook.
+
+    Each sheet/file is parsed in its own worker process, and this process is the single
+    writer that batch-inserts what they produce. Returns the imported row count per
+    source label. With ``upsert`` rows whose SKU already exists are updated in place.
+    """
+    workers = workers or _default_workers()
+    with ExitStack() as stack:
+        job = stack.enter_context(instrument("import", format="multi", workers=workers))
+        sources = _expand_sources(stack, files, sheet_name=sheet_name, all_sheets=all_sheets)
+        job.fields["sources"] = len(sources)
+        summary = {source[0]: 0 for source in sources}
+        if workers > 1 and len(sources) > 1:
+            batches = _iter_parallel_batches(sources, workers=min(workers, len(sources)), batch_size=batch_size)
+        else:
+            batches = (
+                (source[0], headers, batch)
+                for source in sources
+                for headers, batch in _iter_source_batches(source, batch_size)
+            )
+
+        # One ImportBatch per sheet/file, so each source can be rolled back on its own.
+        checksums = {path: _file_checksum(path) for _label, path, _fmt, _sheet in sources}
+        import_batches = {
+            label: start_import_batch(model, source_name=label, fmt=fmt, checksum=checksums[path])
+            for label, path, fmt, _sheet in sources
+        }
+        fk_resolvers = _default_fk_resolvers()
+        # Header mapping (and the upsert column list) runs once per source, on its first batch.
+        mapped_headers: dict[str, list[str]] = {}
+        upsert_specs: dict[str, tuple[str, list[str]] | None] = {}
+        # In parallel mode "parse" is the writer's wait for the next batch from the workers.
+        for label, headers, rows in job.timed_iter(batches, "parse"):
+            if label not in mapped_headers:
+                mapped_headers[label] = map_headers(model, headers, source_name=label, vendor=vendor)
+                upsert_specs[label] = upsert_spec(model, mapped_headers[label]) if upsert else None
+            headers = mapped_headers[label]
+            import_batch = import_batches[label]
+            objects = iter_objects_from_rows(
+                model=model,
+                headers=headers,
+                rows=rows,
+                fk_resolvers=fk_resolvers,
+                extra_fields={"import_batch_id": import_batch.pk} if import_batch is not None else None,
+            )
+            summary[label] += _insert_in_batches(model, objects, batch_size=batch_size, upsert=upsert_specs[label])
+        for label, import_batch in import_batches.items():
+            if import_batch is not None:
+                import_batch.row_count = summary[label]
+                import_batch.save(update_fields=["row_count"])
+        job.rows = sum(summary.values())
+        return summary
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from django.db import router, transaction
+from django.db.models import signals
+
+
+def delete_in_chunks(queryset, *, chunk_size: int = 5000) -> tuple[int, int]:
+    """Delete ``queryset`` in ascending primary-key ranges; returns ``(deleted_rows, batches)``.
+
+    Each range is one short transaction deleted with ``QuerySet.delete()``, so cascades,
+    SET_NULL and signals behave exactly as Django defines them. Without delete signals
+    nothing needs whole instances, and the collector loads only the range's keys.
+    """
+    model = queryset.model
+    using = router.db_for_write(model)
+    chunk_size = max(1, int(chunk_size))
+    has_signals = any(signal.has_listeners(model) for signal in (signals.pre_delete, signals.post_delete))
+    # Keys only: related-manager querysets (batch.rows) read their foreign key off each row.
+    key_fields = ["pk", *(field.name for field in model._meta.concrete_fields if field.many_to_one)]
+
+    deleted_rows = 0
+    batches = 0
+    cursor = None
+    base = queryset.order_by()
+    while True:
+        pending = base if cursor is None else base.filter(pk__gt=cursor)
+        last_pk = pending.order_by("pk").values_list("pk", flat=True)[chunk_size - 1 : chunk_size].first()
+        chunk = pending if last_pk is None else pending.filter(pk__lte=last_pk)
+
+        with transaction.atomic(using=using):
+            _total, per_model = (chunk if has_signals else chunk.only(*key_fields)).delete()
+            count = per_model.get(model._meta.label, 0)
+        if count:
+            deleted_rows += count
+            batches += 1
+        if last_pk is None:
+            break
+        cursor = last_pk
+    if deleted_rows:
+        from .models import DataVersion
+
+        DataVersion.bump()
+    return deleted_rows, batches
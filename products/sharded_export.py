@@ -0,0 +1,225 @@
+"""Parallel CSV export: the queryset is cut into shards that worker processes serialize.
+
+Shards are ranges of the export's own sort key, ``(url_handle, pk)``: boundaries are
+snapped to whole handles, so a product's variant and image rows always land in one shard,
+and concatenating the shards in order gives the same bytes as ``iter_shopify_csv``. Rows
+without a handle are their own groups; they are cut into primary-key ranges and placed where
+the database sorts them (empty handles before any handle, NULLs first or last by backend).
+"""
+
+from __future__ import annotations
+
+import csv
+import os
+import shutil
+import tempfile
+import zipfile
+
+from django.conf import settings
+from django.db import connections
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import Mod, RowNumber
+from django.db.models.lookups import Exact
+from django.http import StreamingHttpResponse
+
+from .csv_export import _STREAM_CHUNK_SIZE, _Echo, csv_download_response, get_shopify_headers, iter_shopify_rows
+from .instrumentation import instrument, report_progress
+
+# Below this many rows a parallel export is serialized in the request process anyway.
+DEFAULT_PARALLEL_MIN_ROWS = 50_000
+
+
+def export_workers() -> int:
+    """``PRODUCTS_EXPORT_WORKERS``; 0 or 1 keeps exports in the request process."""
+    return max(0, int(getattr(settings, "PRODUCTS_EXPORT_WORKERS", 0) or 0))
+
+
+def parallel_min_rows() -> int:
+    """``PRODUCTS_EXPORT_PARALLEL_MIN_ROWS``: smaller exports are serialized in the request process."""
+    return max(0, int(getattr(settings, "PRODUCTS_EXPORT_PARALLEL_MIN_ROWS", DEFAULT_PARALLEL_MIN_ROWS)))
+
+
+def _key_ranges(queryset, field: str, parts: int) -> list[Q]:
+    # One windowed query returns the key of every step-th row in (field, pk) order, starting
+    # with the first; the step is the row count divided by ``parts``, rounded up.
+    samples = (
+        queryset.alias(
+            position=Window(RowNumber(), order_by=[F(field).asc(), F("pk").asc()]),
+            total=Window(Count("pk")),
+        )
+        .filter(Exact(Mod(F("position") - 1, (F("total") + parts - 1) / parts), 0))
+        .order_by(field, "pk")
+        .values_list(field, flat=True)
+    )
+    values = list(samples)
+    if not values:
+        return []
+    boundaries = []
+    for value in values[1:]:
+        # Values come back in database order, so a change means a new, larger boundary; one
+        # equal to the smallest key would only leave the first range empty.
+        if value != values[0] and (not boundaries or value != boundaries[-1]):
+            boundaries.append(value)
+    edges = [None, *boundaries, None]
+    ranges = []
+    for low, high in zip(edges, edges[1:]):
+        condition = Q()
+        if low is not None:
+            condition &= Q(**{f"{field}__gte": low})
+        if high is not None:
+            condition &= Q(**{f"{field}__lt": high})
+        ranges.append(condition)
+    return ranges
+
+
+def plan_shards(queryset, *, shards: int) -> list[Q]:
+    """Split ``queryset`` into about ``shards`` ranges in export order; never splits a URL handle."""
+    shards = max(1, int(shards))
+    base = queryset.order_by()
+    if not any(f.name == "url_handle" for f in queryset.model._meta.fields):
+        return _key_ranges(base, "pk", shards)
+    handleless = Q(url_handle__isnull=True) | Q(url_handle="")
+    with_handle = [Q(~handleless, condition) for condition in _key_ranges(base.exclude(handleless), "url_handle", shards)]
+    empty = [Q(condition, url_handle="") for condition in _key_ranges(base.filter(url_handle=""), "pk", shards)]
+    null = [Q(condition, url_handle__isnull=True) for condition in _key_ranges(base.filter(url_handle__isnull=True), "pk", shards)]
+    # The serial export orders by url_handle, pk: "" sorts before every handle, NULL by backend.
+    if connections[queryset.db].features.nulls_order_largest:
+        return [*empty, *with_handle, *null]
+    return [*null, *empty, *with_handle]
+
+
+def _init_worker(alias: str, database_name) -> None:
+    # Spawned workers start from a bare interpreter with the parent's environment, so point
+    # them at the database the parent actually uses (test and scratch databases are renamed
+    # only in the parent's settings).
+    import django
+
+    settings.DATABASES[alias]["NAME"] = database_name
+    django.setup()
+
+
+def _export_shard(model_label: str, query, condition: Q, path: str) -> int:
+    """Write the data rows (no header) of one shard to ``path``; returns the row count."""
+    from django.apps import apps
+
+    model = apps.get_model(model_label)
+    queryset = model._default_manager.all()
+    queryset.query = query
+    queryset = queryset.filter(condition)
+    headers = get_shopify_headers(model)
+    row_count = 0
+    with open(path, "w", encoding="utf-8", newline="") as handle:
+        writer = csv.writer(handle)
+        for objs, rows in iter_shopify_rows(queryset, headers):
+            row_count += len(objs)
+            writer.writerows(rows)
+    return row_count
+
+
+def _iter_shard_files(queryset, *, workers: int, shards: int | None, directory: str, job):
+    """Yield ``(path, rows)`` per shard in order, serialized in a process pool when ``workers > 1``.
+
+    Querysets under ``parallel_min_rows()`` rows are serialized here: starting the workers
+    would cost more than it saves.
+    """
+    with job.count_queries():
+        plan = plan_shards(queryset, shards=shards or max(1, workers) * 2)
+        if workers > 1 and queryset.count() < parallel_min_rows():
+            workers = 1
+    job.fields["workers"] = workers
+    model_label = queryset.model._meta.label
+    query = queryset.query
+    paths = [os.path.join(directory, f"shard_{index:04d}.csv") for index in range(len(plan))]
+    if workers <= 1:
+        for condition, path in zip(plan, paths):
+            with job.stage("serialize"), job.count_queries():
+                rows = _export_shard(model_label, query, condition, path)
+            yield path, rows
+        return
+
+    # Imported here to keep the process-pool machinery off the admin's startup path.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    # spawn: forked children would share the parent's open database connection.
+    database = connections[queryset.db]
+    pool = ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=(database.alias, database.settings_dict["NAME"]),
+    )
+    try:
+        futures = [
+            pool.submit(_export_shard, model_label, query, condition, path) for condition, path in zip(plan, paths)
+        ]
+        for future, path in zip(futures, paths):
+            # "serialize" is the wait for the next shard, in order.
+            with job.stage("serialize"):
+                rows = future.result()
+            yield path, rows
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def iter_sharded_csv(queryset, *, workers: int, shards: int | None = None, on_complete=None):
+    """Like ``iter_shopify_csv``, but shards are serialized in parallel and streamed in order."""
+    headers = get_shopify_headers(queryset.model)
+    directory = tempfile.mkdtemp(prefix="products_export_")
+    row_count = 0
+    try:
+        with instrument("export", activate=False, format="csv", workers=workers) as job:
+            yield _header_line(headers)
+            for path, rows in _iter_shard_files(queryset, workers=workers, shards=shards, directory=directory, job=job):
+                row_count += rows
+                report_progress(rows)
+                with job.stage("write"), open(path, encoding="utf-8", newline="") as handle:
+                    while chunk := handle.read(_STREAM_CHUNK_SIZE):
+                        job.rows = row_count
+                        yield chunk
+                os.unlink(path)
+            job.rows = row_count
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+    if on_complete is not None:
+        on_complete(row_count)
+
+
+def write_sharded_zip(queryset, output, *, workers: int, shards: int | None = None) -> int:
+    """Write one CSV per shard, each with the header row, into a zip at ``output``; returns the row count."""
+    header_line = _header_line(get_shopify_headers(queryset.model))
+    row_count = 0
+    with tempfile.TemporaryDirectory(prefix="products_export_") as directory:
+        with instrument("export", format="csv.zip", workers=workers) as job, zipfile.ZipFile(
+            output, "w", compression=zipfile.ZIP_DEFLATED
+        ) as archive:
+            shard_files = _iter_shard_files(queryset, workers=workers, shards=shards, directory=directory, job=job)
+            for index, (path, rows) in enumerate(shard_files, start=1):
+                row_count += rows
+                report_progress(rows)
+                with job.stage("write"), archive.open(f"products_part_{index:03d}.csv", "w") as member:
+                    member.write(header_line.encode("utf-8"))
+                    with open(path, "rb") as handle:
+                        shutil.copyfileobj(handle, member, _STREAM_CHUNK_SIZE)
+                os.unlink(path)
+            job.rows = row_count
+    return row_count
+
+
+def _header_line(headers: list[str]) -> str:
+    return csv.writer(_Echo()).writerow(headers)
+
+
+def queryset_to_sharded_csv_response(
+    *,
+    queryset,
+    workers: int,
+    filename_prefix: str = "shopify_products",
+    on_complete=None,
+    compression: str | None = None,
+) -> StreamingHttpResponse:
+    return csv_download_response(
+        iter_sharded_csv(queryset, workers=workers, on_complete=on_complete),
+        filename_prefix=filename_prefix,
+        compression=compression,
+    )
@@ -0,0 +1,61 @@
+(() => {
+  function renderChoices(list, status, payload) {
+    const selected = new URLSearchParams(window.location.search).get("vendor__id__exact");
+    for (const choice of payload.choices) {
+      if (String(choice.id) === selected) {
+        continue;
+      }
+      const item = document.createElement("li");
+      const link = document.createElement("a");
+      link.href = choice.query_string;
+      link.textContent = `${choice.name} (${choice.rows})`;
+      item.appendChild(link);
+      list.insertBefore(item, status);
+    }
+    if (payload.truncated) {
+      status.textContent = "More vendors match; narrow the list with search or other filters.";
+    } else {
+      status.remove();
+    }
+  }
+
+  async function loadChoices(details) {
+    if (details.dataset.vendorFilterLoaded) {
+      return;
+    }
+    details.dataset.vendorFilterLoaded = "1";
+    const list = details.querySelector("ul");
+    const status = details.querySelector(".vendor-filter-status");
+    status.textContent = "Loading…";
+    try {
+      const response = await fetch(`${details.dataset.vendorFilterUrl}${window.location.search}`, {
+        credentials: "same-origin",
+        headers: { Accept: "application/json" },
+      });
+      if (!response.ok) {
+        throw new Error(`HTTP ${response.status}`);
+      }
+      renderChoices(list, status, await response.json());
+    } catch (error) {
+      status.textContent = "Could not load vendors.";
+      delete details.dataset.vendorFilterLoaded;
+    }
+  }
+
+  document.addEventListener("DOMContentLoaded", () => {
+    for (const details of document.querySelectorAll("details[data-vendor-filter-url]")) {
+      details.addEventListener("toggle", () => {
+        if (details.open) {
+          loadChoices(details);
+        }
+      });
+      details.querySelector(".vendor-filter-status a").addEventListener("click", (event) => {
+        event.preventDefault();
+        loadChoices(details);
+      });
+      if (details.open) {
+        loadChoices(details);
+      }
+    }
+  });
+})();
@@ -1,8 +1,29 @@
-from django.test import TestCase
+import os
+import tempfile
+from datetime import timedelta
 
-from .excel_import import build_objects_from_rows
-from .models import ProductUploadRow, Vendor
-from .csv_export import queryset_to_shopify_csv_response
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import OperationalError, connection, connections
+from django.db.utils import ConnectionHandler
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .excel_import import (
+    _bulk_insert,
+    build_objects_from_rows,
+    import_csv_to_model,
+    import_xls_to_model,
+    import_xlsx_to_model,
+)
+from .header_mapping import clear_learned_alias_cache, map_headers, resolve_headers
+from .import_validation import validate_import_file
+from .multi_import import import_files_to_model
+from .models import ExportWatermark, HeaderAlias, ImportBatch, ProductImage, ProductUploadRow, Vendor
+from .csv_export import get_shopify_headers, iter_shopify_csv, queryset_to_shopify_csv_response
 from .xlsx_export import queryset_to_shopify_xlsx_response
 
 from io import BytesIO
@@ -12,6 +33,11 @@ try:
 except Exception:  # pragma: no cover
     openpyxl = None
 
+try:
+    import xlwt
+except Exception:  # pragma: no cover - only needed to build .xls fixtures
+    xlwt = None
+
 
 class TitleNormalizationTests(TestCase):
     def test_import_strips_title_after_comma_and_generates_handle(self):
@@ -39,7 +65,7 @@ class ExportTests(TestCase):
         vendor = Vendor.objects.create(name="Acme")
         ProductUploadRow.objects.create(title="STAVROS Chest, Gray", vendor=vendor)
         response = queryset_to_shopify_csv_response(queryset=ProductUploadRow.objects.all())
-        content = response.content.decode("utf-8")
+        content = "".join(chunk.decode("utf-8") for chunk in response.streaming_content)
         self.assertIn("Title", content.splitlines()[0])
         self.assertIn("STAVROS Chest", content)
         self.assertIn("Acme", content)
@@ -56,3 +82,1360 @@ class ExportTests(TestCase):
         sheet = workbook["Products"]
         self.assertEqual(sheet["A1"].value, "Title")
         self.assertEqual(sheet["A2"].value, "STAVROS Chest")
+
+
+class SqlitePerformanceProfileTests(SimpleTestCase):
+    def _connect(self, path, **overrides):
+        """A Django connection to ``path`` configured exactly as the performance profile."""
+        handler = ConnectionHandler(
+            {
+                "default": settings.DATABASES["default"],
+                "sqlite_profile": {
+                    "ENGINE": "django.db.backends.sqlite3",
+                    "NAME": path,
+                    "OPTIONS": {**settings.SQLITE_PERFORMANCE_OPTIONS, **overrides},
+                },
+            }
+        )
+        conn = handler["sqlite_profile"]
+        self.addCleanup(conn.close)
+        return conn
+
+    def _pragma(self, conn, name):
+        with conn.cursor() as cursor:
+            cursor.execute(f"PRAGMA {name}")
+            return cursor.fetchone()[0]
+
+    def test_django_connection_applies_init_command_and_transaction_mode(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            conn = self._connect(os.path.join(tmp, "profile.sqlite3"))
+            self.assertEqual(self._pragma(conn, "journal_mode").lower(), "wal")
+            self.assertEqual(self._pragma(conn, "synchronous"), 1)  # NORMAL
+            self.assertEqual(
+                self._pragma(conn, "busy_timeout"), int(os.environ.get("DJANGO_SQLITE_BUSY_TIMEOUT_MS", "20000"))
+            )
+            self.assertEqual(self._pragma(conn, "temp_store"), 2)  # MEMORY
+
+            # atomic() opens transactions with BEGIN IMMEDIATE, so the write lock is
+            # taken up front and a second writer is refused before it reads anything.
+            other = self._connect(conn.settings_dict["NAME"], init_command="PRAGMA busy_timeout=0")
+            other.ensure_connection()
+            conn._start_transaction_under_autocommit()
+            try:
+                with self.assertRaisesMessage(OperationalError, "database is locked"):
+                    other._start_transaction_under_autocommit()
+            finally:
+                conn.connection.rollback()
+
+    def test_reads_proceed_during_large_import(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "profile.sqlite3")
+            writer = self._connect(path)
+            # Fail immediately instead of waiting if the reader would be blocked.
+            reader = self._connect(
+                path, init_command=settings.SQLITE_PERFORMANCE_OPTIONS["init_command"] + "; PRAGMA busy_timeout=0"
+            )
+            with writer.cursor() as cursor:
+                cursor.execute("CREATE TABLE rows (id INTEGER PRIMARY KEY, title TEXT, description TEXT)")
+                cursor.execute("INSERT INTO rows (title, description) VALUES ('existing', 'x')")
+
+            writer._start_transaction_under_autocommit()
+            with writer.cursor() as cursor:
+                cursor.executemany(
+                    "INSERT INTO rows (title, description) VALUES (%s, %s)",
+                    [(f"Product {i}", "Description " * 20) for i in range(100_000)],
+                )
+            # The import is still open; a reader sees the last committed snapshot.
+            with reader.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM rows")
+                self.assertEqual(cursor.fetchone()[0], 1)
+            writer.connection.commit()
+            with reader.cursor() as cursor:
+                cursor.execute("SELECT COUNT(*) FROM rows")
+                self.assertEqual(cursor.fetchone()[0], 100_001)
+
+
+class BulkInsertTests(TestCase):
+    def _csv_upload(self):
+        content = (
+            "Title,SKU,Vendor,Description\n"
+            'STAVROS Chest,SKU-1,Acme,"Line one, ""quoted"""\n'
+            "Other,SKU-2,Acme,\n"
+        )
+        return SimpleUploadedFile("rows.csv", content.encode("utf-8"), content_type="text/csv")
+
+    def test_csv_import_inserts_rows(self):
+        count = import_csv_to_model(model=ProductUploadRow, file=self._csv_upload())
+        self.assertEqual(count, 2)
+        row = ProductUploadRow.objects.get(sku="SKU-1")
+        self.assertEqual(row.description, 'Line one, "quoted"')
+        self.assertEqual(row.vendor.name, "Acme")
+        self.assertEqual(ProductUploadRow.objects.get(sku="SKU-2").description, "")
+
+    def test_postgres_copy_path_round_trips_values(self):
+        if connection.vendor != "postgresql":
+            self.skipTest("COPY path needs DATABASE_URL pointing at a throwaway PostgreSQL database")
+        rows = [["SKU-A", 'Quote " and, comma', ""], ["SKU-B", None, "x"]]
+        objects = build_objects_from_rows(model=ProductUploadRow, headers=["SKU", "Title", "Tags"], rows=rows)
+        _bulk_insert(ProductUploadRow, objects, batch_size=1)
+        self.assertEqual(ProductUploadRow.objects.get(sku="SKU-A").title, 'Quote " and')
+        self.assertEqual(ProductUploadRow.objects.get(sku="SKU-A").tags, "")
+        self.assertIsNone(ProductUploadRow.objects.get(sku="SKU-B").title)
+        self.assertIsNotNone(ProductUploadRow.objects.get(sku="SKU-B").uploaded_at)
+
+
+class AdminBulkEditTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        self.url = reverse("admin:products_productuploadrow_changelist")
+        vendor = Vendor.objects.create(name="Acme")
+        for idx in range(5):
+            ProductUploadRow.objects.create(
+                title=f"Chest {idx}", sku=f"SKU-{idx}", status="draft", vendor=vendor, tags="sale, oak"
+            )
+        ProductUploadRow.objects.create(title="Lamp", sku="LAMP", status="draft")
+
+    def test_select_across_applies_update_to_filtered_rows_without_ids(self):
+        response = self.client.post(
+            f"{self.url}?vendor__id__exact={Vendor.objects.get().pk}",
+            {
+                "action": "bulk_edit_rows",
+                "index": "0",
+                "select_across": "1",
+                "_selected_action": [str(ProductUploadRow.objects.get(sku="SKU-0").pk)],
+                "apply": "1",
+                "status": "active",
+                "vendor": "Other",
+                "tags_mode": "add",
+                "tags": "new, oak",
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(ProductUploadRow.objects.filter(status="active", vendor__name="Other").count(), 5)
+        self.assertEqual(ProductUploadRow.objects.get(sku="SKU-0").tags, "sale, oak, new")
+        self.assertEqual(ProductUploadRow.objects.get(sku="LAMP").status, "draft")
+
+    def test_intermediate_form_carries_selected_ids(self):
+        pk = ProductUploadRow.objects.get(sku="LAMP").pk
+        response = self.client.post(
+            self.url,
+            {"action": "bulk_edit_rows", "index": "0", "select_across": "0", "_selected_action": [str(pk)]},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, f'name="_selected_action" value="{pk}"')
+
+        self.client.post(
+            self.url,
+            {
+                "action": "bulk_edit_rows",
+                "index": "0",
+                "select_across": "0",
+                "_selected_action": [str(pk)],
+                "apply": "1",
+                "tags_mode": "remove",
+                "tags": "x",
+                "published_on_online_store": "true",
+            },
+        )
+        self.assertTrue(ProductUploadRow.objects.get(sku="LAMP").published_on_online_store)
+        self.assertFalse(ProductUploadRow.objects.get(sku="SKU-0").published_on_online_store)
+
+
+class AdminExportTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        self.changelist_url = reverse("admin:products_productuploadrow_changelist")
+        self.export_url = reverse("admin:products_productuploadrow_export")
+        ProductUploadRow.objects.create(title="Chest", sku="SKU-1", status="active")
+        ProductUploadRow.objects.create(title="Lamp", sku="SKU-2", status="draft")
+
+    def _content(self, response):
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    def test_select_across_export_redirects_with_filter_state(self):
+        response = self.client.post(
+            f"{self.changelist_url}?status__exact=active",
+            {
+                "action": "export_selected_to_shopify_csv",
+                "index": "0",
+                "select_across": "1",
+                "_selected_action": [str(ProductUploadRow.objects.get(sku="SKU-1").pk)],
+            },
+        )
+        self.assertEqual(response.status_code, 302)
+        self.assertIn("status__exact=active", response["Location"])
+        self.assertIn("format=csv", response["Location"])
+
+        content = self._content(self.client.get(response["Location"]))
+        self.assertIn("Chest", content)
+        self.assertNotIn("Lamp", content)
+
+    def test_export_view_streams_filtered_queryset(self):
+        response = self.client.get(self.export_url, {"format": "csv", "q": "Lamp"})
+        self.assertTrue(response.streaming)
+        content = self._content(response)
+        self.assertIn("Lamp", content)
+        self.assertNotIn("Chest", content)
+
+
+class IncrementalExportTests(TestCase):
+    def setUp(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        self.export_url = reverse("admin:products_productuploadrow_export")
+
+    def _export(self):
+        response = self.client.get(self.export_url, {"format": "csv", "mode": "incremental", "profile": "shopify"})
+        return b"".join(response.streaming_content).decode("utf-8")
+
+    @override_settings(PRODUCTS_EXPORT_WATERMARK_LAG=0)
+    def test_second_export_contains_only_changed_rows(self):
+        ProductUploadRow.objects.create(title="Chest", sku="SKU-1")
+        lamp = ProductUploadRow.objects.create(title="Lamp", sku="SKU-2")
+
+        first = self._export()
+        self.assertIn("Chest", first)
+        self.assertIn("Lamp", first)
+        self.assertEqual(ExportWatermark.objects.get(profile="shopify").last_row_count, 2)
+
+        lamp.price = "19.99"
+        lamp.save()
+        ProductUploadRow.objects.create(title="Table", sku="SKU-3")
+
+        second = self._export()
+        self.assertNotIn("Chest", second)
+        self.assertIn("Lamp", second)
+        self.assertIn("Table", second)
+        self.assertEqual(ExportWatermark.objects.get(profile="shopify").last_row_count, 2)
+        self.assertEqual(len(self._export().splitlines()), 1)
+
+    @override_settings(PRODUCTS_EXPORT_WATERMARK_LAG=600)
+    def test_rows_stamped_inside_the_lag_wait_for_a_later_export(self):
+        # A row stamped two minutes ago may belong to a transaction that has not committed
+        # yet when the export reads, so moving the watermark past it could lose it for good.
+        now = timezone.now()
+        old = ProductUploadRow.objects.create(title="Chest", sku="SKU-1")
+        recent = ProductUploadRow.objects.create(title="Lamp", sku="SKU-2")
+        ProductUploadRow.objects.filter(pk=old.pk).update(updated_at=now - timedelta(minutes=30))
+        ProductUploadRow.objects.filter(pk=recent.pk).update(updated_at=now - timedelta(minutes=2))
+
+        first = self._export()
+        self.assertIn("Chest", first)
+        self.assertNotIn("Lamp", first)
+        watermark = ExportWatermark.objects.get(profile="shopify")
+        self.assertLess(watermark.last_exported_at, now - timedelta(minutes=2))
+
+        with override_settings(PRODUCTS_EXPORT_WATERMARK_LAG=0):
+            second = self._export()
+        self.assertNotIn("Chest", second)
+        self.assertIn("Lamp", second)
+
+
+class UpdatedAtBackfillMigrationTests(TransactionTestCase):
+    def test_rows_without_an_upload_time_get_a_change_time(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        before = [("products", "0009_alter_productuploadrow_charge_tax_and_more")]
+        after = [("products", "0010_productuploadrow_updated_at_exportwatermark")]
+        executor = MigrationExecutor(connection)
+        try:
+            executor.migrate(before)
+            old_apps = executor.loader.project_state(before).apps
+            OldRow = old_apps.get_model("products", "ProductUploadRow")
+            OldRow.objects.create(title="Legacy", sku="OLD-1")
+            OldRow.objects.create(title="Recent", sku="NEW-1")
+            OldRow.objects.filter(sku="OLD-1").update(uploaded_at=None)
+
+            migrated_at = timezone.now()
+            executor = MigrationExecutor(connection)
+            executor.migrate(after)
+            NewRow = executor.loader.project_state(after).apps.get_model("products", "ProductUploadRow")
+            rows = {row.sku: row for row in NewRow.objects.all()}
+            self.assertGreaterEqual(rows["OLD-1"].updated_at, migrated_at)
+            self.assertEqual(rows["NEW-1"].updated_at, rows["NEW-1"].uploaded_at)
+        finally:
+            executor = MigrationExecutor(connection)
+            executor.migrate(executor.loader.graph.leaf_nodes("products"))
+
+
+class ProductImageTests(TestCase):
+    def test_import_normalizes_packed_image_urls(self):
+        content = (
+            "Title,SKU,Product image URL,Variant image URL,Image alt text\n"
+            'Chest,SKU-1,"https://a/1.jpg, https://a/2.jpg\nhttps://a/3.jpg",https://a/v.jpg,Front\n'
+            "Lamp,SKU-2,https://a/1.jpg,,\n"
+        )
+        upload = SimpleUploadedFile("rows.csv", content.encode("utf-8"), content_type="text/csv")
+        import_csv_to_model(model=ProductUploadRow, file=upload)
+
+        chest = ProductUploadRow.objects.get(sku="SKU-1")
+        self.assertEqual(
+            list(chest.images.values_list("kind", "position", "url", "alt_text")),
+            [
+                ("product", 1, "https://a/1.jpg", "Front"),
+                ("product", 2, "https://a/2.jpg", None),
+                ("product", 3, "https://a/3.jpg", None),
+                ("variant", 1, "https://a/v.jpg", None),
+            ],
+        )
+        sharing = ProductUploadRow.objects.filter(images__url="https://a/1.jpg").values_list("sku", flat=True)
+        self.assertEqual(sorted(sharing), ["SKU-1", "SKU-2"])
+
+    def test_save_resyncs_images(self):
+        row = ProductUploadRow.objects.create(title="Chest", product_image_url="https://a/1.jpg")
+        row.product_image_url = "https://a/2.jpg,https://a/3.jpg"
+        row.save()
+        self.assertEqual(list(row.images.values_list("url", flat=True)), ["https://a/2.jpg", "https://a/3.jpg"])
+
+    def test_save_keeps_images_when_image_columns_are_unchanged(self):
+        ProductUploadRow.objects.create(title="Chest", description="d", product_image_url="https://a/1.jpg")
+        row = ProductUploadRow.objects.get()
+        image_pks = list(row.images.values_list("pk", flat=True))
+        row.price = "19.99"
+        with CaptureQueriesContext(connection) as queries:
+            row.save()
+        self.assertFalse([q for q in queries.captured_queries if "products_productimage" in q["sql"]])
+        self.assertEqual(list(row.images.values_list("pk", flat=True)), image_pks)
+
+        row.image_alt_text = "Front"
+        row.save()
+        self.assertEqual(ProductImage.objects.get().alt_text, "Front")
+
+    def test_export_reads_images_with_batched_prefetch(self):
+        vendor = Vendor.objects.create(name="Acme")
+        for idx in range(20):
+            ProductUploadRow.objects.create(
+                title=f"Chest {idx}",
+                vendor=vendor,
+                product_image_url=f"https://a/{idx}-1.jpg,https://a/{idx}-2.jpg",
+            )
+        with self.assertNumQueries(2):
+            content = "".join(iter_shopify_csv(ProductUploadRow.objects.all()))
+        lines = content.splitlines()
+        self.assertEqual(len(lines), 1 + 40)
+        self.assertIn("https://a/0-2.jpg", content)
+        self.assertEqual(ProductImage.objects.count(), 40)
+
+
+class GroupedExportTests(TestCase):
+    def _rows(self):
+        import csv
+
+        content = "".join(iter_shopify_csv(ProductUploadRow.objects.all()))
+        return list(csv.DictReader(content.splitlines()))
+
+    def test_variants_sharing_handle_are_grouped(self):
+        vendor = Vendor.objects.create(name="Acme")
+        ProductUploadRow.objects.create(
+            title="Chest", url_handle="chest", vendor=vendor, sku="C-1", option1_value="Gray",
+            product_image_url="https://a/1.jpg,https://a/2.jpg", variant_image_url="https://a/gray.jpg",
+        )
+        ProductUploadRow.objects.create(title="Lamp", url_handle="lamp", sku="L-1")
+        ProductUploadRow.objects.create(
+            title="Chest", url_handle="chest", vendor=vendor, sku="C-2", option1_value="Oak",
+            product_image_url="https://a/2.jpg,https://a/3.jpg",
+        )
+
+        rows = self._rows()
+        self.assertEqual([r["URL handle"] for r in rows], ["chest"] * 4 + ["lamp"])
+        first, second = rows[0], rows[1]
+        self.assertEqual((first["Title"], first["Vendor"], first["SKU"]), ("Chest", "Acme", "C-1"))
+        self.assertEqual((second["Title"], second["Vendor"], second["SKU"]), ("", "", "C-2"))
+        self.assertEqual(first["Variant image URL"], "https://a/gray.jpg")
+        self.assertEqual(
+            [(r["Product image URL"], r["Image position"]) for r in rows[:4]],
+            [("https://a/1.jpg", "1"), ("https://a/2.jpg", "2"), ("https://a/gray.jpg", "3"), ("https://a/3.jpg", "4")],
+        )
+        self.assertEqual(rows[2]["SKU"], "")
+        self.assertEqual(rows[4]["Title"], "Lamp")
+
+    def test_single_row_product_keeps_every_column_and_cell(self):
+        import csv
+
+        vendor = Vendor.objects.create(name="Acme")
+        ProductUploadRow.objects.create(
+            title="Chest", url_handle="chest", description="Oak chest", vendor=vendor, sku="C-1",
+            option1_name="Color", option1_value="Gray", price="19.99", continue_selling_when_out_of_stock=True,
+            product_image_url="https://a/1.jpg", image_alt_text="Front", seo_title="Chest", seo_description="Oak",
+        )
+        header, row = list(csv.reader("".join(iter_shopify_csv(ProductUploadRow.objects.all())).splitlines()))
+        self.assertEqual(
+            header,
+            [
+                "Title", "URL handle", "Description", "Vendor", "Product category", "Type", "Tags",
+                "Published on online store", "Status", "SKU", "Barcode", "Option1 name", "Option1 value",
+                "Option2 name", "Option2 value", "Option3 name", "Option3 value", "Price", "Price / International",
+                "Compare-at price", "Compare-at price / International", "Cost per item", "Charge tax", "Tax code",
+                "Unit price total measure", "Unit price total measure unit", "Unit price base measure",
+                "Unit price base measure unit", "Inventory tracker", "Inventory quantity",
+                "Continue selling when out of stock", "Weight value (grams)", "Weight unit for display",
+                "Requires shipping", "Fulfillment service", "Product image URL", "Image position", "Image alt text",
+                "Variant image URL", "Gift card", "SEO title", "SEO description",
+                "Google Shopping / Google product category", "Google Shopping / Gender",
+                "Google Shopping / Age group", "Google Shopping / MPN", "Google Shopping / AdWords Grouping",
+                "Google Shopping / AdWords labels", "Google Shopping / Condition", "Google Shopping / Custom product",
+                "Google Shopping / Custom label 0", "Google Shopping / Custom label 1",
+                "Google Shopping / Custom label 2", "Google Shopping / Custom label 3",
+                "Google Shopping / Custom label 4",
+            ],
+        )
+        self.assertEqual(
+            {column: cell for column, cell in zip(header, row) if cell},
+            {
+                "Title": "Chest",
+                "URL handle": "chest",
+                "Description": "Oak chest",
+                "Vendor": "Acme",
+                "Published on online store": "FALSE",
+                "SKU": "C-1",
+                "Option1 name": "Color",
+                "Option1 value": "Gray",
+                "Price": "19.99",
+                "Charge tax": "FALSE",
+                "Continue selling when out of stock": "continue",
+                "Requires shipping": "FALSE",
+                "Product image URL": "https://a/1.jpg",
+                "Image position": "1",
+                "Image alt text": "Front",
+                "Gift card": "FALSE",
+                "SEO title": "Chest",
+                "SEO description": "Oak",
+            },
+        )
+
+
+class XlsxImportTests(TestCase):
+    def _workbook_bytes(self, rows):
+        workbook = openpyxl.Workbook(write_only=True)
+        sheet = workbook.create_sheet("Products")
+        sheet.append(["Title", "SKU", "Vendor"])
+        for row in rows:
+            sheet.append(row)
+        output = BytesIO()
+        workbook.save(output)
+        return output.getvalue()
+
+    def test_upload_is_spooled_and_streamed_in_batches(self):
+        if openpyxl is None:  # pragma: no cover
+            self.skipTest("openpyxl not installed")
+        rows = [[f"Chest {i}, Gray", f"SKU-{i}", f"Vendor {i % 3}"] for i in range(2500)]
+        upload = SimpleUploadedFile("rows.xlsx", self._workbook_bytes(rows))
+
+        count = import_xlsx_to_model(model=ProductUploadRow, file=upload, sheet_name="Products")
+
+        self.assertEqual(count, 2500)
+        self.assertEqual(ProductUploadRow.objects.count(), 2500)
+        self.assertEqual(Vendor.objects.count(), 3)
+        self.assertEqual(ProductUploadRow.objects.get(sku="SKU-42").title, "Chest 42")
+
+
+class XlsImportTests(TestCase):
+    def test_row_vectors_convert_only_date_and_bool_columns(self):
+        if xlwt is None:
+            self.skipTest("xlwt not installed (pip install -r requirements.txt)")
+        import datetime
+
+        workbook = xlwt.Workbook()
+        sheet = workbook.add_sheet("Products")
+        for col, header in enumerate(["Title", "SKU", "Barcode", "Tags", "Cost per item"]):
+            sheet.write(0, col, header)
+        date_style = xlwt.easyxf(num_format_str="YYYY-MM-DD")
+        for row in range(1, 1501):
+            sheet.write(row, 0, f"Chest {row}, Gray")
+            sheet.write(row, 1, f"SKU-{row}")
+            sheet.write(row, 2, row % 2 == 0)
+            sheet.write(row, 3, datetime.date(2024, 1, 2), date_style)
+            sheet.write(row, 4, 12.5)
+        output = BytesIO()
+        workbook.save(output)
+
+        upload = SimpleUploadedFile("rows.xls", output.getvalue())
+        self.assertEqual(import_xls_to_model(model=ProductUploadRow, file=upload), 1500)
+        row = ProductUploadRow.objects.get(sku="SKU-2")
+        self.assertEqual(row.title, "Chest 2")
+        self.assertEqual(row.barcode, "TRUE")
+        self.assertEqual(row.tags, "2024-01-02T00:00:00")
+        self.assertEqual(row.cost_per_item, "12.5")
+
+
+class MultiSourceImportTests(TestCase):
+    def test_all_sheets_and_zip_members_are_imported_with_per_source_counts(self):
+        if openpyxl is None:  # pragma: no cover
+            self.skipTest("openpyxl not installed")
+        import zipfile
+
+        workbook = openpyxl.Workbook(write_only=True)
+        for sheet_idx, size in enumerate((300, 120)):
+            sheet = workbook.create_sheet(f"Sheet {sheet_idx}")
+            sheet.append(["Title", "SKU", "Vendor"])
+            for i in range(size):
+                sheet.append([f"Chest {sheet_idx}-{i}", f"S{sheet_idx}-{i}", "Acme"])
+        output = BytesIO()
+        workbook.save(output)
+
+        archive = BytesIO()
+        with zipfile.ZipFile(archive, "w") as zf:
+            zf.writestr("a.csv", "Title,SKU\nLamp,Z-1\nDesk,Z-2\n")
+            zf.writestr("notes.txt", "ignored")
+
+        summary = import_files_to_model(
+            model=ProductUploadRow,
+            files=[
+                SimpleUploadedFile("supplier.xlsx", output.getvalue()),
+                SimpleUploadedFile("more.zip", archive.getvalue()),
+            ],
+            all_sheets=True,
+            workers=2,
+        )
+
+        self.assertEqual(
+            summary,
+            {"supplier.xlsx [Sheet 0]": 300, "supplier.xlsx [Sheet 1]": 120, "more.zip/a.csv": 2},
+        )
+        self.assertEqual(ProductUploadRow.objects.count(), 422)
+        self.assertEqual(Vendor.objects.count(), 1)
+
+    def test_worker_failure_aborts_the_whole_import(self):
+        files = [
+            SimpleUploadedFile("a.csv", b"Title,SKU\nLamp,A-1\n"),
+            SimpleUploadedFile("broken.xlsx", b"not a workbook"),
+            SimpleUploadedFile("c.csv", b"Title,SKU\nDesk,C-1\n"),
+        ]
+        with self.assertRaisesMessage(RuntimeError, "Could not read broken.xlsx"):
+            import_files_to_model(model=ProductUploadRow, files=files, workers=3)
+        self.assertFalse(ProductUploadRow.objects.exists())
+
+    def test_admin_accepts_multiple_files(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("admin:products_productuploadrow_import_excel"),
+            {
+                "file": [
+                    SimpleUploadedFile("a.csv", b"Title,SKU\nLamp,A-1\n"),
+                    SimpleUploadedFile("b.csv", b"Title,SKU\nDesk,B-1\nSofa,B-2\n"),
+                ]
+            },
+            follow=True,
+        )
+        self.assertContains(response, "Imported 3 rows from 2 sources (a.csv: 1; b.csv: 2).")
+        self.assertEqual(ProductUploadRow.objects.count(), 3)
+
+
+class HeaderMappingTests(TestCase):
+    def tearDown(self):
+        # Learned aliases are cached outside the rolled-back test transaction.
+        clear_learned_alias_cache()
+
+    def test_aliases_normalization_and_fuzzy_matches(self):
+        headers = ["Handle", "Variant SKU", "Body (HTML)", " title ", "Vendr", "Whatever", "SKU"]
+        matches = resolve_headers(ProductUploadRow, headers)
+        self.assertEqual(
+            [(m.column, m.method) for m in matches],
+            [
+                ("URL handle", "alias"),
+                (None, ""),  # SKU is claimed by the exact header
+                ("Description", "alias"),
+                ("Title", "normalized"),
+                ("Vendor", "fuzzy"),
+                (None, ""),
+                ("SKU", "exact"),
+            ],
+        )
+
+    def test_learned_aliases_are_scoped_to_vendor_and_filename(self):
+        acme = Vendor.objects.create(name="Acme")
+        HeaderAlias.objects.create(source_header="artikelnummer", target_column="SKU")
+        HeaderAlias.objects.create(vendor=acme, filename_pattern="acme_*.csv", source_header="name", target_column="")
+
+        self.assertEqual(map_headers(ProductUploadRow, ["Artikelnummer", "Name"]), ["SKU", "Title"])
+        self.assertEqual(
+            map_headers(ProductUploadRow, ["Artikelnummer", "Name"], source_name="acme_june.csv", vendor=acme),
+            ["SKU", ""],
+        )
+
+    def test_csv_import_uses_mapped_headers(self):
+        upload = SimpleUploadedFile("shopify.csv", b"Handle,Variant SKU,Title \nchest,SKU-1,Chest\n")
+        self.assertEqual(import_csv_to_model(model=ProductUploadRow, file=upload), 1)
+        row = ProductUploadRow.objects.get()
+        self.assertEqual((row.url_handle, row.sku, row.title), ("chest", "SKU-1", "Chest"))
+
+    def test_admin_preview_and_saved_mapping(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("admin:products_productuploadrow_import_excel"),
+            {"file": SimpleUploadedFile("acme.csv", b"Handle,Artikelnummer\nchest,A-1\n"), "_preview": "1"},
+        )
+        self.assertContains(response, "Header mapping preview")
+        self.assertContains(response, "Artikelnummer")
+        self.assertEqual(ProductUploadRow.objects.count(), 0)
+
+        self.client.post(
+            reverse("admin:products_productuploadrow_import_mapping"),
+            {
+                "header": ["Handle", "Artikelnummer"],
+                "suggested": ["URL handle", ""],
+                "method": ["alias", ""],
+                "target": ["URL handle", "SKU"],
+                "filename_pattern": "acme*.csv",
+            },
+        )
+        alias = HeaderAlias.objects.get()
+        self.assertEqual((alias.source_header, alias.target_column), ("artikelnummer", "SKU"))
+
+    def test_import_page_picks_the_vendor_through_autocomplete(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        acme = Vendor.objects.create(name="Acme")
+        for i in range(30):
+            Vendor.objects.create(name=f"Idle vendor {i}")
+        url = reverse("admin:products_productuploadrow_import_excel")
+
+        response = self.client.get(url)
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, "Idle vendor")
+
+        HeaderAlias.objects.create(vendor=acme, source_header="artikelnummer", target_column="SKU")
+        upload = SimpleUploadedFile("acme.csv", b"Title,Artikelnummer\nChest,A-1\n")
+        self.client.post(url, {"file": upload, "vendor": acme.pk})
+        self.assertEqual(ProductUploadRow.objects.get().sku, "A-1")
+
+
+class BenchmarkCommandTests(TestCase):
+    def test_reports_json_and_rolls_back(self):
+        import json
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("benchmark", rows=30, formats="csv,xlsx", images=2, stdout=out)
+        report = json.loads(out.getvalue())
+
+        self.assertEqual(set(report["imports"]), {"csv", "xlsx"})
+        self.assertEqual(report["imports"]["csv"]["rows"], 30)
+        self.assertGreater(report["exports"]["csv"]["bytes"], 0)
+        for result in [*report["imports"].values(), *report["exports"].values()]:
+            self.assertGreater(result["queries"], 0)
+            self.assertGreaterEqual(result["rss_growth_mb"], 0)
+        self.assertIn("peak_rss_mb", report)
+        self.assertEqual(ProductUploadRow.objects.count(), 0)
+        self.assertEqual(Vendor.objects.count(), 0)
+
+    def test_configured_database_is_never_touched(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        Vendor.objects.create(name="Acme")
+        ProductUploadRow.objects.create(title="Live row", sku="LIVE-1")
+        live = connections["default"]
+        with CaptureQueriesContext(live) as live_queries:
+            call_command("benchmark", rows=10, formats="csv", stdout=StringIO())
+        self.assertIs(connections["default"], live)
+        self.assertEqual(live_queries.captured_queries, [])
+        self.assertEqual(list(ProductUploadRow.objects.values_list("sku", flat=True)), ["LIVE-1"])
+
+    def test_xls_case_times_both_row_readers(self):
+        if xlwt is None:
+            self.skipTest("xlwt not installed (pip install -r requirements.txt)")
+        import json
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        out = StringIO()
+        call_command("benchmark", rows=40, formats="xls", stdout=out)
+        result = json.loads(out.getvalue())["imports"]["xls"]
+
+        self.assertEqual(result["rows"], 40)
+        self.assertEqual(set(result["row_extraction"]), {"cell_objects_seconds", "row_vectors_seconds"})
+
+
+class InstrumentationTests(TestCase):
+    def test_import_and_export_jobs_are_recorded_with_stages(self):
+        from .instrumentation import recent_jobs
+
+        upload = SimpleUploadedFile("rows.csv", b"Title,SKU,Vendor\nLamp,L-1,Acme\nDesk,D-1,Acme\n")
+        import_csv_to_model(model=ProductUploadRow, file=upload)
+        job = recent_jobs()[0]
+        self.assertEqual((job.name, job.rows, job.fields["format"]), ("import", 2, "csv"))
+        self.assertGreater(job.queries, 0)
+        self.assertTrue({"parse", "normalize", "vendor_resolve", "insert"} <= set(job.stages))
+
+        "".join(iter_shopify_csv(ProductUploadRow.objects.all()))
+        job = recent_jobs()[0]
+        self.assertEqual((job.name, job.rows), ("export", 2))
+        self.assertTrue({"serialize", "write"} <= set(job.stages))
+
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        response = self.client.get(reverse("admin:products_productuploadrow_performance"))
+        self.assertContains(response, "vendor_resolve")
+
+    def test_suspended_streams_do_not_count_other_queries(self):
+        from unittest import mock
+
+        from .instrumentation import recent_jobs
+
+        for i in range(3):
+            ProductUploadRow.objects.create(title=f"Lamp {i}", url_handle=f"lamp-{i}", description="d")
+        with mock.patch("products.csv_export._STREAM_CHUNK_SIZE", 1):
+            "".join(iter_shopify_csv(ProductUploadRow.objects.all()))
+            alone = recent_jobs()[0].queries
+
+            first = iter_shopify_csv(ProductUploadRow.objects.all())
+            second = iter_shopify_csv(ProductUploadRow.objects.all())
+            next(first)
+            next(second)
+            # Both streams are suspended between chunks: nothing of theirs is on the connection.
+            self.assertEqual(connection.execute_wrappers, [])
+            for _ in range(5):
+                Vendor.objects.count()
+            list(first)
+            list(second)
+        self.assertEqual([job.queries for job in recent_jobs()[:2]], [alone, alone])
+
+    def test_jobs_are_recorded_without_the_resource_module(self):
+        from unittest import mock
+
+        from . import instrumentation
+
+        with mock.patch.object(instrumentation, "resource", None):
+            self.assertEqual(instrumentation.peak_rss_mb(), 0.0)
+            with instrumentation.instrument("export") as job:
+                job.rows = 1
+        record = instrumentation.recent_jobs()[0]
+        self.assertEqual((record.peak_rss_mb, record.rss_growth_mb), (0.0, 0.0))
+
+
+class MetricsTests(TestCase):
+    def _sample(self, text, line_prefix):
+        for line in text.splitlines():
+            if line.startswith(line_prefix + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def test_import_counters_and_histograms_are_exposed(self):
+        before = self._sample(self.client.get("/metrics").content.decode(), 'products_import_rows_total{format="csv"}')
+        upload = SimpleUploadedFile("rows.csv", b"Title,SKU\nLamp,L-1\nDesk,D-1\n")
+        import_csv_to_model(model=ProductUploadRow, file=upload)
+
+        response = self.client.get("/metrics")
+        body = response.content.decode()
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertEqual(self._sample(body, 'products_import_rows_total{format="csv"}'), before + 2)
+        self.assertIn('products_import_duration_seconds_bucket{format="csv",le="+Inf"}', body)
+        self.assertIn("# TYPE products_ollama_request_duration_seconds histogram", body)
+
+    def test_multiprocess_directory_sums_every_worker(self):
+        import json
+
+        from django.test import override_settings
+
+        from .metrics import PURGE_ROWS, render_metrics
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(PRODUCTS_METRICS_DIR=directory):
+            PURGE_ROWS.inc(5)
+            local = self._sample(render_metrics(), "products_purge_rows_total")
+            with open(os.path.join(directory, "metrics_999999.json"), "w") as handle:
+                json.dump({"products_purge_rows_total": {"[]": 7}}, handle)
+            self.assertEqual(self._sample(render_metrics(), "products_purge_rows_total"), local + 7)
+
+    def test_rollbacks_are_not_counted_as_purges(self):
+        from .instrumentation import instrument
+        from .metrics import PURGE_ROWS, ROLLBACK_ROWS
+
+        purged = sum(PURGE_ROWS.snapshot().values())
+        rolled_back = sum(ROLLBACK_ROWS.snapshot().values())
+        with instrument("rollback") as job:
+            job.rows = 3
+        self.assertEqual(sum(ROLLBACK_ROWS.snapshot().values()), rolled_back + 3)
+        self.assertEqual(sum(PURGE_ROWS.snapshot().values()), purged)
+
+    def test_worker_file_is_removed_at_exit(self):
+        from django.test import override_settings
+
+        from .metrics import PURGE_ROWS, flush, remove_own_file
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(PRODUCTS_METRICS_DIR=directory):
+            PURGE_ROWS.inc(0)
+            flush()
+            self.assertEqual(os.listdir(directory), [f"metrics_{os.getpid()}.json"])
+            remove_own_file()
+            self.assertEqual(os.listdir(directory), [])
+
+    def test_save_path_does_not_reuse_earlier_copy(self):
+        from unittest import mock
+
+        from . import ai
+
+        copy = {"description": "Nice lamp", "seo_title": "Lamp", "seo_description": "A lamp"}
+        with mock.patch.object(ai, "_generate_product_copy", return_value=(copy, None)) as generate:
+            ProductUploadRow.objects.create(title="Lamp")
+            ProductUploadRow.objects.create(title="Lamp")
+        self.assertEqual(generate.call_count, 2)
+
+
+class StartupImportTests(SimpleTestCase):
+    # Self import time of all products.* modules during django.setup() + URLconf load.
+    STARTUP_BUDGET_MS = 300
+    HEAVY_MODULES = (
+        "langchain_core",
+        "langchain_ollama",
+        "openpyxl",
+        "xlrd",
+        "xlwt",
+        "concurrent.futures.process",
+        "multiprocessing.connection",
+    )
+
+    def test_django_setup_skips_optional_backends_and_stays_under_budget(self):
+        import subprocess
+        import sys
+
+        code = "import django; django.setup(); import config.urls"
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": "config.settings"}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", code],
+            cwd=settings.BASE_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        modules: dict[str, int] = {}
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            self_us, _cumulative, name = (part.strip() for part in line.split(":", 1)[1].split("|"))
+            if self_us.isdigit():
+                modules[name] = int(self_us)
+
+        loaded_heavy = sorted(
+            name for name in modules if any(name == m or name.startswith(m + ".") for m in self.HEAVY_MODULES)
+        )
+        self.assertEqual(loaded_heavy, [])
+        # importlib.import_module() (app/admin autodiscovery) is not timed, but products.admin's imports are.
+        self.assertIn("products.csv_export", modules)
+        products_ms = sum(us for name, us in modules.items() if name.startswith("products")) / 1000
+        self.assertLess(products_ms, self.STARTUP_BUDGET_MS)
+
+
+class ImportBatchTests(TestCase):
+    def test_rollback_deletes_only_the_batch_rows_with_ranged_deletes(self):
+        first = SimpleUploadedFile("bad.csv", b"Title,SKU,Product image URL\nLamp,L-1,https://x/1.jpg\nDesk,D-1,https://x/2.jpg\n")
+        second = SimpleUploadedFile("good.csv", b"Title,SKU\nSofa,S-1\n")
+        import_csv_to_model(model=ProductUploadRow, file=first)
+        import_csv_to_model(model=ProductUploadRow, file=second)
+
+        bad, good = ImportBatch.objects.order_by("pk")
+        self.assertEqual((bad.source_name, bad.format, bad.row_count), ("bad.csv", "csv", 2))
+        self.assertEqual(len(bad.checksum), 64)
+        self.assertEqual(ProductImage.objects.count(), 2)
+
+        with self.assertNumQueries(18):
+            # Per range (two of one row, then the empty tail): boundary pk lookup, savepoint, the
+            # collector's SELECT of the range's keys (no other columns), one DELETE for the images
+            # and one for the rows, release. Plus the data version bump and the batch update.
+            self.assertEqual(bad.rollback(chunk_size=1), 2)
+        self.assertEqual(list(ProductUploadRow.objects.values_list("sku", flat=True)), ["S-1"])
+        self.assertEqual(ProductImage.objects.count(), 0)
+        bad.refresh_from_db()
+        self.assertIsNotNone(bad.rolled_back_at)
+        self.assertEqual(good.rows.count(), 1)
+
+    def test_admin_action_rolls_back_selected_batch(self):
+        from .instrumentation import recent_jobs
+
+        import_csv_to_model(model=ProductUploadRow, file=SimpleUploadedFile("a.csv", b"Title,SKU\nLamp,L-1\n"))
+        import_csv_to_model(model=ProductUploadRow, file=SimpleUploadedFile("b.csv", b"Title,SKU\nDesk,D-1\n"))
+        batch, other = ImportBatch.objects.order_by("pk")
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+
+        # The batch changelist links to the row changelist filtered to that batch.
+        response = self.client.get(reverse("admin:products_importbatch_changelist"))
+        link = f'{reverse("admin:products_productuploadrow_changelist")}?import_batch={batch.pk}'
+        self.assertContains(response, f'href="{link}"')
+        response = self.client.get(link)
+        self.assertEqual([row.sku for row in response.context["cl"].result_list], ["L-1"])
+        self.assertContains(response, "By import batch")
+        response = self.client.get(reverse("admin:products_productuploadrow_changelist"))
+        self.assertNotContains(response, "By import batch")
+
+        response = self.client.post(
+            reverse("admin:products_importbatch_changelist"),
+            {"action": "roll_back_batches", "_selected_action": [batch.pk]},
+            follow=True,
+        )
+        self.assertContains(response, "Rolled back 1 batches (1 rows deleted).")
+        job = recent_jobs()[0]
+        self.assertEqual((job.name, job.rows, job.fields["batch"]), ("rollback", 1, batch.pk))
+        self.assertEqual(list(ProductUploadRow.objects.values_list("sku", flat=True)), ["D-1"])
+        response = self.client.get(link)
+        self.assertEqual(list(response.context["cl"].result_list), [])
+        self.assertEqual(other.rows.count(), 1)
+
+
+class ImportDryRunTests(TestCase):
+    def _upload(self, content):
+        return SimpleUploadedFile("rows.csv", content.encode("utf-8"), content_type="text/csv")
+
+    def test_report_covers_lengths_duplicates_booleans_and_headers(self):
+        ProductUploadRow.objects.create(title="Existing", sku="SKU-DB")
+        content = (
+            "Title,SKU,SEO title,Published on online store,Variant SKU\n"
+            f"Chest,SKU-1,{'x' * 71},TRUE,a\n"
+            "Lamp,SKU-1,ok,maybe,b\n"
+            "Table,SKU-DB,ok,no,c\n"
+        )
+        report = validate_import_file(model=ProductUploadRow, file=self._upload(content))
+
+        self.assertEqual(report.row_count, 3)
+        self.assertEqual(report.unmapped_columns, ["Variant SKU"])
+        problems = {(issue.row, issue.column) for issue in report.issues}
+        self.assertEqual(problems, {(2, "SEO title"), (3, "SKU"), (3, "Published on online store"), (4, "SKU")})
+        self.assertIn("Duplicate of row 2", report.as_csv())
+        self.assertEqual(ProductUploadRow.objects.count(), 1)
+
+    def test_admin_dry_run_downloads_report_without_importing(self):
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        url = reverse("admin:products_productuploadrow_import_excel")
+        response = self.client.post(url, {"file": self._upload("Title,SKU\nA,S\nB,S\n"), "dry_run": "on"})
+        self.assertEqual(response["Content-Type"], "text/csv; charset=utf-8")
+        self.assertIn("Duplicate of row 2", response.content.decode("utf-8"))
+        self.assertEqual(ProductUploadRow.objects.count(), 0)
+
+    def test_boolean_cells_import_as_booleans(self):
+        import_csv_to_model(model=ProductUploadRow, file=self._upload("Title,SKU,Requires shipping\nA,S1,TRUE\nB,S2,no\n"))
+        self.assertTrue(ProductUploadRow.objects.get(sku="S1").requires_shipping)
+        self.assertFalse(ProductUploadRow.objects.get(sku="S2").requires_shipping)
+
+
+class ImportExportCommandTests(TestCase):
+    def test_import_upserts_on_sku_and_export_applies_filters(self):
+        from io import StringIO
+
+        from django.core.management import call_command
+
+        with tempfile.TemporaryDirectory() as tmp:
+            first = os.path.join(tmp, "first.csv")
+            with open(first, "w", encoding="utf-8") as handle:
+                handle.write("Title,SKU,Vendor,Status,Product image URL\nLamp,L-1,Acme,active,https://x/1.jpg\nDesk,D-1,Other,draft,\n")
+            second = os.path.join(tmp, "second.csv")
+            with open(second, "w", encoding="utf-8") as handle:
+                handle.write("Title,SKU,Product image URL\nLamp v2,L-1,https://x/2.jpg\nSofa,S-1,\nSofa v2,S-1,\n")
+
+            out = StringIO()
+            call_command("import_products", first, batch_size=1, stdout=out, stderr=StringIO())
+            self.assertIn("Imported 2 rows from 1 sources", out.getvalue())
+            call_command("import_products", second, upsert=True, stdout=StringIO(), stderr=StringIO())
+
+            lamp = ProductUploadRow.objects.get(sku="L-1")
+            self.assertEqual((lamp.title, lamp.vendor.name, lamp.status), ("Lamp v2", "Acme", "active"))
+            self.assertEqual(list(lamp.images.values_list("url", flat=True)), ["https://x/2.jpg"])
+            self.assertEqual(ProductUploadRow.objects.get(sku="S-1").title, "Sofa v2")
+            self.assertEqual(ProductUploadRow.objects.count(), 3)
+
+            output = os.path.join(tmp, "out.csv")
+            out = StringIO()
+            call_command("export_products", output, vendor=["Acme"], status=["active"], stdout=out, stderr=StringIO())
+            self.assertIn("Exported 1 rows", out.getvalue())
+            with open(output, encoding="utf-8") as handle:
+                content = handle.read()
+            self.assertIn("Lamp v2", content)
+            self.assertNotIn("Desk", content)
+
+            xlsx = os.path.join(tmp, "out.xlsx")
+            call_command("export_products", xlsx, filter=["title__startswith=Sofa"], stdout=StringIO(), stderr=StringIO())
+            self.assertGreater(os.path.getsize(xlsx), 0)
+
+    def test_upsert_without_sku_column_fails_cleanly(self):
+        from io import StringIO
+
+        from django.core.management import CommandError, call_command
+
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as handle:
+            handle.write("Title\nLamp\n")
+        try:
+            with self.assertRaisesMessage(CommandError, 'Upsert needs a "SKU" column'):
+                call_command("import_products", handle.name, upsert=True, stderr=StringIO())
+        finally:
+            os.unlink(handle.name)
+        self.assertEqual(ProductUploadRow.objects.count(), 0)
+
+
+class ShardedExportTests(TestCase):
+    def setUp(self):
+        vendor = Vendor.objects.create(name="Acme")
+        for product in range(7):
+            for variant in range(product % 3 + 1):
+                ProductUploadRow.objects.create(
+                    title=f"Product {product}",
+                    url_handle=f"product-{product}",
+                    sku=f"P{product}-{variant}",
+                    vendor=vendor,
+                    product_image_url=f"https://x/{product}-{variant}.jpg",
+                )
+        ProductUploadRow.objects.create(title="Loose", url_handle="", sku="LOOSE")
+        # save() fills in a blank handle, so NULL ones only arrive through bulk writes.
+        for sku in ("NULL-1", "NULL-2"):
+            ProductUploadRow.objects.create(title="Unhandled", sku=sku)
+        ProductUploadRow.objects.filter(sku__startswith="NULL-").update(url_handle=None)
+
+    def test_shards_never_split_a_handle_and_concatenate_to_the_serial_export(self):
+        from .sharded_export import iter_sharded_csv, plan_shards
+
+        queryset = ProductUploadRow.objects.all()
+        plan = plan_shards(queryset, shards=4)
+        self.assertGreater(len(plan), 2)
+        handles_per_shard = [set(queryset.filter(condition).values_list("url_handle", flat=True)) for condition in plan]
+        seen: set[str] = set()
+        for handles in handles_per_shard:
+            # Rows without a handle are groups of their own and may span shards.
+            handles -= {None, ""}
+            self.assertFalse(handles & seen)
+            seen |= handles
+        self.assertEqual(sum(queryset.filter(condition).count() for condition in plan), queryset.count())
+
+        serial = "".join(iter_shopify_csv(queryset))
+        sharded = "".join(iter_sharded_csv(queryset, workers=1, shards=4))
+        self.assertEqual(sharded, serial)
+
+    def test_boundaries_come_from_a_single_query(self):
+        from .sharded_export import _key_ranges
+
+        queryset = ProductUploadRow.objects.exclude(url_handle="").exclude(url_handle__isnull=True)
+        with self.assertNumQueries(1):
+            ranges = _key_ranges(queryset, "url_handle", 4)
+        self.assertEqual(sum(queryset.filter(condition).count() for condition in ranges), queryset.count())
+        with self.assertNumQueries(1):
+            self.assertEqual(_key_ranges(queryset.filter(pk=0), "pk", 4), [])
+
+    def test_small_exports_skip_the_worker_pool(self):
+        from .instrumentation import recent_jobs
+        from .sharded_export import write_sharded_zip
+
+        write_sharded_zip(ProductUploadRow.objects.all(), BytesIO(), workers=3)
+        self.assertEqual(recent_jobs()[0].fields["workers"], 1)
+
+    def test_worker_pool_reads_the_database_the_parent_uses(self):
+        from .benchmark import scratch_database
+        from .sharded_export import iter_sharded_csv
+
+        rows = list(ProductUploadRow.objects.values("title", "url_handle", "sku", "product_image_url"))
+        with tempfile.TemporaryDirectory() as workdir, scratch_database(workdir):
+            ProductUploadRow.objects.bulk_create(ProductUploadRow(**row) for row in rows)
+            queryset = ProductUploadRow.objects.all()
+            with override_settings(PRODUCTS_EXPORT_PARALLEL_MIN_ROWS=0):
+                sharded = "".join(iter_sharded_csv(queryset, workers=2, shards=3))
+            self.assertEqual(sharded, "".join(iter_shopify_csv(queryset)))
+
+    def test_zip_holds_one_csv_per_shard_with_headers(self):
+        import zipfile
+
+        from .sharded_export import write_sharded_zip
+
+        output = BytesIO()
+        rows = write_sharded_zip(ProductUploadRow.objects.all(), output, workers=1, shards=3)
+        self.assertEqual(rows, ProductUploadRow.objects.count())
+        with zipfile.ZipFile(output) as archive:
+            names = archive.namelist()
+            self.assertGreater(len(names), 1)
+            header = get_shopify_headers(ProductUploadRow)[0]
+            for name in names:
+                self.assertTrue(archive.read(name).decode("utf-8").startswith(header))
+
+
+class SplitExportTests(TestCase):
+    def test_parts_stay_under_the_limit_without_splitting_a_handle(self):
+        import csv
+        import zipfile
+
+        from .split_export import iter_split_csv_zip
+
+        for product in range(40):
+            for variant in range(3):
+                ProductUploadRow.objects.create(
+                    title=f"Product {product}",
+                    url_handle=f"product-{product:02d}",
+                    sku=f"P{product}-{variant}",
+                    description="x" * 200,
+                    product_image_url=f"https://x/{product}-{variant}.jpg",
+                )
+
+        chunks = list(iter_split_csv_zip(ProductUploadRow.objects.all(), max_bytes=8000, filename_prefix="t"))
+        with zipfile.ZipFile(BytesIO(b"".join(chunks))) as archive:
+            names = archive.namelist()
+            self.assertGreater(len(names), 3)
+            self.assertEqual(names[0], "t_part_001.csv")
+            seen_handles: set[str] = set()
+            total = 0
+            for name in names:
+                content = archive.read(name)
+                self.assertLessEqual(len(content), 8000)
+                rows = list(csv.DictReader(content.decode("utf-8").splitlines()))
+                handles = {row["URL handle"] for row in rows}
+                self.assertFalse(handles & seen_handles)
+                seen_handles |= handles
+                total += sum(1 for row in rows if row["SKU"])
+        self.assertEqual(total, 120)
+
+    def test_admin_streams_split_zip(self):
+        ProductUploadRow.objects.create(title="Lamp", sku="L-1")
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        response = self.client.get(reverse("admin:products_productuploadrow_export"), {"format": "csv-split"})
+        self.assertEqual(response["Content-Type"], "application/zip")
+        self.assertTrue(response.streaming)
+        self.assertTrue(b"".join(response.streaming_content).startswith(b"PK"))
+
+
+class CompressedExportTests(TestCase):
+    def test_gzip_and_zip_downloads_decompress_to_the_plain_csv(self):
+        import gzip
+        import zipfile
+
+        for i in range(50):
+            ProductUploadRow.objects.create(title=f"Chest {i}", sku=f"C-{i}", description="Solid oak chest. " * 40)
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        url = reverse("admin:products_productuploadrow_export")
+
+        plain = b"".join(self.client.get(url, {"format": "csv"}).streaming_content)
+        response = self.client.get(url, {"format": "csv.gz"})
+        self.assertEqual(response["Content-Type"], "application/gzip")
+        self.assertIn('.csv.gz"', response["Content-Disposition"])
+        compressed = b"".join(response.streaming_content)
+        self.assertEqual(gzip.decompress(compressed), plain)
+        self.assertLess(len(compressed) * 5, len(plain))
+
+        response = self.client.get(url, {"format": "csv.zip"})
+        self.assertEqual(response["Content-Type"], "application/zip")
+        with zipfile.ZipFile(BytesIO(b"".join(response.streaming_content))) as archive:
+            (name,) = archive.namelist()
+            self.assertTrue(name.endswith(".csv"))
+            self.assertEqual(archive.read(name), plain)
+
+
+class ExportCacheTests(TestCase):
+    def setUp(self):
+        import shutil
+
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir, True)
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        self.url = reverse("admin:products_productuploadrow_export")
+        ProductUploadRow.objects.create(title="Lamp", sku="L-1", status="active")
+        ProductUploadRow.objects.create(title="Desk", sku="D-1", status="draft")
+
+    def _download(self, **params):
+        response = self.client.get(self.url, params)
+        body = b"".join(response.streaming_content) if response.streaming else response.content
+        return response, body
+
+    def test_repeat_download_is_served_from_disk_until_data_changes(self):
+        with self.settings(PRODUCTS_EXPORT_CACHE_DIR=self.cache_dir, PRODUCTS_EXPORT_CACHE_BYTES=10**7):
+            first, body = self._download(format="csv", status__exact="active")
+            self.assertEqual(first["X-Export-Cache"], "miss")
+            second, cached = self._download(format="csv", status__exact="active", p="2")
+            self.assertEqual(second["X-Export-Cache"], "hit")
+            self.assertEqual(second.__class__.__name__, "FileResponse")
+            self.assertEqual(cached, body)
+
+            other, _body = self._download(format="csv.gz", status__exact="active")
+            self.assertEqual(other["X-Export-Cache"], "miss")
+
+            row = ProductUploadRow.objects.get(sku="L-1")
+            row.title = "Lamp v2"
+            row.save()
+            after_save, body = self._download(format="csv", status__exact="active")
+            self.assertEqual(after_save["X-Export-Cache"], "miss")
+            self.assertIn(b"Lamp v2", body)
+
+            import_csv_to_model(model=ProductUploadRow, file=SimpleUploadedFile("a.csv", b"Title,SKU,Status\nSofa,S-1,active\n"))
+            after_import, body = self._download(format="csv", status__exact="active")
+            self.assertEqual(after_import["X-Export-Cache"], "miss")
+            self.assertIn(b"Sofa", body)
+
+    def test_bulk_deleting_a_vendor_invalidates_cached_exports(self):
+        vendor = Vendor.objects.create(name="Acme")
+        ProductUploadRow.objects.filter(sku="L-1").update(vendor=vendor)
+        with self.settings(PRODUCTS_EXPORT_CACHE_DIR=self.cache_dir, PRODUCTS_EXPORT_CACHE_BYTES=10**7):
+            _response, body = self._download(format="csv", status__exact="active")
+            self.assertIn(b"Acme", body)
+            self.assertEqual(self._download(format="csv", status__exact="active")[0]["X-Export-Cache"], "hit")
+
+            response = self.client.post(
+                reverse("admin:products_vendor_changelist"),
+                {"action": "delete_selected", "_selected_action": [vendor.pk], "post": "yes"},
+            )
+            self.assertEqual(response.status_code, 302)
+            self.assertFalse(Vendor.objects.exists())
+            after_delete, body = self._download(format="csv", status__exact="active")
+            self.assertEqual(after_delete["X-Export-Cache"], "miss")
+            self.assertNotIn(b"Acme", body)
+
+    def test_least_recently_used_files_are_evicted(self):
+        import time
+
+        from .export_cache import evict
+
+        with self.settings(PRODUCTS_EXPORT_CACHE_DIR=self.cache_dir, PRODUCTS_EXPORT_CACHE_BYTES=10**7):
+            _response, body = self._download(format="csv", status__exact="active")
+            self._download(format="csv", status__exact="draft")
+            time.sleep(0.01)
+            self.assertEqual(self._download(format="csv", status__exact="active")[0]["X-Export-Cache"], "hit")
+            self.assertEqual(evict(keep_bytes=len(body)), 1)
+            self.assertEqual(self._download(format="csv", status__exact="active")[0]["X-Export-Cache"], "hit")
+            self.assertEqual(self._download(format="csv", status__exact="draft")[0]["X-Export-Cache"], "miss")
+
+
+class ChangelistQueryTests(TestCase):
+    def test_page_of_rows_loads_vendors_in_the_join_and_defers_wide_columns(self):
+        from django.db import connection
+        from django.test.utils import CaptureQueriesContext
+
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        url = reverse("admin:products_productuploadrow_changelist")
+        vendors = [Vendor.objects.create(name=f"Vendor {i}") for i in range(10)]
+        ProductUploadRow.objects.bulk_create(
+            ProductUploadRow(title=f"Chest {i}", sku=f"C-{i}", vendor=vendors[i % 10], description="x" * 2000)
+            for i in range(5)
+        )
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        ProductUploadRow.objects.bulk_create(
+            ProductUploadRow(title=f"Lamp {i}", sku=f"L-{i}", vendor=vendors[i % 10], description="x" * 2000)
+            for i in range(150)
+        )
+        with CaptureQueriesContext(connection) as page:
+            response = self.client.get(url)
+
+        self.assertEqual(len(page), len(small))
+        self.assertLessEqual(len(page), 10)
+        rows = response.context["cl"].result_list
+        self.assertEqual(len(rows), 100)
+        self.assertIn("description", rows[0].get_deferred_fields())
+        self.assertNotIn("sku", rows[0].get_deferred_fields())
+        (page_query,) = [q["sql"] for q in page if "LIMIT 100" in q["sql"]]
+        self.assertIn('"products_vendor"."name"', page_query)
+        self.assertNotIn('"Description"', page_query)
+
+
+class VendorSelectionTests(TestCase):
+    def setUp(self):
+        from django.core.cache import cache
+
+        cache.clear()
+        user = get_user_model().objects.create_superuser("admin", "admin@example.com", "password")
+        self.client.force_login(user)
+        self.acme = Vendor.objects.create(name="Acme")
+        self.other = Vendor.objects.create(name="Big Acme")
+        for i in range(30):
+            Vendor.objects.create(name=f"Idle vendor {i}")
+        ProductUploadRow.objects.create(title="Lamp", sku="L-1", vendor=self.acme, status="active")
+        ProductUploadRow.objects.create(title="Desk", sku="D-1", vendor=self.other, status="draft")
+        self.row = ProductUploadRow.objects.get(sku="L-1")
+
+    def test_changelist_and_change_form_do_not_render_every_vendor(self):
+        response = self.client.get(reverse("admin:products_productuploadrow_changelist"))
+        self.assertContains(response, reverse("admin:products_productuploadrow_vendor_filter"))
+        self.assertNotContains(response, "Idle vendor")
+
+        response = self.client.get(reverse("admin:products_productuploadrow_change", args=[self.row.pk]))
+        self.assertContains(response, "admin-autocomplete")
+        self.assertNotContains(response, "Idle vendor")
+
+    def test_autocomplete_is_a_case_insensitive_name_prefix_search(self):
+        response = self.client.get(
+            reverse("admin:autocomplete"),
+            {"app_label": "products", "model_name": "productuploadrow", "field_name": "vendor", "term": "acm"},
+        )
+        self.assertEqual([result["text"] for result in response.json()["results"]], ["Acme"])
+
+    def test_non_ascii_vendor_names_are_found(self):
+        Vendor.objects.create(name="Élan")
+        Vendor.objects.create(name="Ünger")
+        for term, expected in (("É", ["Élan"]), ("Ü", ["Ünger"]), ("ÉLAN", ["Élan"])):
+            response = self.client.get(
+                reverse("admin:autocomplete"),
+                {"app_label": "products", "model_name": "productuploadrow", "field_name": "vendor", "term": term},
+            )
+            self.assertEqual([result["text"] for result in response.json()["results"]], expected, term)
+
+    def test_vendor_changelist_keeps_substring_search(self):
+        response = self.client.get(reverse("admin:products_vendor_changelist"), {"q": "acme"})
+        self.assertEqual(sorted(vendor.name for vendor in response.context["cl"].result_list), ["Acme", "Big Acme"])
+
+    def test_lazy_filter_lists_vendors_with_matching_rows_and_is_cached(self):
+        url = reverse("admin:products_productuploadrow_vendor_filter")
+        payload = self.client.get(url, {"status__exact": "active", "vendor__id__exact": self.other.pk}).json()
+        self.assertEqual([choice["name"] for choice in payload["choices"]], ["Acme"])
+        self.assertIn("status__exact=active", payload["choices"][0]["query_string"])
+        self.assertIn(f"vendor__id__exact={self.acme.pk}", payload["choices"][0]["query_string"])
+
+        with self.assertNumQueries(3):  # Session, user, data version.
+            self.assertEqual(self.client.get(url, {"status__exact": "active"}).json(), payload)
+
+        ProductUploadRow.objects.create(title="Sofa", sku="S-1", vendor=self.other, status="active")
+        payload = self.client.get(url, {"status__exact": "active"}).json()
+        self.assertEqual([choice["name"] for choice in payload["choices"]], ["Acme", "Big Acme"])
+
+
+class AiSingleFlightTests(SimpleTestCase):
+    def test_concurrent_identical_generations_share_one_backend_call(self):
+        import threading
+        from unittest import mock
+
+        from . import ai
+        from .metrics import OLLAMA_COALESCED
+
+        copy = {"description": "Solid oak", "seo_title": "Oak chest", "seo_description": "An oak chest"}
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def slow_generate(title):
+            calls.append(title)
+            started.set()
+            release.wait(5)
+            return dict(copy), None
+
+        results = []
+        coalesced = sum(OLLAMA_COALESCED.snapshot().values())
+        with mock.patch.object(ai, "_generate_product_copy", side_effect=slow_generate):
+            leader = threading.Thread(target=lambda: results.append(ai.generate_product_copy_with_error("Oak  chest")))
+            leader.start()
+            started.wait(5)
+            followers = [
+                threading.Thread(target=lambda: results.append(ai.generate_product_copy_with_error("Oak chest")))
+                for _ in range(4)
+            ]
+            for thread in followers:
+                thread.start()
+            # Release the leader once every follower is blocked on its future.
+            (future,) = ai._in_flight._calls.values()
+            for _ in range(500):
+                if len(future._condition._waiters) == len(followers):
+                    break
+                threading.Event().wait(0.01)
+            release.set()
+            for thread in [leader, *followers]:
+                thread.join(5)
+
+            # The leader's own spelling is not what gets sent: followers share its key, not its text.
+            self.assertEqual(calls, ["Oak chest"])
+            self.assertEqual(results, [(copy, None)] * 5)
+            self.assertEqual(sum(OLLAMA_COALESCED.snapshot().values()), coalesced + 4)
+
+            # Once the flight has landed, the next request runs again.
+            ai.generate_product_copy_with_error("Oak chest")
+            self.assertEqual(len(calls), 2)
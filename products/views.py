@@ -1,3 +1,17 @@
-from django.shortcuts import render
+from django.conf import settings
+from django.http import HttpRequest, HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+from django.views.decorators.http import require_GET
 
-# Create your views here.
+from .metrics import render_metrics
+
+
+@require_GET
+def metrics_view(request: HttpRequest) -> HttpResponse:
+    """Prometheus scrape endpoint; set PRODUCTS_METRICS_TOKEN to require a bearer token."""
+    token = getattr(settings, "PRODUCTS_METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponseForbidden("Forbidden")
+    return HttpResponse(render_metrics(), content_type="text/plain; version=0.0.4; charset=utf-8")